@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark radius queries for Database.find_groups
+
+Loads synthetic groups into a scratch schema, applies database_schema.sql and
+database_migrations/geo_radius_index.sql, then times find_groups() with every
+available geo strategy.
+
+Usage:
+    python benchmark_geo_queries.py [--groups 1000000] [--queries 200] [--radius 10] [--keep]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+from db_pool import PoolMetrics
+from query_cache import QueryCache
+from database import (
+    Database,
+    GEO_STRATEGY_BBOX,
+    GEO_STRATEGY_EARTHDISTANCE,
+    GEO_STRATEGY_GEOHASH,
+    GEO_STRATEGY_POINT,
+)
+
+load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / '.env')
+
+BENCH_SCHEMA = "knuut_geo_bench"
+SCHEMA_FILE = Path(__file__).parent / "database_schema.sql"
+MIGRATION_FILE = Path(__file__).parent / "database_migrations" / "geo_radius_index.sql"
+
+# Synthetic groups are spread over Finland
+LAT_RANGE = (59.8, 70.0)
+LNG_RANGE = (20.5, 31.5)
+
+
+async def load_fixture(conn: asyncpg.Connection, group_count: int):
+    """Create the scratch schema and fill it with synthetic groups"""
+    await conn.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    await conn.execute(f"SET search_path TO {BENCH_SCHEMA}, public")
+    await conn.execute(SCHEMA_FILE.read_text())
+    await conn.execute(MIGRATION_FILE.read_text())
+
+    print(f"📥 Inserting {group_count:,} synthetic groups...")
+    start = time.perf_counter()
+    await conn.execute(
+        """
+        INSERT INTO groups (name, group_type, location_lat, location_lng, created_at)
+        SELECT
+            'Group ' || i,
+            (ARRAY['mothers_with_kids', 'language_exchange', 'sports', 'cultural'])[1 + i % 4],
+            $2::float8 + random() * ($3::float8 - $2::float8),
+            $4::float8 + random() * ($5::float8 - $4::float8),
+            NOW() - (i || ' seconds')::interval
+        FROM generate_series(1, $1::int) AS i
+        """,
+        group_count, LAT_RANGE[0], LAT_RANGE[1], LNG_RANGE[0], LNG_RANGE[1]
+    )
+    await conn.execute("ANALYZE groups")
+    print(f"   Done in {time.perf_counter() - start:.1f}s")
+
+
+async def time_strategy(db: Database, strategy: str, points, radius_km: float):
+    """Run find_groups for every point and return latencies in milliseconds"""
+    db.geo_strategy = strategy
+    # Warm up caches and plans
+    for lat, lng in points[:5]:
+        await db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=radius_km)
+
+    latencies = []
+    for lat, lng in points:
+        start = time.perf_counter()
+        await db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=radius_km)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=10.0)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ DATABASE_URL not found in .env file")
+        return
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        await load_fixture(conn, args.groups)
+    finally:
+        await conn.close()
+
+    db = Database()
+    # Measure the database, not the discovery cache
+    db.group_cache = QueryCache(max_entries=0)
+    db.pool = await asyncpg.create_pool(
+        database_url,
+        min_size=1,
+        max_size=2,
+        server_settings={"search_path": f"{BENCH_SCHEMA}, public"},
+    )
+    db.pool_metrics = PoolMetrics(db.pool, interval=0)
+    await db.detect_counter_columns()
+    detected = await db.detect_geo_strategy()
+    strategies = [GEO_STRATEGY_BBOX, GEO_STRATEGY_GEOHASH, GEO_STRATEGY_POINT]
+    if detected == GEO_STRATEGY_EARTHDISTANCE:
+        strategies.append(GEO_STRATEGY_EARTHDISTANCE)
+
+    rng = random.Random(42)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+
+    print(f"\n📊 find_groups radius={args.radius} km over {args.groups:,} groups ({args.queries} queries)")
+    try:
+        for strategy in strategies:
+            latencies = sorted(await time_strategy(db, strategy, points, args.radius))
+            p50 = statistics.median(latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            marker = "✅" if p50 < 10 else "⚠️ "
+            print(f"   {marker} {strategy:<14} p50={p50:7.2f} ms  p99={p99:7.2f} ms")
+    finally:
+        await db.close()
+        if not args.keep:
+            conn = await asyncpg.connect(database_url)
+            await conn.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,60 +2,388 @@
 Database helper for Knuut AI
 Handles all database operations using Neon PostgreSQL
 """
+import asyncio
 import os
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 import asyncpg
 from dotenv import load_dotenv
 from pathlib import Path
 
+from db_pool import PoolMetrics, StatementRegistry
+from geo import bounding_box, geohash_cells
+from models import Event, Group
+from query_cache import QueryCache, cell_reach_km, location_cell, rows_within
+from usage_writer import UsageWriter
+
 load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / '.env')
 
 logger = logging.getLogger("database")
 logger.setLevel(logging.INFO)
 
+# Radius query strategies, fastest first (see database_migrations/geo_radius_index.sql)
+GEO_STRATEGY_EARTHDISTANCE = "earthdistance"
+GEO_STRATEGY_POINT = "point"
+GEO_STRATEGY_GEOHASH = "geohash"
+GEO_STRATEGY_BBOX = "bbox"
+
+# Rows fetched per round trip by stream_groups / stream_events
+STREAM_PAGE_SIZE = 500
+
+# Rows returned by find_groups / find_events, and fetched (then narrowed down per caller)
+# for a whole location cell of the discovery cache
+DISCOVERY_LIMIT = 50
+CELL_QUERY_LIMIT = 200
+
+# Longest get_user_usage waits for buffered usage rows to be written first (seconds)
+USAGE_READ_FLUSH_TIMEOUT = 0.5
+
+# Drift between the denormalized counters and the rows they count
+# (see database_migrations/denormalized_counters.sql)
+_GROUP_COUNTER_DRIFT_SQL = """
+    SELECT g.id, g.member_count AS stored, counts.actual
+    FROM groups g
+    JOIN (
+        SELECT g2.id, COUNT(gm.id) AS actual
+        FROM groups g2 LEFT JOIN group_members gm ON gm.group_id = g2.id
+        GROUP BY g2.id
+    ) counts ON counts.id = g.id
+    WHERE g.member_count <> counts.actual
+"""
+
+_EVENT_COUNTER_DRIFT_SQL = """
+    SELECT e.id, e.rsvp_count AS stored, counts.actual
+    FROM events e
+    JOIN (
+        SELECT e2.id, COUNT(er.id) AS actual
+        FROM events e2 LEFT JOIN event_rsvps er ON er.event_id = e2.id AND er.status = 'going'
+        GROUP BY e2.id
+    ) counts ON counts.id = e.id
+    WHERE e.rsvp_count <> counts.actual
+"""
+
+
+def _radius_conditions(alias: str, strategy: str, location_lat: float, location_lng: float,
+                       max_distance_km: float, params: List[Any]) -> List[str]:
+    """
+    Build WHERE conditions limiting rows of `alias` to max_distance_km around a point.
+
+    An index-friendly prefilter (earth_box GiST, point GiST box, geohash prefix
+    ranges or a lat/lng bounding box) narrows the candidates first; the exact great-circle distance is
+    only evaluated on the rows that survive it. Parameters are appended to `params`.
+    """
+    conditions = []
+
+    if strategy == GEO_STRATEGY_EARTHDISTANCE:
+        params.extend([location_lat, location_lng, max_distance_km * 1000.0])
+        lat_param, lng_param, dist_param = len(params) - 2, len(params) - 1, len(params)
+        point = f"ll_to_earth({alias}.location_lat::float8, {alias}.location_lng::float8)"
+        center = f"ll_to_earth(${lat_param}::float8, ${lng_param}::float8)"
+        conditions.append(f"earth_box({center}, ${dist_param}::float8) @> {point}")
+        conditions.append(f"earth_distance({center}, {point}) <= ${dist_param}::float8")
+        return conditions
+
+    if strategy == GEO_STRATEGY_GEOHASH:
+        # Always bind exactly nine cells (padding with repeats) so the SQL text stays canonical
+        cells = geohash_cells(location_lat, location_lng, max_distance_km)
+        cells += [cells[0]] * (9 - len(cells))
+        ranges = []
+        for cell in cells:
+            params.extend([cell, cell + "~"])
+            ranges.append(f"({alias}.geohash >= ${len(params) - 1} AND {alias}.geohash < ${len(params)})")
+        conditions.append("(" + " OR ".join(ranges) + ")")
+
+    min_lat, max_lat, min_lng, max_lng = bounding_box(location_lat, location_lng, max_distance_km)
+    if min_lng is None:
+        # Box crosses a pole or the antimeridian: keep the condition but let every longitude through
+        min_lng, max_lng = -180.0, 180.0
+    if strategy == GEO_STRATEGY_POINT:
+        params.extend([min_lng, min_lat, max_lng, max_lat])
+        conditions.append(
+            f"point({alias}.location_lng::float8, {alias}.location_lat::float8) <@ "
+            f"box(point(${len(params) - 3}, ${len(params) - 2}), point(${len(params) - 1}, ${len(params)}))"
+        )
+    else:
+        params.extend([min_lat, max_lat, min_lng, max_lng])
+        conditions.append(f"{alias}.location_lat BETWEEN ${len(params) - 3} AND ${len(params) - 2}")
+        conditions.append(f"{alias}.location_lng BETWEEN ${len(params) - 1} AND ${len(params)}")
+
+    # Exact Haversine on the prefiltered candidates; least() guards asin against rounding above 1
+    params.extend([location_lat, location_lng, max_distance_km])
+    lat_param, lng_param, dist_param = len(params) - 2, len(params) - 1, len(params)
+    conditions.append(
+        f"(2 * 6371 * asin(least(1, sqrt("
+        f"power(sin(radians({alias}.location_lat::float8 - ${lat_param}::float8) / 2), 2) + "
+        f"cos(radians(${lat_param}::float8)) * cos(radians({alias}.location_lat::float8)) * "
+        f"power(sin(radians({alias}.location_lng::float8 - ${lng_param}::float8) / 2), 2))))) <= ${dist_param}"
+    )
+    return conditions
+
+
+# Canonical statements prepared on every pooled connection (see db_pool.StatementRegistry).
+# find_groups / find_events / get_user_usage register their variants on first use.
+_CANONICAL_STATEMENTS = {
+    "get_user": "SELECT * FROM users WHERE id = $1",
+    "create_user": """
+        INSERT INTO users (email, name, country)
+        VALUES ($1, $2, $3)
+        RETURNING id
+    """,
+    "create_group": """
+        INSERT INTO groups (name, description, group_type, location_name, location_lat, location_lng, created_by)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING *
+    """,
+    "join_group": """
+        INSERT INTO group_members (group_id, user_id)
+        VALUES ($1, $2)
+        ON CONFLICT (group_id, user_id) DO NOTHING
+    """,
+    "create_event": """
+        INSERT INTO events (title, description, event_date, location_name, location_lat, location_lng, group_id, created_by)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        RETURNING *
+    """,
+    "rsvp_event": """
+        INSERT INTO event_rsvps (event_id, user_id, status)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (event_id, user_id) DO UPDATE SET status = $3, rsvp_at = CURRENT_TIMESTAMP
+    """,
+}
+
+
 class Database:
     """Database connection and operations manager"""
     
     def __init__(self):
         self.connection_string = os.getenv("DATABASE_URL")
         self.pool: Optional[asyncpg.Pool] = None
+        self.geo_strategy = GEO_STRATEGY_BBOX
+        self.has_counter_columns = False
+        self.has_usage_rollup = False
+        self.usage_writer: Optional[UsageWriter] = None
+        self.pool_metrics: Optional[PoolMetrics] = None
+        
+        self.statements = StatementRegistry(enabled=os.getenv("DB_PREPARE_STATEMENTS", "1") != "0")
+        for name, sql in _CANONICAL_STATEMENTS.items():
+            self.statements.register(name, sql)
+        
+        # Read-through caches for discovery queries, invalidated by the write methods below
+        cache_size = int(os.getenv("DISCOVERY_CACHE_SIZE", "256"))
+        cache_ttl = float(os.getenv("DISCOVERY_CACHE_TTL", "300"))
+        self.group_cache = QueryCache(max_entries=cache_size, ttl_seconds=cache_ttl)
+        self.event_cache = QueryCache(max_entries=cache_size, ttl_seconds=cache_ttl)
     
     async def connect(self):
-        """Initialize database connection pool"""
+        """Initialize database connection pool (sized from DB_POOL_* env vars)"""
         if not self.connection_string:
             logger.warning("DATABASE_URL not set, database operations will be disabled")
             return
         
+        min_size = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        max_size = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
         try:
+            # create_pool opens min_size connections up front, and the init hook prepares
+            # the canonical statements on each, so the pool starts warm
             self.pool = await asyncpg.create_pool(
                 self.connection_string,
-                min_size=1,
-                max_size=10,
-                command_timeout=60
+                min_size=min_size,
+                max_size=max(min_size, max_size),
+                command_timeout=float(os.getenv("DB_COMMAND_TIMEOUT", "60")),
+                max_inactive_connection_lifetime=float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300")),
+                statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")) if self.statements.enabled else 0,
+                init=self.statements.prepare_all,
+            )
+            logger.info(
+                f"Database connection pool created (min={min_size}, max={max(min_size, max_size)}, "
+                f"warm={self.pool.get_size()}, prepared statements={'on' if self.statements.enabled else 'off'})"
             )
-            logger.info("Database connection pool created")
         except Exception as e:
             logger.error(f"Failed to create database pool: {e}")
             raise
+        
+        self.pool_metrics = PoolMetrics(self.pool, interval=float(os.getenv("DB_POOL_METRICS_INTERVAL", "60")))
+        self.pool_metrics.start()
+        
+        self.usage_writer = UsageWriter(
+            self.pool,
+            flush_size=int(os.getenv("USAGE_FLUSH_SIZE", "100")),
+            flush_interval=float(os.getenv("USAGE_FLUSH_INTERVAL", "5")),
+        )
+        
+        await self.detect_geo_strategy()
+        await self.detect_counter_columns()
+        await self.detect_usage_rollup()
+    
+    async def detect_geo_strategy(self) -> str:
+        """Pick the fastest radius query strategy supported by the connected database"""
+        if not self.pool:
+            return self.geo_strategy
+        
+        try:
+            row = await self.pool.fetchrow(
+                """
+                SELECT
+                    EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'earthdistance') AS has_earthdistance,
+                    EXISTS (
+                        SELECT 1 FROM pg_indexes
+                        WHERE schemaname = current_schema()
+                          AND indexname IN ('idx_groups_earth', 'idx_events_earth')
+                        HAVING COUNT(*) = 2
+                    ) AS has_earth_indexes,
+                    EXISTS (
+                        SELECT 1 FROM pg_indexes
+                        WHERE schemaname = current_schema()
+                          AND indexname IN ('idx_groups_point', 'idx_events_point')
+                        HAVING COUNT(*) = 2
+                    ) AS has_point_indexes,
+                    EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = current_schema()
+                          AND table_name IN ('groups', 'events') AND column_name = 'geohash'
+                        HAVING COUNT(*) = 2
+                    ) AS has_geohash
+                """
+            )
+            if row["has_earthdistance"] and row["has_earth_indexes"]:
+                self.geo_strategy = GEO_STRATEGY_EARTHDISTANCE
+            elif row["has_point_indexes"]:
+                self.geo_strategy = GEO_STRATEGY_POINT
+            elif row["has_geohash"]:
+                self.geo_strategy = GEO_STRATEGY_GEOHASH
+            else:
+                self.geo_strategy = GEO_STRATEGY_BBOX
+        except Exception as e:
+            logger.error(f"Error detecting geo query strategy: {e}")
+            self.geo_strategy = GEO_STRATEGY_BBOX
+        
+        logger.info(f"Using '{self.geo_strategy}' strategy for radius queries")
+        return self.geo_strategy
+    
+    async def detect_counter_columns(self) -> bool:
+        """Check whether groups.member_count / events.rsvp_count exist (denormalized_counters.sql)"""
+        if not self.pool:
+            return self.has_counter_columns
+        
+        try:
+            self.has_counter_columns = bool(await self.pool.fetchval(
+                """
+                SELECT COUNT(*) = 2 FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                  AND ((table_name = 'groups' AND column_name = 'member_count')
+                    OR (table_name = 'events' AND column_name = 'rsvp_count'))
+                """
+            ))
+        except Exception as e:
+            logger.error(f"Error detecting counter columns: {e}")
+            self.has_counter_columns = False
+        
+        if not self.has_counter_columns:
+            logger.warning("Counter columns missing, discovery queries will aggregate member/RSVP rows")
+        return self.has_counter_columns
+    
+    async def detect_usage_rollup(self) -> bool:
+        """Check whether usage_monthly_rollup exists (usage_monthly_rollup.sql)"""
+        if not self.pool:
+            return self.has_usage_rollup
+        
+        try:
+            self.has_usage_rollup = bool(await self.pool.fetchval(
+                "SELECT to_regclass('usage_monthly_rollup') IS NOT NULL"
+            ))
+        except Exception as e:
+            logger.error(f"Error detecting usage rollup: {e}")
+            self.has_usage_rollup = False
+        
+        if not self.has_usage_rollup:
+            logger.warning("usage_monthly_rollup missing, get_user_usage will sum raw usage rows")
+        return self.has_usage_rollup
+    
+    async def check_counters(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Return groups/events whose stored counter differs from the actual row count"""
+        if not self.pool:
+            return {"groups": [], "events": []}
+        
+        groups = await self.pool.fetch(_GROUP_COUNTER_DRIFT_SQL)
+        events = await self.pool.fetch(_EVENT_COUNTER_DRIFT_SQL)
+        return {
+            "groups": [dict(row) for row in groups],
+            "events": [dict(row) for row in events],
+        }
+    
+    async def repair_counters(self) -> Dict[str, int]:
+        """Rewrite drifted member_count / rsvp_count values from the actual rows"""
+        if not self.pool:
+            return {"groups": 0, "events": 0}
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                groups = await conn.execute(
+                    f"""
+                    UPDATE groups g SET member_count = drift.actual
+                    FROM ({_GROUP_COUNTER_DRIFT_SQL}) drift
+                    WHERE g.id = drift.id
+                    """
+                )
+                events = await conn.execute(
+                    f"""
+                    UPDATE events e SET rsvp_count = drift.actual
+                    FROM ({_EVENT_COUNTER_DRIFT_SQL}) drift
+                    WHERE e.id = drift.id
+                    """
+                )
+        
+        self.group_cache.clear()
+        self.event_cache.clear()
+        repaired = {"groups": int(groups.split()[-1]), "events": int(events.split()[-1])}
+        logger.info(f"Repaired counters: {repaired}")
+        return repaired
     
     async def close(self):
-        """Close database connection pool"""
+        """Flush buffered usage rows and close database connection pool"""
+        if self.usage_writer:
+            await self.usage_writer.close()
+        if self.pool_metrics:
+            await self.pool_metrics.stop()
         if self.pool:
             await self.pool.close()
             logger.info("Database connection pool closed")
     
+    async def _fetch(self, name: str, *args) -> List[asyncpg.Record]:
+        async with self.pool_metrics.acquire() as conn:
+            return await self.statements.fetch(conn, name, *args)
+    
+    async def _fetchrow(self, name: str, *args) -> Optional[asyncpg.Record]:
+        async with self.pool_metrics.acquire() as conn:
+            return await self.statements.fetchrow(conn, name, *args)
+    
+    async def _fetchval(self, name: str, *args) -> Any:
+        async with self.pool_metrics.acquire() as conn:
+            return await self.statements.fetchval(conn, name, *args)
+    
+    async def _execute(self, name: str, *args) -> str:
+        async with self.pool_metrics.acquire() as conn:
+            return await self.statements.execute(conn, name, *args)
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool occupancy and acquire wait times since the last metrics log line"""
+        return self.pool_metrics.snapshot() if self.pool_metrics else {}
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters of the discovery caches"""
+        return {
+            "groups": self.group_cache.stats(),
+            "events": self.event_cache.stats(),
+        }
+    
     async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         if not self.pool:
             return None
         
         try:
-            row = await self.pool.fetchrow(
-                "SELECT * FROM users WHERE id = $1",
-                user_id
-            )
+            row = await self._fetchrow("get_user", user_id)
             return dict(row) if row else None
         except Exception as e:
             logger.error(f"Error getting user: {e}")
@@ -68,14 +396,7 @@ class Database:
             return None
         
         try:
-            user_id = await self.pool.fetchval(
-                """
-                INSERT INTO users (email, name, country)
-                VALUES ($1, $2, $3)
-                RETURNING id
-                """,
-                email, name, country
-            )
+            user_id = await self._fetchval("create_user", email, name, country)
             logger.info(f"Created user: {user_id}")
             return str(user_id)
         except Exception as e:
@@ -92,16 +413,16 @@ class Database:
             return None
         
         try:
-            row = await self.pool.fetchrow(
-                """
-                INSERT INTO groups (name, description, group_type, location_name, location_lat, location_lng, created_by)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                RETURNING *
-                """,
+            row = await self._fetchrow(
+                "create_group",
                 name, description, group_type, location_name, location_lat, location_lng, created_by
             )
             group = dict(row)
             group['member_count'] = 0
+            self.group_cache.invalidate(
+                lambda entry: entry.filters["group_type"] in (None, group_type)
+                and entry.covers(location_lat, location_lng)
+            )
             logger.info(f"Created group: {group['id']}")
             return group
         except Exception as e:
@@ -112,64 +433,153 @@ class Database:
                          location_lat: Optional[float] = None,
                          location_lng: Optional[float] = None,
                          max_distance_km: float = 10.0) -> List[Dict[str, Any]]:
-        """Find groups with optional filters"""
+        """Find groups with optional filters (served from the discovery cache when possible)"""
         if not self.pool:
             return []
         
+        cell = location_cell(location_lat, location_lng)
+        if cell and self.group_cache.max_entries <= 0:
+            # No cache to share a cell-wide result through: query around the caller
+            return await self._query_groups(
+                group_type, (location_lat, location_lng), max_distance_km, DISCOVERY_LIMIT
+            ) or []
+        
+        cache_key = (group_type, cell, max_distance_km if cell else None)
+        rows = self.group_cache.get(cache_key)
+        if rows is None:
+            # Around a cell, fetch every group any caller in it could see
+            radius_km = max_distance_km + cell_reach_km(cell) if cell else None
+            rows = await self._query_groups(
+                group_type, cell, radius_km, CELL_QUERY_LIMIT if cell else DISCOVERY_LIMIT
+            )
+            if rows is None:
+                return []
+            self.group_cache.set(cache_key, rows, filters={"group_type": group_type},
+                                 center=cell, radius_km=radius_km)
+        if not cell:
+            return rows
+        
+        # Then keep the ones within max_distance_km of this caller
+        groups = rows_within(rows, location_lat, location_lng, max_distance_km,
+                             DISCOVERY_LIMIT, complete=len(rows) < CELL_QUERY_LIMIT)
+        if groups is None:
+            groups = await self._query_groups(
+                group_type, (location_lat, location_lng), max_distance_km, DISCOVERY_LIMIT
+            ) or []
+        logger.info(f"Found {len(groups)} groups")
+        return groups
+    
+    async def _query_groups(self, group_type: Optional[str], center: Optional[Tuple[float, float]],
+                            radius_km: Optional[float], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Newest groups within radius_km of center (any location when None); None on error"""
         try:
-            query = "SELECT g.*, COUNT(gm.id) as member_count FROM groups g LEFT JOIN group_members gm ON g.id = gm.group_id"
+            if self.has_counter_columns:
+                query = "SELECT g.* FROM groups g"
+                group_by = ""
+            else:
+                query = "SELECT g.*, COUNT(gm.id) as member_count FROM groups g LEFT JOIN group_members gm ON g.id = gm.group_id"
+                group_by = " GROUP BY g.id"
             conditions = []
             params = []
-            param_count = 0
             
             if group_type:
-                param_count += 1
-                conditions.append(f"g.group_type = ${param_count}")
                 params.append(group_type)
+                conditions.append(f"g.group_type = ${len(params)}")
             
-            if location_lat and location_lng:
-                # Distance calculation using Haversine formula (simplified)
-                param_count += 1
-                lat_param = param_count
-                param_count += 1
-                lng_param = param_count
-                param_count += 1
-                max_dist_param = param_count
-                
-                conditions.append(
-                    f"(6371 * acos(cos(radians(${lat_param})) * cos(radians(g.location_lat)) * "
-                    f"cos(radians(g.location_lng) - radians(${lng_param})) + "
-                    f"sin(radians(${lat_param})) * sin(radians(g.location_lat)))) <= ${max_dist_param}"
-                )
-                params.extend([location_lat, location_lng, max_distance_km])
+            if center:
+                conditions.extend(_radius_conditions(
+                    "g", self.geo_strategy, center[0], center[1], radius_km, params
+                ))
             
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
             
-            query += " GROUP BY g.id ORDER BY g.created_at DESC LIMIT 50"
+            query += group_by + f" ORDER BY g.created_at DESC LIMIT {limit}"
             
-            rows = await self.pool.fetch(query, *params)
-            groups = [dict(row) for row in rows]
-            logger.info(f"Found {len(groups)} groups")
-            return groups
+            # One registered statement per filter combination, so plans are reused
+            statement = ":".join([
+                "find_groups", self.geo_strategy if center else "any",
+                "type" if group_type else "all", "counters" if self.has_counter_columns else "join",
+                str(limit),
+            ])
+            if statement not in self.statements:
+                self.statements.register(statement, query)
+            rows = await self._fetch(statement, *params)
+            return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Error finding groups: {e}")
-            return []
+            return None
+    
+    async def stream_groups(self, group_type: Optional[str] = None,
+                            location_lat: Optional[float] = None,
+                            location_lng: Optional[float] = None,
+                            max_distance_km: float = 10.0,
+                            page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[Group]:
+        """
+        Yield every matching group, newest first, without a result limit.
+        
+        Pages with keyset pagination on (created_at, id), holding a pooled connection
+        only while a page is fetched, so memory stays flat for exports and large-city
+        listings. Uses the exact location (not the cache cell) and bypasses the
+        discovery cache.
+        """
+        if not self.pool:
+            return
+        
+        if self.has_counter_columns:
+            query = "SELECT g.* FROM groups g"
+            group_by = ""
+        else:
+            query = "SELECT g.*, COUNT(gm.id) as member_count FROM groups g LEFT JOIN group_members gm ON g.id = gm.group_id"
+            group_by = " GROUP BY g.id"
+        conditions = []
+        params = []
+        
+        if group_type:
+            params.append(group_type)
+            conditions.append(f"g.group_type = ${len(params)}")
+        
+        located = bool(location_lat and location_lng)
+        if located:
+            conditions.extend(_radius_conditions(
+                "g", self.geo_strategy, location_lat, location_lng, max_distance_km, params
+            ))
+        
+        # First page has no cursor; the rest continue after the last (created_at, id) seen
+        first_sql, next_sql = self._keyset_statements(
+            query, conditions, group_by, len(params),
+            keys=("g.created_at", "g.id"), descending=True,
+        )
+        statement = ":".join([
+            "stream_groups", self.geo_strategy if located else "any",
+            "type" if group_type else "all", "counters" if self.has_counter_columns else "join",
+        ])
+        if f"{statement}:first" not in self.statements:
+            self.statements.register(f"{statement}:first", first_sql)
+            self.statements.register(f"{statement}:next", next_sql)
+        
+        streamed = 0
+        rows = await self._fetch(f"{statement}:first", *params, page_size)
+        while rows:
+            for row in rows:
+                yield Group.from_row(row)
+            streamed += len(rows)
+            if len(rows) < page_size:
+                break
+            last = rows[-1]
+            rows = await self._fetch(f"{statement}:next", *params, page_size, last["created_at"], last["id"])
+        logger.info(f"Streamed {streamed} groups")
     
     async def join_group(self, group_id: str, user_id: str) -> bool:
-        """Join a group"""
+        """Join a group (groups.member_count is bumped by trigger in the same statement)"""
         if not self.pool:
             return False
         
         try:
-            await self.pool.execute(
-                """
-                INSERT INTO group_members (group_id, user_id)
-                VALUES ($1, $2)
-                ON CONFLICT (group_id, user_id) DO NOTHING
-                """,
-                group_id, user_id
-            )
+            status = await self._execute("join_group", group_id, user_id)
+            if status != "INSERT 0 0":
+                # Only results listing this group carry its member_count
+                self.group_cache.invalidate_row(group_id)
             logger.info(f"User {user_id} joined group {group_id}")
             return True
         except Exception as e:
@@ -186,16 +596,16 @@ class Database:
             return None
         
         try:
-            row = await self.pool.fetchrow(
-                """
-                INSERT INTO events (title, description, event_date, location_name, location_lat, location_lng, group_id, created_by)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                RETURNING *
-                """,
+            row = await self._fetchrow(
+                "create_event",
                 title, description, event_date, location_name, location_lat, location_lng, group_id, created_by
             )
             event = dict(row)
             event['rsvp_count'] = 0
+            self.event_cache.invalidate(
+                lambda entry: entry.filters["group_id"] in (None, str(group_id))
+                and entry.covers(location_lat, location_lng)
+            )
             logger.info(f"Created event: {event['id']}")
             return event
         except Exception as e:
@@ -207,67 +617,173 @@ class Database:
                          location_lng: Optional[float] = None,
                          max_distance_km: float = 10.0,
                          upcoming_only: bool = True) -> List[Dict[str, Any]]:
-        """Find events with optional filters"""
+        """Find events with optional filters (served from the discovery cache when possible)"""
         if not self.pool:
             return []
         
+        cell = location_cell(location_lat, location_lng)
+        if cell and self.event_cache.max_entries <= 0:
+            return await self._query_events(
+                group_id, (location_lat, location_lng), max_distance_km, upcoming_only, DISCOVERY_LIMIT
+            ) or []
+        
+        group_key = str(group_id) if group_id else None
+        cache_key = (group_key, cell, max_distance_km if cell else None, upcoming_only)
+        rows = self.event_cache.get(cache_key)
+        if rows is None:
+            # Same as find_groups: the whole cell's reach, narrowed down per caller below
+            radius_km = max_distance_km + cell_reach_km(cell) if cell else None
+            rows = await self._query_events(
+                group_id, cell, radius_km, upcoming_only, CELL_QUERY_LIMIT if cell else DISCOVERY_LIMIT
+            )
+            if rows is None:
+                return []
+            self.event_cache.set(cache_key, rows, filters={"group_id": group_key},
+                                 center=cell, radius_km=radius_km)
+        if not cell:
+            return rows
+        
+        events = rows_within(rows, location_lat, location_lng, max_distance_km,
+                             DISCOVERY_LIMIT, complete=len(rows) < CELL_QUERY_LIMIT)
+        if events is None:
+            events = await self._query_events(
+                group_id, (location_lat, location_lng), max_distance_km, upcoming_only, DISCOVERY_LIMIT
+            ) or []
+        logger.info(f"Found {len(events)} events")
+        return events
+    
+    async def _query_events(self, group_id: Optional[str], center: Optional[Tuple[float, float]],
+                            radius_km: Optional[float], upcoming_only: bool,
+                            limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Soonest events within radius_km of center (any location when None); None on error"""
         try:
-            query = "SELECT e.*, COUNT(er.id) as rsvp_count FROM events e LEFT JOIN event_rsvps er ON e.id = er.event_id AND er.status = 'going'"
+            if self.has_counter_columns:
+                query = "SELECT e.* FROM events e"
+                group_by = ""
+            else:
+                query = "SELECT e.*, COUNT(er.id) as rsvp_count FROM events e LEFT JOIN event_rsvps er ON e.id = er.event_id AND er.status = 'going'"
+                group_by = " GROUP BY e.id"
             conditions = []
             params = []
-            param_count = 0
             
             if upcoming_only:
-                param_count += 1
-                conditions.append(f"e.event_date > NOW()")
+                conditions.append("e.event_date > NOW()")
             
             if group_id:
-                param_count += 1
-                conditions.append(f"e.group_id = ${param_count}")
                 params.append(group_id)
+                conditions.append(f"e.group_id = ${len(params)}")
             
-            if location_lat and location_lng:
-                param_count += 1
-                lat_param = param_count
-                param_count += 1
-                lng_param = param_count
-                param_count += 1
-                max_dist_param = param_count
-                
-                conditions.append(
-                    f"(6371 * acos(cos(radians(${lat_param})) * cos(radians(e.location_lat)) * "
-                    f"cos(radians(e.location_lng) - radians(${lng_param})) + "
-                    f"sin(radians(${lat_param})) * sin(radians(e.location_lat)))) <= ${max_dist_param}"
-                )
-                params.extend([location_lat, location_lng, max_distance_km])
+            if center:
+                conditions.extend(_radius_conditions(
+                    "e", self.geo_strategy, center[0], center[1], radius_km, params
+                ))
             
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
             
-            query += " GROUP BY e.id ORDER BY e.event_date ASC LIMIT 50"
+            query += group_by + f" ORDER BY e.event_date ASC LIMIT {limit}"
             
-            rows = await self.pool.fetch(query, *params)
-            events = [dict(row) for row in rows]
-            logger.info(f"Found {len(events)} events")
-            return events
+            statement = ":".join([
+                "find_events", self.geo_strategy if center else "any",
+                "group" if group_id else "all", "upcoming" if upcoming_only else "past",
+                "counters" if self.has_counter_columns else "join", str(limit),
+            ])
+            if statement not in self.statements:
+                self.statements.register(statement, query)
+            rows = await self._fetch(statement, *params)
+            return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Error finding events: {e}")
-            return []
+            return None
+    
+    async def stream_events(self, group_id: Optional[str] = None,
+                            location_lat: Optional[float] = None,
+                            location_lng: Optional[float] = None,
+                            max_distance_km: float = 10.0,
+                            upcoming_only: bool = True,
+                            page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[Event]:
+        """
+        Yield every matching event, soonest first, without a result limit.
+        
+        Keyset-paginated on (event_date, id); see stream_groups.
+        """
+        if not self.pool:
+            return
+        
+        if self.has_counter_columns:
+            query = "SELECT e.* FROM events e"
+            group_by = ""
+        else:
+            query = "SELECT e.*, COUNT(er.id) as rsvp_count FROM events e LEFT JOIN event_rsvps er ON e.id = er.event_id AND er.status = 'going'"
+            group_by = " GROUP BY e.id"
+        conditions = []
+        params = []
+        
+        if upcoming_only:
+            conditions.append("e.event_date > NOW()")
+        
+        if group_id:
+            params.append(group_id)
+            conditions.append(f"e.group_id = ${len(params)}")
+        
+        located = bool(location_lat and location_lng)
+        if located:
+            conditions.extend(_radius_conditions(
+                "e", self.geo_strategy, location_lat, location_lng, max_distance_km, params
+            ))
+        
+        first_sql, next_sql = self._keyset_statements(
+            query, conditions, group_by, len(params),
+            keys=("e.event_date", "e.id"), descending=False,
+        )
+        statement = ":".join([
+            "stream_events", self.geo_strategy if located else "any",
+            "group" if group_id else "all", "upcoming" if upcoming_only else "past",
+            "counters" if self.has_counter_columns else "join",
+        ])
+        if f"{statement}:first" not in self.statements:
+            self.statements.register(f"{statement}:first", first_sql)
+            self.statements.register(f"{statement}:next", next_sql)
+        
+        streamed = 0
+        rows = await self._fetch(f"{statement}:first", *params, page_size)
+        while rows:
+            for row in rows:
+                yield Event.from_row(row)
+            streamed += len(rows)
+            if len(rows) < page_size:
+                break
+            last = rows[-1]
+            rows = await self._fetch(f"{statement}:next", *params, page_size, last["event_date"], last["id"])
+        logger.info(f"Streamed {streamed} events")
+    
+    @staticmethod
+    def _keyset_statements(query: str, conditions: List[str], group_by: str, param_count: int,
+                           keys: tuple, descending: bool) -> tuple:
+        """
+        Build the first-page and next-page SQL for a listing ordered by the two `keys`.
+        
+        The page size is the parameter after the filter parameters; later pages also
+        take the last row's key values, which the row comparison resumes after.
+        """
+        direction = "DESC" if descending else "ASC"
+        limit = f" ORDER BY {keys[0]} {direction}, {keys[1]} {direction} LIMIT ${param_count + 1}"
+        cursor = (
+            f"({keys[0]}, {keys[1]}) {'<' if descending else '>'} "
+            f"(${param_count + 2}, ${param_count + 3})"
+        )
+        first_where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        next_where = " WHERE " + " AND ".join(conditions + [cursor])
+        return query + first_where + group_by + limit, query + next_where + group_by + limit
     
     async def rsvp_event(self, event_id: str, user_id: str, status: str = "going") -> bool:
-        """RSVP to an event"""
+        """RSVP to an event (events.rsvp_count follows status changes via trigger in the same statement)"""
         if not self.pool:
             return False
         
         try:
-            await self.pool.execute(
-                """
-                INSERT INTO event_rsvps (event_id, user_id, status)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (event_id, user_id) DO UPDATE SET status = $3, rsvp_at = CURRENT_TIMESTAMP
-                """,
-                event_id, user_id, status
-            )
+            await self._execute("rsvp_event", event_id, user_id, status)
+            self.event_cache.invalidate_row(event_id)
             logger.info(f"User {user_id} RSVPed to event {event_id} with status {status}")
             return True
         except Exception as e:
@@ -275,23 +791,15 @@ class Database:
             return False
     
     async def track_usage(self, user_id: str, session_id: str, minutes: int, service_type: str):
-        """Track usage for a user"""
-        if not self.pool:
+        """Track usage for a user (buffered, written in batches by UsageWriter)"""
+        if not self.pool or not self.usage_writer:
             return
         
-        try:
-            await self.pool.execute(
-                """
-                INSERT INTO usage_tracking (user_id, session_id, minutes_used, service_type)
-                VALUES ($1, $2, $3, $4)
-                """,
-                user_id, session_id, minutes, service_type
-            )
-        except Exception as e:
-            logger.error(f"Error tracking usage: {e}")
+        self.usage_writer.add(user_id, session_id, minutes, service_type)
     
-    async def get_user_usage(self, user_id: str, month_start: Optional[datetime] = None) -> int:
-        """Get user's usage minutes for current month"""
+    async def get_user_usage(self, user_id: str, month_start: Optional[datetime] = None,
+                             service_type: Optional[str] = None) -> int:
+        """Get user's usage minutes since month_start (default: current month), optionally for one service"""
         if not self.pool:
             return 0
         
@@ -299,18 +807,59 @@ class Database:
             if not month_start:
                 month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             
-            total = await self.pool.fetchval(
+            # Make sure rows still sitting in the usage buffer are counted, but don't hold a
+            # quota check through the retry backoff when the database is struggling
+            if self.usage_writer:
+                try:
+                    await asyncio.wait_for(self.usage_writer.flush(), timeout=USAGE_READ_FLUSH_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning("Usage flush timed out, reading usage without the buffered rows")
+            
+            # The rollup only has whole months; other start times need the raw rows
+            month_aligned = month_start == month_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            if self.has_usage_rollup and month_aligned:
+                query = """
+                    SELECT COALESCE(SUM(minutes_used), 0)
+                    FROM usage_monthly_rollup
+                    WHERE user_id = $1 AND month_start >= $2
                 """
-                SELECT COALESCE(SUM(minutes_used), 0)
-                FROM usage_tracking
-                WHERE user_id = $1 AND timestamp >= $2
-                """,
-                user_id, month_start
-            )
+                params = [user_id, month_start.date()]
+            else:
+                query = """
+                    SELECT COALESCE(SUM(minutes_used), 0)
+                    FROM usage_tracking
+                    WHERE user_id = $1 AND timestamp >= $2
+                """
+                params = [user_id, month_start]
+            
+            if service_type is not None:
+                params.append(service_type)
+                query += f" AND service_type = ${len(params)}"
+            
+            statement = ":".join([
+                "get_user_usage", "rollup" if self.has_usage_rollup and month_aligned else "raw",
+                "service" if service_type is not None else "total",
+            ])
+            if statement not in self.statements:
+                self.statements.register(statement, query)
+            total = await self._fetchval(statement, *params)
             return int(total) if total else 0
         except Exception as e:
             logger.error(f"Error getting user usage: {e}")
             return 0
+    
+    async def rebuild_usage_rollup(self, month_start: Optional[datetime] = None) -> int:
+        """Rebuild usage_monthly_rollup from raw usage_tracking rows (one month, or all when None)"""
+        if not self.pool or not self.has_usage_rollup:
+            return 0
+        
+        if self.usage_writer:
+            await self.usage_writer.flush()
+        
+        target_month = month_start.date() if month_start else None
+        rebuilt = await self.pool.fetchval("SELECT rebuild_usage_monthly_rollup($1)", target_month)
+        logger.info(f"Rebuilt {rebuilt} usage rollup rows for {target_month or 'all months'}")
+        return int(rebuilt)
 
 # Global database instance
 _db_instance: Optional[Database] = None
@@ -0,0 +1,78 @@
+-- Denormalized Counter Migrations
+-- Stores member_count on groups and rsvp_count on events so find_groups / find_events
+-- no longer LEFT JOIN + GROUP BY over group_members / event_rsvps on every call.
+--
+-- The counters are maintained by row triggers, so every write path (join_group,
+-- rsvp_event status changes, cascaded deletes) updates them in the same transaction.
+-- Check or repair drift with: python manage_counters.py check|repair
+
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS rsvp_count INTEGER NOT NULL DEFAULT 0;
+
+-- Function to update group member count
+CREATE OR REPLACE FUNCTION update_group_member_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE groups SET member_count = member_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.group_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.group_id;
+    ELSIF TG_OP = 'UPDATE' AND NEW.group_id IS DISTINCT FROM OLD.group_id THEN
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.group_id;
+        UPDATE groups SET member_count = member_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_group_on_member_change ON group_members;
+CREATE TRIGGER update_group_on_member_change AFTER INSERT OR UPDATE OF group_id OR DELETE ON group_members
+    FOR EACH ROW EXECUTE FUNCTION update_group_member_count();
+
+-- Function to update event RSVP count (only 'going' RSVPs are counted)
+CREATE OR REPLACE FUNCTION update_event_rsvp_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.event_id IS NOT DISTINCT FROM OLD.event_id
+       AND (NEW.status = 'going') IS NOT DISTINCT FROM (OLD.status = 'going') THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'going' THEN
+        UPDATE events SET rsvp_count = GREATEST(rsvp_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.event_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'going' THEN
+        UPDATE events SET rsvp_count = rsvp_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.event_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_event_on_rsvp_change ON event_rsvps;
+CREATE TRIGGER update_event_on_rsvp_change AFTER INSERT OR UPDATE OF event_id, status OR DELETE ON event_rsvps
+    FOR EACH ROW EXECUTE FUNCTION update_event_rsvp_count();
+
+-- Backfill existing rows
+UPDATE groups g
+SET member_count = counts.actual
+FROM (
+    SELECT g2.id, COUNT(gm.id) AS actual
+    FROM groups g2 LEFT JOIN group_members gm ON gm.group_id = g2.id
+    GROUP BY g2.id
+) counts
+WHERE g.id = counts.id AND g.member_count <> counts.actual;
+
+UPDATE events e
+SET rsvp_count = counts.actual
+FROM (
+    SELECT e2.id, COUNT(er.id) AS actual
+    FROM events e2 LEFT JOIN event_rsvps er ON er.event_id = e2.id AND er.status = 'going'
+    GROUP BY e2.id
+) counts
+WHERE e.id = counts.id AND e.rsvp_count <> counts.actual;
+
+-- Discovery listings order by these columns
+CREATE INDEX IF NOT EXISTS idx_groups_created ON groups(created_at DESC);
+
+COMMENT ON COLUMN groups.member_count IS 'Number of group_members rows, maintained by trigger';
+COMMENT ON COLUMN events.rsvp_count IS 'Number of event_rsvps rows with status going, maintained by trigger';
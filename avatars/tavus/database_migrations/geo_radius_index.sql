@@ -0,0 +1,125 @@
+-- Geo Radius Index Migrations
+-- Makes find_groups / find_events radius lookups index-driven instead of
+-- evaluating the Haversine formula on every row.
+--
+-- Database.connect() picks the fastest strategy available at runtime:
+--   1. earthdistance: GiST index on ll_to_earth(lat, lng), queried with earth_box()
+--   2. point: core GiST index on point(lng, lat), queried with a bounding box (no extension needed)
+--   3. geohash: B-tree on a geohash column, queried with a 3x3 block of prefix ranges
+--   4. bbox: the existing (location_lat, location_lng) B-tree with a bounding-box prefilter
+
+-- Try to enable earthdistance (needs cube). Neon supports both; skip quietly where unavailable.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS cube;
+    CREATE EXTENSION IF NOT EXISTS earthdistance;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'earthdistance extension not available, falling back to geohash index: %', SQLERRM;
+END;
+$$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'earthdistance') THEN
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_groups_earth ON groups
+                 USING gist (ll_to_earth(location_lat::float8, location_lng::float8))
+                 WHERE location_lat IS NOT NULL AND location_lng IS NOT NULL';
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_events_earth ON events
+                 USING gist (ll_to_earth(location_lat::float8, location_lng::float8))
+                 WHERE location_lat IS NOT NULL AND location_lng IS NOT NULL';
+    END IF;
+END;
+$$;
+
+-- 2-D GiST on plain points, built into PostgreSQL
+CREATE INDEX IF NOT EXISTS idx_groups_point ON groups
+    USING gist (point(location_lng::float8, location_lat::float8))
+    WHERE location_lat IS NOT NULL AND location_lng IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_events_point ON events
+    USING gist (point(location_lng::float8, location_lat::float8))
+    WHERE location_lat IS NOT NULL AND location_lng IS NOT NULL;
+
+-- Geohash fallback (always created so the app can use it if the GiST indexes are dropped).
+-- "C" collation makes prefix range scans (geohash >= 'ue7k' AND geohash < 'ue7k~') index-friendly.
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) COLLATE "C";
+ALTER TABLE events ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) COLLATE "C";
+
+-- Function to encode a coordinate as a geohash (matches geo.geohash_encode)
+CREATE OR REPLACE FUNCTION geohash_encode(lat DOUBLE PRECISION, lng DOUBLE PRECISION, hash_length INTEGER DEFAULT 9)
+RETURNS TEXT AS $$
+DECLARE
+    base32 CONSTANT TEXT := '0123456789bcdefghjkmnpqrstuvwxyz';
+    lat_min DOUBLE PRECISION := -90;
+    lat_max DOUBLE PRECISION := 90;
+    lng_min DOUBLE PRECISION := -180;
+    lng_max DOUBLE PRECISION := 180;
+    mid DOUBLE PRECISION;
+    bits INTEGER := 0;
+    bit_count INTEGER := 0;
+    even BOOLEAN := TRUE;
+    result TEXT := '';
+BEGIN
+    IF lat IS NULL OR lng IS NULL THEN
+        RETURN NULL;
+    END IF;
+    WHILE length(result) < hash_length LOOP
+        IF even THEN
+            mid := (lng_min + lng_max) / 2;
+            IF lng >= mid THEN
+                bits := bits * 2 + 1;
+                lng_min := mid;
+            ELSE
+                bits := bits * 2;
+                lng_max := mid;
+            END IF;
+        ELSE
+            mid := (lat_min + lat_max) / 2;
+            IF lat >= mid THEN
+                bits := bits * 2 + 1;
+                lat_min := mid;
+            ELSE
+                bits := bits * 2;
+                lat_max := mid;
+            END IF;
+        END IF;
+        even := NOT even;
+        bit_count := bit_count + 1;
+        IF bit_count = 5 THEN
+            result := result || substr(base32, bits + 1, 1);
+            bits := 0;
+            bit_count := 0;
+        END IF;
+    END LOOP;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Function to keep the geohash column in sync with location_lat / location_lng
+CREATE OR REPLACE FUNCTION update_geohash_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.geohash = geohash_encode(NEW.location_lat::float8, NEW.location_lng::float8);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_groups_geohash ON groups;
+CREATE TRIGGER update_groups_geohash BEFORE INSERT OR UPDATE OF location_lat, location_lng ON groups
+    FOR EACH ROW EXECUTE FUNCTION update_geohash_column();
+
+DROP TRIGGER IF EXISTS update_events_geohash ON events;
+CREATE TRIGGER update_events_geohash BEFORE INSERT OR UPDATE OF location_lat, location_lng ON events
+    FOR EACH ROW EXECUTE FUNCTION update_geohash_column();
+
+-- Backfill existing rows
+UPDATE groups SET geohash = geohash_encode(location_lat::float8, location_lng::float8)
+WHERE geohash IS NULL AND location_lat IS NOT NULL AND location_lng IS NOT NULL;
+
+UPDATE events SET geohash = geohash_encode(location_lat::float8, location_lng::float8)
+WHERE geohash IS NULL AND location_lat IS NOT NULL AND location_lng IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_groups_geohash ON groups(geohash);
+CREATE INDEX IF NOT EXISTS idx_events_geohash ON events(geohash);
+
+COMMENT ON COLUMN groups.geohash IS 'Geohash (precision 9) of location_lat/location_lng, maintained by trigger';
+COMMENT ON COLUMN events.geohash IS 'Geohash (precision 9) of location_lat/location_lng, maintained by trigger';
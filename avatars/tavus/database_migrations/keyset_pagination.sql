@@ -0,0 +1,16 @@
+-- Keyset Pagination Migrations
+-- Backs Database.stream_groups / stream_events, which page through listings with
+-- WHERE (created_at, id) < (last_created_at, last_id) instead of LIMIT/OFFSET,
+-- so every page is one index range scan no matter how deep the export goes.
+
+-- Row comparisons skip NULLs, so every group needs a created_at
+UPDATE groups SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE groups ALTER COLUMN created_at SET NOT NULL;
+
+-- Composite indexes matching the listing order, with id as the tie-breaker
+CREATE INDEX IF NOT EXISTS idx_groups_created_id ON groups(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_events_date_id ON events(event_date, id);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_groups_created;
+DROP INDEX IF EXISTS idx_events_date;
@@ -0,0 +1,77 @@
+-- Usage Monthly Rollup Migrations
+-- Keeps per-user / per-month / per-service_type minute totals so get_user_usage
+-- reads a handful of primary-key rows instead of summing every usage_tracking row.
+
+CREATE TABLE IF NOT EXISTS usage_monthly_rollup (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month_start DATE NOT NULL, -- first day of the month
+    service_type VARCHAR(50) NOT NULL, -- 'hedra', 'stt', 'tts', 'llm' ('' when not set)
+    minutes_used BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month_start, service_type)
+);
+
+-- Function to fold newly inserted usage rows into the rollup.
+-- Statement-level with a transition table, so a batched COPY from UsageWriter
+-- costs one upsert per (user, month, service_type) rather than one per row.
+CREATE OR REPLACE FUNCTION update_usage_monthly_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO usage_monthly_rollup (user_id, month_start, service_type, minutes_used)
+    SELECT user_id,
+           date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date,
+           COALESCE(service_type, ''),
+           SUM(COALESCE(minutes_used, 0))
+    FROM new_usage_rows
+    WHERE user_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (user_id, month_start, service_type) DO UPDATE
+    SET minutes_used = usage_monthly_rollup.minutes_used + EXCLUDED.minutes_used,
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_usage_rollup_on_insert ON usage_tracking;
+CREATE TRIGGER update_usage_rollup_on_insert AFTER INSERT ON usage_tracking
+    REFERENCING NEW TABLE AS new_usage_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_usage_monthly_rollup();
+
+-- Function to rebuild the rollup from raw usage_tracking rows.
+-- Pass a month (any date inside it) to rebuild just that month, or NULL for everything.
+-- Blocks usage inserts for the duration so no row is counted twice or missed.
+CREATE OR REPLACE FUNCTION rebuild_usage_monthly_rollup(target_month DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month_from DATE := date_trunc('month', target_month)::date;
+    rebuilt INTEGER;
+BEGIN
+    LOCK TABLE usage_tracking IN SHARE MODE;
+
+    DELETE FROM usage_monthly_rollup
+    WHERE month_from IS NULL OR month_start = month_from;
+
+    INSERT INTO usage_monthly_rollup (user_id, month_start, service_type, minutes_used)
+    SELECT user_id,
+           date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date,
+           COALESCE(service_type, ''),
+           SUM(COALESCE(minutes_used, 0))
+    FROM usage_tracking
+    WHERE user_id IS NOT NULL
+      AND (month_from IS NULL
+           OR (timestamp >= month_from AND timestamp < month_from + INTERVAL '1 month'))
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Initial fill from existing usage rows
+SELECT rebuild_usage_monthly_rollup(NULL);
+
+-- Scheduled reconciliation (run nightly, e.g. from a cron job):
+-- SELECT rebuild_usage_monthly_rollup(CURRENT_DATE);
+-- or: python reconcile_usage_rollup.py
+
+COMMENT ON TABLE usage_monthly_rollup IS 'Per-user monthly usage minutes by service_type, maintained by trigger on usage_tracking';
@@ -22,7 +22,8 @@ CREATE TABLE IF NOT EXISTS groups (
     location_lat DECIMAL(10, 8),
     location_lng DECIMAL(11, 8),
     created_by UUID REFERENCES users(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    member_count INTEGER NOT NULL DEFAULT 0, -- maintained by update_group_member_count()
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- keyset pagination key, with id
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -47,6 +48,7 @@ CREATE TABLE IF NOT EXISTS events (
     location_lng DECIMAL(11, 8),
     group_id UUID REFERENCES groups(id) ON DELETE SET NULL,
     created_by UUID REFERENCES users(id),
+    rsvp_count INTEGER NOT NULL DEFAULT 0, -- RSVPs with status 'going', maintained by update_event_rsvp_count()
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -99,10 +101,21 @@ CREATE TABLE IF NOT EXISTS usage_tracking (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Monthly usage totals, maintained by update_usage_monthly_rollup()
+CREATE TABLE IF NOT EXISTS usage_monthly_rollup (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month_start DATE NOT NULL, -- first day of the month
+    service_type VARCHAR(50) NOT NULL, -- 'hedra', 'stt', 'tts', 'llm' ('' when not set)
+    minutes_used BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month_start, service_type)
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_groups_type ON groups(group_type);
 CREATE INDEX IF NOT EXISTS idx_groups_location ON groups(location_lat, location_lng);
-CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date);
+CREATE INDEX IF NOT EXISTS idx_groups_created_id ON groups(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_events_date_id ON events(event_date, id);
 CREATE INDEX IF NOT EXISTS idx_events_location ON events(location_lat, location_lng);
 CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id);
 CREATE INDEX IF NOT EXISTS idx_group_members_group ON group_members(group_id);
@@ -138,30 +151,93 @@ CREATE OR REPLACE FUNCTION update_group_member_count()
 RETURNS TRIGGER AS $$
 BEGIN
     IF TG_OP = 'INSERT' THEN
-        UPDATE groups SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.group_id;
+        UPDATE groups SET member_count = member_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.group_id;
     ELSIF TG_OP = 'DELETE' THEN
-        UPDATE groups SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.group_id;
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.group_id;
+    ELSIF TG_OP = 'UPDATE' AND NEW.group_id IS DISTINCT FROM OLD.group_id THEN
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.group_id;
+        UPDATE groups SET member_count = member_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.group_id;
     END IF;
     RETURN NULL;
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_group_on_member_change AFTER INSERT OR DELETE ON group_members
+CREATE TRIGGER update_group_on_member_change AFTER INSERT OR UPDATE OF group_id OR DELETE ON group_members
     FOR EACH ROW EXECUTE FUNCTION update_group_member_count();
 
--- Function to update event RSVP count
+-- Function to update event RSVP count (only 'going' RSVPs are counted)
 CREATE OR REPLACE FUNCTION update_event_rsvp_count()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF TG_OP = 'INSERT' THEN
-        UPDATE events SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.event_id;
-    ELSIF TG_OP = 'DELETE' THEN
-        UPDATE events SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.event_id;
+    IF TG_OP = 'UPDATE'
+       AND NEW.event_id IS NOT DISTINCT FROM OLD.event_id
+       AND (NEW.status = 'going') IS NOT DISTINCT FROM (OLD.status = 'going') THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'going' THEN
+        UPDATE events SET rsvp_count = GREATEST(rsvp_count - 1, 0), updated_at = CURRENT_TIMESTAMP WHERE id = OLD.event_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'going' THEN
+        UPDATE events SET rsvp_count = rsvp_count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.event_id;
     END IF;
     RETURN NULL;
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_event_on_rsvp_change AFTER INSERT OR DELETE ON event_rsvps
+CREATE TRIGGER update_event_on_rsvp_change AFTER INSERT OR UPDATE OF event_id, status OR DELETE ON event_rsvps
     FOR EACH ROW EXECUTE FUNCTION update_event_rsvp_count();
 
+-- Function to fold newly inserted usage rows into the rollup.
+-- Statement-level with a transition table, so a batched COPY from UsageWriter
+-- costs one upsert per (user, month, service_type) rather than one per row.
+CREATE OR REPLACE FUNCTION update_usage_monthly_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO usage_monthly_rollup (user_id, month_start, service_type, minutes_used)
+    SELECT user_id,
+           date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date,
+           COALESCE(service_type, ''),
+           SUM(COALESCE(minutes_used, 0))
+    FROM new_usage_rows
+    WHERE user_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (user_id, month_start, service_type) DO UPDATE
+    SET minutes_used = usage_monthly_rollup.minutes_used + EXCLUDED.minutes_used,
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_usage_rollup_on_insert AFTER INSERT ON usage_tracking
+    REFERENCING NEW TABLE AS new_usage_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_usage_monthly_rollup();
+
+-- Function to rebuild the rollup from raw usage_tracking rows.
+-- Pass a month (any date inside it) to rebuild just that month, or NULL for everything.
+-- Blocks usage inserts for the duration so no row is counted twice or missed.
+CREATE OR REPLACE FUNCTION rebuild_usage_monthly_rollup(target_month DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month_from DATE := date_trunc('month', target_month)::date;
+    rebuilt INTEGER;
+BEGIN
+    LOCK TABLE usage_tracking IN SHARE MODE;
+
+    DELETE FROM usage_monthly_rollup
+    WHERE month_from IS NULL OR month_start = month_from;
+
+    INSERT INTO usage_monthly_rollup (user_id, month_start, service_type, minutes_used)
+    SELECT user_id,
+           date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date,
+           COALESCE(service_type, ''),
+           SUM(COALESCE(minutes_used, 0))
+    FROM usage_tracking
+    WHERE user_id IS NOT NULL
+      AND (month_from IS NULL
+           OR (timestamp >= month_from AND timestamp < month_from + INTERVAL '1 month'))
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
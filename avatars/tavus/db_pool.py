@@ -0,0 +1,133 @@
+"""
+Connection pool helpers for Knuut AI
+Prepared-statement registry and pool metrics used by database.py
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+
+logger = logging.getLogger("database")
+
+
+class StatementRegistry:
+    """
+    Canonical SQL statements, prepared once per pooled connection.
+
+    asyncpg keeps an LRU cache of prepared statements on every connection, keyed by
+    the SQL text, which survives the connection being released and re-acquired. Pass
+    `prepare_all` as the pool's `init` hook to fill that cache for every registered
+    statement when a connection is opened; statements registered later (e.g. the
+    find_groups variant for the detected geo strategy) are prepared the first time a
+    connection runs them and reused after that. With `enabled=False` the pool should
+    be created with statement_cache_size=0, for poolers that can't keep prepared
+    statements.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._statements: Dict[str, str] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._statements
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def register(self, name: str, sql: str) -> str:
+        """Register (or replace) the SQL for name and return name"""
+        self._statements[name] = sql
+        return name
+
+    def sql(self, name: str) -> str:
+        return self._statements[name]
+
+    async def prepare_all(self, conn: asyncpg.Connection):
+        """Pool `init` hook: prepare every registered statement on a new connection"""
+        if not self.enabled:
+            return
+        for sql in list(self._statements.values()):
+            # executemany() with no rows parses and caches the statement without running it
+            await conn.executemany(sql, [])
+        logger.debug(f"Prepared {len(self._statements)} statements on new connection")
+
+    async def fetch(self, conn: asyncpg.Connection, name: str, *args) -> List[asyncpg.Record]:
+        return await conn.fetch(self._statements[name], *args)
+
+    async def fetchrow(self, conn: asyncpg.Connection, name: str, *args) -> Optional[asyncpg.Record]:
+        return await conn.fetchrow(self._statements[name], *args)
+
+    async def fetchval(self, conn: asyncpg.Connection, name: str, *args) -> Any:
+        return await conn.fetchval(self._statements[name], *args)
+
+    async def execute(self, conn: asyncpg.Connection, name: str, *args) -> str:
+        """Run a statement and return its status message (e.g. 'INSERT 0 1')"""
+        return await conn.execute(self._statements[name], *args)
+
+
+class PoolMetrics:
+    """Tracks acquire wait time and pool occupancy, logged every `interval` seconds"""
+
+    def __init__(self, pool: asyncpg.Pool, interval: float = 60.0):
+        self.pool = pool
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self.acquires = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """pool.acquire() that records how long the caller waited for a connection"""
+        start = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            wait = time.perf_counter() - start
+            self.acquires += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            yield conn
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current pool occupancy plus acquire waits since the last log line"""
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "acquires": self.acquires,
+            "wait_avg_ms": (self.wait_total / self.acquires * 1000) if self.acquires else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+        }
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            stats = self.snapshot()
+            logger.info(
+                f"Pool: size={stats['size']}/{stats['max_size']} in_use={stats['in_use']} "
+                f"idle={stats['idle']} acquires={stats['acquires']} "
+                f"wait_avg={stats['wait_avg_ms']:.1f}ms wait_max={stats['wait_max_ms']:.1f}ms"
+            )
+            self._reset_window()
@@ -0,0 +1,108 @@
+"""
+Geo helpers for Knuut AI
+Bounding boxes, geohash cells and great-circle distance used by the radius queries in database.py
+"""
+import math
+from typing import List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, Optional[float], Optional[float]]:
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km.
+
+    Longitude bounds are None when the box touches a pole or crosses the antimeridian,
+    in which case only the latitude range can be used as a prefilter.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(-90.0, lat - dlat)
+    max_lat = min(90.0, lat + dlat)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, None, None
+
+    dlng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+    if dlng >= 180.0 or min_lng < -180.0 or max_lng > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell at the given precision"""
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lng_bits = total_bits - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_precision_for_radius(lat: float, radius_km: float) -> int:
+    """Longest geohash prefix whose cells around lat are still at least radius_km on each side"""
+    cos_lat = math.cos(math.radians(min(89.9, abs(lat) + radius_km / KM_PER_DEGREE_LAT)))
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        if min(height * KM_PER_DEGREE_LAT, width * KM_PER_DEGREE_LAT * cos_lat) >= radius_km:
+            return precision
+    return 1
+
+
+def geohash_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+    """
+    Geohash prefixes covering a circle of radius_km around (lat, lng).
+
+    Uses the cell containing the centre plus its eight neighbours at a precision
+    where a cell is at least as large as the radius, so the 3x3 block always
+    contains the whole circle.
+    """
+    precision = geohash_precision_for_radius(lat, radius_km)
+    dlat, dlng = geohash_cell_size(precision)
+
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            cell_lat = min(90.0, max(-90.0, lat + i * dlat))
+            cell_lng = ((lng + j * dlng + 180.0) % 360.0) - 180.0
+            cells.add(geohash_encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Check or repair groups.member_count / events.rsvp_count
+
+Usage:
+    python manage_counters.py check    # report drifted counters, exit 1 if any
+    python manage_counters.py repair   # rewrite drifted counters from the actual rows
+"""
+import argparse
+import asyncio
+import sys
+
+from database import Database
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["check", "repair"])
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    if not db.pool:
+        print("❌ DATABASE_URL not found in .env file")
+        return 1
+    if not db.has_counter_columns:
+        print("❌ Counter columns missing. Run database_migrations/denormalized_counters.sql first.")
+        await db.close()
+        return 1
+
+    try:
+        if args.command == "repair":
+            repaired = await db.repair_counters()
+            print(f"🔧 Repaired {repaired['groups']} group(s) and {repaired['events']} event(s)")
+            return 0
+
+        drift = await db.check_counters()
+        for table, rows in drift.items():
+            for row in rows:
+                print(f"   ⚠️  {table} {row['id']}: stored={row['stored']} actual={row['actual']}")
+        total = len(drift["groups"]) + len(drift["events"])
+        if total:
+            print(f"❌ {total} counter(s) out of sync. Run: python manage_counters.py repair")
+            return 1
+        print("✅ All counters consistent")
+        return 0
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
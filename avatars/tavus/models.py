@@ -0,0 +1,85 @@
+"""
+Data models for Knuut AI
+Community groups and events, shared by the agent (tavus.py) and database.py
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Mapping, Optional
+
+
+def _text(value: Any) -> str:
+    """Database value as the string form the agent uses (UUIDs, ISO timestamps)"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _coordinate(value: Any) -> Optional[float]:
+    """DECIMAL coordinate as float"""
+    return float(value) if value is not None else None
+
+
+@dataclass
+class Group:
+    """Class to represent a community group."""
+    id: str
+    name: str
+    description: str
+    group_type: str  # e.g., "mothers_with_kids", "language_exchange", "sports"
+    member_count: int = 0
+    location_lat: Optional[float] = None
+    location_lng: Optional[float] = None
+    location_name: Optional[str] = None
+    created_by: str = ""
+    created_at: str = ""
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Group":
+        """Build a Group from a groups row (asyncpg Record or dict)"""
+        return cls(
+            id=_text(row["id"]),
+            name=row["name"],
+            description=row["description"] or "",
+            group_type=row["group_type"],
+            member_count=row["member_count"] or 0,
+            location_lat=_coordinate(row["location_lat"]),
+            location_lng=_coordinate(row["location_lng"]),
+            location_name=row["location_name"],
+            created_by=_text(row["created_by"]),
+            created_at=_text(row["created_at"]),
+        )
+
+
+@dataclass
+class Event:
+    """Class to represent an event/meetup."""
+    id: str
+    title: str
+    description: str
+    event_date: str  # ISO format
+    location_name: str
+    location_lat: Optional[float] = None
+    location_lng: Optional[float] = None
+    group_id: Optional[str] = None
+    rsvp_count: int = 0
+    created_by: str = ""
+    created_at: str = ""
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Event":
+        """Build an Event from an events row (asyncpg Record or dict)"""
+        return cls(
+            id=_text(row["id"]),
+            title=row["title"],
+            description=row["description"] or "",
+            event_date=_text(row["event_date"]),
+            location_name=row["location_name"] or "",
+            location_lat=_coordinate(row["location_lat"]),
+            location_lng=_coordinate(row["location_lng"]),
+            group_id=_text(row["group_id"]) or None,
+            rsvp_count=row["rsvp_count"] or 0,
+            created_by=_text(row["created_by"]),
+            created_at=_text(row["created_at"]),
+        )
@@ -0,0 +1,156 @@
+"""
+Query cache for Knuut AI
+TTL + LRU read-through cache for group/event discovery results in database.py
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from geo import haversine_km
+
+# Coordinates are rounded to this many decimals before they become part of a cache key
+# (2 decimals ~ 1.1 km cells), so nearby users share entries
+LOCATION_CELL_DECIMALS = 2
+
+
+def location_cell(location_lat: Optional[float], location_lng: Optional[float]) -> Optional[Tuple[float, float]]:
+    """Round a coordinate to its cache cell, or None when no location filter is used"""
+    if not (location_lat and location_lng):
+        return None
+    return round(location_lat, LOCATION_CELL_DECIMALS), round(location_lng, LOCATION_CELL_DECIMALS)
+
+
+def cell_reach_km(cell: Tuple[float, float]) -> float:
+    """Farthest a point that rounds to this cell can be from its centre (the half-diagonal)"""
+    half = 0.5 * 10 ** -LOCATION_CELL_DECIMALS
+    lat, lng = cell
+    return max(
+        haversine_km(lat, lng, corner_lat, lng + half)
+        for corner_lat in (max(-90.0, lat - half), min(90.0, lat + half))
+    ) + 1e-6
+
+
+def rows_within(rows: List[Dict[str, Any]], location_lat: float, location_lng: float,
+                max_distance_km: float, limit: int, complete: bool) -> Optional[List[Dict[str, Any]]]:
+    """
+    The first `limit` rows located within max_distance_km of a point, in their original order.
+
+    rows is a cell-wide result covering every caller in the cell. If it was cut off by its
+    LIMIT (complete=False) and has fewer than `limit` matches, a match may have been cut
+    off with it, so None is returned and the caller should query around its own point.
+    """
+    matches = []
+    for row in rows:
+        if row.get("location_lat") is None or row.get("location_lng") is None:
+            continue
+        if haversine_km(location_lat, location_lng, float(row["location_lat"]), float(row["location_lng"])) <= max_distance_km:
+            matches.append(row)
+            if len(matches) == limit:
+                return matches
+    return matches if complete else None
+
+
+@dataclass
+class CacheEntry:
+    """A cached discovery result and what it depends on"""
+    value: List[Dict[str, Any]]
+    expires_at: float
+    filters: Dict[str, Any]
+    center: Optional[Tuple[float, float]] = None
+    radius_km: Optional[float] = None
+    row_ids: frozenset = field(default_factory=frozenset)
+
+    def covers(self, location_lat: Optional[float], location_lng: Optional[float]) -> bool:
+        """Whether a row at this location could appear in the cached result"""
+        if self.center is None:
+            return True
+        if location_lat is None or location_lng is None:
+            return False
+        return haversine_km(self.center[0], self.center[1], location_lat, location_lng) <= self.radius_km
+
+
+class QueryCache:
+    """
+    LRU cache with per-entry TTL.
+
+    Entries remember their filters, search circle and the ids of the rows they
+    returned so writes can invalidate exactly the results they affect.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached rows for key, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(row) for row in entry.value]
+
+    def set(self, key: Hashable, value: List[Dict[str, Any]], filters: Dict[str, Any],
+            center: Optional[Tuple[float, float]] = None, radius_km: Optional[float] = None):
+        """Store rows for key along with the filters they were queried with"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = CacheEntry(
+            value=[dict(row) for row in value],
+            expires_at=self._clock() + self.ttl_seconds,
+            filters=filters,
+            center=center,
+            radius_km=radius_km,
+            row_ids=frozenset(str(row["id"]) for row in value if "id" in row),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[CacheEntry], bool]) -> int:
+        """Drop every entry matching predicate and return how many were dropped"""
+        stale = [key for key, entry in self._entries.items() if predicate(entry)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_row(self, row_id: Any) -> int:
+        """Drop every entry whose result contains the given row id"""
+        row_id = str(row_id)
+        return self.invalidate(lambda entry: row_id in entry.row_ids)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rebuild usage_monthly_rollup from raw usage_tracking rows
+
+Usage:
+    python reconcile_usage_rollup.py              # rebuild the current month
+    python reconcile_usage_rollup.py --month 2025-01
+    python reconcile_usage_rollup.py --all        # rebuild every month
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from database import Database
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--month", help="month to rebuild, as YYYY-MM")
+    group.add_argument("--all", action="store_true", help="rebuild every month")
+    args = parser.parse_args()
+
+    if args.all:
+        month_start = None
+    elif args.month:
+        month_start = datetime.strptime(args.month, "%Y-%m")
+    else:
+        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    db = Database()
+    await db.connect()
+    if not db.pool:
+        print("❌ DATABASE_URL not found in .env file")
+        return 1
+    if not db.has_usage_rollup:
+        print("❌ usage_monthly_rollup missing. Run database_migrations/usage_monthly_rollup.sql first.")
+        await db.close()
+        return 1
+
+    try:
+        rebuilt = await db.rebuild_usage_rollup(month_start)
+        label = month_start.strftime("%Y-%m") if month_start else "all months"
+        print(f"✅ Rebuilt {rebuilt} rollup row(s) for {label}")
+        return 0
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -31,6 +31,7 @@ from livekit.plugins.turn_detector.english import EnglishModel
 from livekit.plugins import silero, openai, deepgram
 import asyncio
 from database import get_database, Database
+from models import Group, Event
 
 load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / '.env')
 
@@ -73,35 +74,6 @@ class Quiz:
     id: str
     questions: List[QuizQuestion]
 
-@dataclass
-class Group:
-    """Class to represent a community group."""
-    id: str
-    name: str
-    description: str
-    group_type: str  # e.g., "mothers_with_kids", "language_exchange", "sports"
-    member_count: int = 0
-    location_lat: Optional[float] = None
-    location_lng: Optional[float] = None
-    location_name: Optional[str] = None
-    created_by: str = ""
-    created_at: str = ""
-
-@dataclass
-class Event:
-    """Class to represent an event/meetup."""
-    id: str
-    title: str
-    description: str
-    event_date: str  # ISO format
-    location_name: str
-    location_lat: Optional[float] = None
-    location_lng: Optional[float] = None
-    group_id: Optional[str] = None
-    rsvp_count: int = 0
-    created_by: str = ""
-    created_at: str = ""
-
 @dataclass
 class UserData:
     """Class to store user data during a session."""
@@ -0,0 +1,115 @@
+"""
+Tests for the discovery cache in Database.find_groups, with the SQL query replaced by an
+in-memory one (no database needed)
+"""
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+
+import database
+from database import Database
+from geo import haversine_km
+from query_cache import location_cell
+
+HELSINKI = (60.17, 24.94)
+
+
+def make_groups(count: int, spread: float = 0.3, seed: int = 1):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": f"group-{i}",
+            "group_type": "sports",
+            "location_lat": HELSINKI[0] + rng.uniform(-spread, spread),
+            "location_lng": HELSINKI[1] + rng.uniform(-spread, spread),
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def fake_database(groups):
+    """A Database whose _query_groups evaluates the radius query over `groups`"""
+    db = Database()
+    db.pool = object()
+    db.queries = []
+
+    async def query_groups(group_type, center, radius_km, limit):
+        db.queries.append((center, radius_km, limit))
+        rows = [
+            g for g in groups
+            if center is None or haversine_km(center[0], center[1], g["location_lat"], g["location_lng"]) <= radius_km
+        ]
+        rows.sort(key=lambda g: g["created_at"], reverse=True)
+        return [dict(g) for g in rows[:limit]]
+
+    db._query_groups = query_groups
+    return db
+
+
+def exact(groups, lat, lng, max_distance_km, limit=database.DISCOVERY_LIMIT):
+    rows = [g for g in groups if haversine_km(lat, lng, g["location_lat"], g["location_lng"]) <= max_distance_km]
+    rows.sort(key=lambda g: g["created_at"], reverse=True)
+    return [g["id"] for g in rows[:limit]]
+
+
+def test_callers_near_a_cell_edge_get_exact_results():
+    groups = make_groups(150)
+    db = fake_database(groups)
+    # Two opposite corners of one cell (~0.6 km from its centre, ~1.2 km apart) and the centre itself
+    callers = [(60.1651, 24.9351), (60.1749, 24.9449), (60.17, 24.94)]
+    assert len({location_cell(lat, lng) for lat, lng in callers}) == 1
+
+    async def main():
+        return [await db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=5.0) for lat, lng in callers]
+
+    results = asyncio.run(main())
+    for (lat, lng), result in zip(callers, results):
+        assert [g["id"] for g in result] == exact(groups, lat, lng, 5.0)
+    assert len(db.queries) == 1  # one cell-wide query served all three
+    assert db.group_cache.hits == 2
+
+
+def offset(lat, lng, north_km, east_km):
+    return lat + north_km / 111.32, lng + east_km / (111.32 * math.cos(math.radians(lat)))
+
+
+def test_radius_is_measured_from_the_caller_not_the_cell_centre():
+    # The caller sits in the south-west corner of the 60.17,24.94 cell
+    lat, lng = 60.1651, 24.9351
+    d = 4.9 / math.sqrt(2)
+    far = 5.1 / math.sqrt(2)
+    groups = []
+    for i, (north, east) in enumerate([(-d, -d), (far, far)]):
+        group_lat, group_lng = offset(lat, lng, north, east)
+        groups.append({
+            "id": f"group-{i}", "group_type": "sports",
+            "location_lat": group_lat, "location_lng": group_lng,
+            "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+        })
+    # 4.9 km from the caller but farther than 5 km from the cell centre, and the other way round
+    assert haversine_km(*HELSINKI, groups[0]["location_lat"], groups[0]["location_lng"]) > 5.0
+    assert haversine_km(*HELSINKI, groups[1]["location_lat"], groups[1]["location_lng"]) < 5.0
+    db = fake_database(groups)
+
+    result = asyncio.run(db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=5.0))
+    assert [g["id"] for g in result] == ["group-0"]
+
+
+def test_cut_off_cell_result_falls_back_to_an_exact_query():
+    # Dense enough that the cell-wide query hits CELL_QUERY_LIMIT
+    groups = make_groups(2000, spread=0.02)
+    db = fake_database(groups)
+    lat, lng = 60.1651, 24.9351
+
+    async def main():
+        # The cell-wide result is cut off with fewer than DISCOVERY_LIMIT matches for this caller
+        await db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=0.5)
+        return await db.find_groups(location_lat=lat, location_lng=lng, max_distance_km=0.5)
+
+    result = asyncio.run(main())
+    assert [g["id"] for g in result] == exact(groups, lat, lng, 0.5)
+    assert db.queries[0][2] == database.CELL_QUERY_LIMIT
+    assert db.queries[-1] == ((lat, lng), 0.5, database.DISCOVERY_LIMIT)
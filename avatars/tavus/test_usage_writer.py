@@ -0,0 +1,107 @@
+"""
+Tests for UsageWriter against a fake connection pool (no database needed)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from usage_writer import UsageWriter
+
+
+class FakeConnection:
+    def __init__(self, pool: "FakePool"):
+        self.pool = pool
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.pool.copies_started += 1
+        await asyncio.sleep(self.pool.copy_delay)
+        if self.pool.failing:
+            raise OSError("connection refused")
+        self.pool.rows.extend(records)
+
+
+class FakePool:
+    def __init__(self, copy_delay: float = 0.0, failing: bool = False):
+        self.copy_delay = copy_delay
+        self.failing = failing
+        self.copies_started = 0
+        self.rows = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self)
+
+
+def add_rows(writer: UsageWriter, count: int):
+    for i in range(count):
+        writer.add(f"user-{i}", "session", 1, "llm")
+
+
+async def wait_for_copy(pool: FakePool):
+    while not pool.copies_started:
+        await asyncio.sleep(0.001)
+
+
+def test_close_during_slow_copy_writes_every_row():
+    async def main():
+        pool = FakePool(copy_delay=0.1)
+        writer = UsageWriter(pool, flush_size=5, flush_interval=60)
+        add_rows(writer, 5)
+        await wait_for_copy(pool)
+        add_rows(writer, 3)  # buffered while the COPY is in flight
+        await writer.close()
+        return pool, writer
+
+    pool, writer = asyncio.run(main())
+    assert len(pool.rows) == 8
+    assert writer.rows_written == 8
+    assert writer.rows_dropped == 0
+
+
+def test_close_during_failing_copy_accounts_for_every_row():
+    async def main():
+        pool = FakePool(copy_delay=0.01, failing=True)
+        writer = UsageWriter(pool, flush_size=5, flush_interval=60, max_retries=2, retry_delay=0.02)
+        add_rows(writer, 5)
+        await wait_for_copy(pool)  # close() lands in the COPY or the retry backoff
+        await writer.close()
+        return pool, writer
+
+    pool, writer = asyncio.run(main())
+    assert pool.rows == []
+    assert writer.rows_written == 0
+    assert writer.rows_dropped == 5  # reported as dropped on close, not silently lost
+
+
+def test_cancelled_flush_puts_the_batch_back():
+    async def main():
+        pool = FakePool(copy_delay=0.2)
+        writer = UsageWriter(pool, flush_size=100, flush_interval=60)
+        add_rows(writer, 4)
+        try:
+            await asyncio.wait_for(writer.flush(), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        buffered = len(writer._buffer)
+        pool.copy_delay = 0
+        written = await writer.flush()
+        await writer.close()
+        return pool, buffered, written
+
+    pool, buffered, written = asyncio.run(main())
+    assert buffered == 4
+    assert written == 4
+    assert len(pool.rows) == 4
+
+
+def test_rows_are_stamped_in_utc():
+    async def main():
+        writer = UsageWriter(FakePool(), flush_interval=60)
+        writer.add("user", "session", 1, "llm")
+        stamp = writer._buffer[0][4]
+        await writer.close()
+        return stamp
+
+    stamp = asyncio.run(main())
+    assert stamp.tzinfo is None
+    assert abs(stamp - datetime.now(timezone.utc).replace(tzinfo=None)) < timedelta(seconds=5)
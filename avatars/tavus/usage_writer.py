@@ -0,0 +1,182 @@
+"""
+Usage writer for Knuut AI
+Buffers usage_tracking rows in memory and writes them in batches
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger("database")
+
+USAGE_COLUMNS = ("user_id", "session_id", "minutes_used", "service_type", "timestamp")
+
+UsageRecord = Tuple[str, str, int, str, datetime]
+
+
+def db_now() -> datetime:
+    """
+    Current time as usage_tracking.timestamp stores it: a naive TIMESTAMP on the
+    database clock, which runs UTC (Neon's default) - not the worker's local time
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Errors worth retrying: the batch itself is fine, the connection is not
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.TooManyConnectionsError,
+    asyncpg.CannotConnectNowError,
+)
+
+
+class UsageWriter:
+    """
+    Coalesces usage rows and flushes them with COPY when the buffer reaches
+    flush_size rows or every flush_interval seconds, whichever comes first.
+
+    Transient failures are retried with exponential backoff up to max_retries
+    times; if the database is still unreachable the rows stay buffered (up to
+    max_buffered, oldest dropped first) for the next flush. A batch rejected for
+    a data error falls back to row-by-row inserts so one bad row can't drop
+    the rest.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, flush_size: int = 100, flush_interval: float = 5.0,
+                 max_retries: int = 3, retry_delay: float = 0.5, max_buffered: int = 10000):
+        self.pool = pool
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_buffered = max_buffered
+
+        self._buffer: List[UsageRecord] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+
+    def add(self, user_id: str, session_id: str, minutes: int, service_type: str):
+        """Queue a usage row; never waits on the database"""
+        if self._closed:
+            logger.warning("Usage writer closed, dropping usage row")
+            self.rows_dropped += 1
+            return
+
+        # Stamped now rather than by the column default, which would be the (later) flush time
+        self._buffer.append((user_id, session_id, minutes, service_type, db_now()))
+        self._trim_buffer()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far and return the number of rows written"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+            written = await self._write_batch(batch)
+            self.flushes += 1
+            return written
+
+    async def close(self):
+        """Stop the background task and flush remaining rows"""
+        self._closed = True
+        if self._task:
+            # Let the loop finish a flush in progress and exit, rather than cancel it mid-COPY
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"Dropping {len(self._buffer)} usage rows that could not be written on close")
+            self.rows_dropped += len(self._buffer)
+            self._buffer = []
+
+    async def _run(self):
+        """Flush on size or time thresholds until closed"""
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing usage rows: {e}")
+
+    async def _write_batch(self, batch: List[UsageRecord]) -> int:
+        try:
+            return await self._copy_batch(batch)
+        except asyncio.CancelledError:
+            # e.g. close() or a flush with a timeout: the batch goes back for the next flush
+            self._requeue(batch)
+            raise
+
+    async def _copy_batch(self, batch: List[UsageRecord]) -> int:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.pool.acquire() as conn:
+                    await conn.copy_records_to_table("usage_tracking", records=batch, columns=USAGE_COLUMNS)
+                self.rows_written += len(batch)
+                return len(batch)
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Usage flush failed after {attempt + 1} attempts, keeping {len(batch)} rows buffered: {e}")
+                    self._requeue(batch)
+                    return 0
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(f"Usage flush failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except asyncpg.PostgresError as e:
+                logger.warning(f"Usage batch rejected ({e}), inserting rows individually")
+                return await self._write_rows(batch)
+        return 0
+
+    async def _write_rows(self, batch: List[UsageRecord]) -> int:
+        written = 0
+        async with self.pool.acquire() as conn:
+            for i, record in enumerate(batch):
+                try:
+                    await conn.execute(
+                        """
+                        INSERT INTO usage_tracking (user_id, session_id, minutes_used, service_type, timestamp)
+                        VALUES ($1, $2, $3, $4, $5)
+                        """,
+                        *record
+                    )
+                    written += 1
+                except asyncpg.PostgresError as e:
+                    logger.error(f"Error tracking usage for user {record[0]}: {e}")
+                    self.rows_dropped += 1
+                except asyncio.CancelledError:
+                    # Leave only the rows not written yet in the batch, for _write_batch to requeue
+                    del batch[:i]
+                    self.rows_written += written
+                    raise
+        self.rows_written += written
+        return written
+
+    def _requeue(self, batch: List[UsageRecord]):
+        self._buffer = batch + self._buffer
+        self._trim_buffer()
+
+    def _trim_buffer(self):
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            logger.error(f"Usage buffer full, dropping {overflow} oldest rows")
+            del self._buffer[:overflow]
+            self.rows_dropped += overflow
@@ -1,26 +1,29 @@
 """Configuration for drive-thru agent."""
 
-from database import COMMON_INSTRUCTIONS, menu_instructions
+import functools
+
+from database import COMMON_INSTRUCTIONS, Menu, menu_instructions
 
 from livekit.plugins import cartesia, deepgram, openai, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 
-def build_instructions(userdata):
-    """Build agent instructions from menu items."""
+@functools.lru_cache(maxsize=4)
+def build_instructions(menu: Menu) -> str:
+    """Build agent instructions from menu items, once per menu snapshot."""
     instructions = (
         COMMON_INSTRUCTIONS
         + "\n\n"
-        + menu_instructions("drink", items=userdata.drink_items)
+        + menu_instructions("drink", items=list(menu.items("drink")))
         + "\n\n"
-        + menu_instructions("combo_meal", items=userdata.combo_items)
+        + menu_instructions("combo_meal", items=list(menu.items("combo_meal")))
         + "\n\n"
-        + menu_instructions("happy_meal", items=userdata.happy_items)
+        + menu_instructions("happy_meal", items=list(menu.items("happy_meal")))
         + "\n\n"
-        + menu_instructions("regular", items=userdata.regular_items)
+        + menu_instructions("regular", items=list(menu.items("regular")))
     )
-    if userdata.sauce_items:
-        instructions += "\n\n" + menu_instructions("sauce", items=userdata.sauce_items)
+    if menu.items("sauce"):
+        instructions += "\n\n" + menu_instructions("sauce", items=list(menu.items("sauce")))
     
     return instructions
 
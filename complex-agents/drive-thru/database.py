@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 COMMON_INSTRUCTIONS = (
     "You are Kelly, a quick and friendly McDonald’s drive-thru attendant. "
@@ -48,8 +50,13 @@ COMMON_INSTRUCTIONS = (
 ItemSize = Literal["S", "M", "L"]
 ItemCategory = Literal["drink", "combo_meal", "happy_meal", "regular", "sauce"]
 
+SIZE_ORDER: tuple[ItemSize, ...] = ("S", "M", "L")
+
 
 class MenuItem(BaseModel):
+    # Menu items are shared by every session in the worker, so they must not be mutated
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     calories: int
@@ -570,6 +577,95 @@ class FakeDB:
         return sauces
 
 
+class Menu:
+    """
+    Immutable snapshot of the menu, indexed by category, by id and by (id, size).
+
+    Built once per worker and shared by every session: lookups don't scan the
+    menu, and the rendered instructions and tools can be cached per snapshot.
+    """
+
+    def __init__(self, items: Iterable[MenuItem]) -> None:
+        self._items = tuple(items)
+
+        by_category: dict[ItemCategory, list[MenuItem]] = defaultdict(list)
+        by_id: dict[str, list[MenuItem]] = defaultdict(list)
+        for item in self._items:
+            by_category[item.category].append(item)
+            by_id[item.id].append(item)
+
+        self._by_category = {category: tuple(items) for category, items in by_category.items()}
+        self._by_id = {item_id: tuple(items) for item_id, items in by_id.items()}
+        self._by_id_size = {(item.id, item.size): item for item in self._items}
+        self._ids = {
+            category: tuple(dict.fromkeys(item.id for item in items))
+            for category, items in self._by_category.items()
+        }
+        self._sizes = {
+            item_id: tuple(size for size in SIZE_ORDER if (item_id, size) in self._by_id_size)
+            for item_id in self._by_id
+        }
+        # Everything but availability: two menus with the same catalog can share tools
+        self.catalog = tuple((category, self._ids[category]) for category in self._by_category)
+
+    @classmethod
+    async def load(cls, db: FakeDB) -> Menu:
+        categories = await asyncio.gather(
+            db.list_drinks(),
+            db.list_combo_meals(),
+            db.list_happy_meals(),
+            db.list_regulars(),
+            db.list_sauces(),
+        )
+        return cls(item for items in categories for item in items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[MenuItem]:
+        """Every item, in menu order"""
+        return iter(self._items)
+
+    def with_availability(self, availability: dict[tuple[str, ItemSize | None], bool]) -> Menu:
+        """
+        A new snapshot with updated availability, keyed by (id, size). Items whose
+        availability didn't change are reused as they are.
+        """
+        return Menu(
+            item
+            if availability.get((item.id, item.size), item.available) == item.available
+            else item.model_copy(update={"available": availability[(item.id, item.size)]})
+            for item in self._items
+        )
+
+    def items(self, category: ItemCategory) -> tuple[MenuItem, ...]:
+        return self._by_category.get(category, ())
+
+    def ids(self, category: ItemCategory) -> tuple[str, ...]:
+        """Distinct item ids of a category, in menu order"""
+        return self._ids.get(category, ())
+
+    def find(
+        self, item_id: str, *categories: ItemCategory, size: ItemSize | None = None
+    ) -> tuple[MenuItem, ...]:
+        """Every size of item_id (or just the given size), if it belongs to one of categories"""
+        items = self._by_id.get(item_id, ())
+        if items and categories and items[0].category not in categories:
+            return ()
+        if size is None:
+            return items
+        item = self._by_id_size.get((item_id, size))
+        return (item,) if item else ()
+
+    def is_available(self, item_id: str, size: ItemSize | None = None) -> bool:
+        """Whether item_id (in that size, or in any size) can be ordered right now"""
+        return any(item.available for item in self.find(item_id, size=size))
+
+    def sizes(self, item_id: str) -> tuple[ItemSize, ...]:
+        """Sizes item_id comes in, smallest first; empty if it isn't size-selectable"""
+        return self._sizes.get(item_id, ())
+
+
 # The code below is optimized for ease of use instead of efficiency.
 
 
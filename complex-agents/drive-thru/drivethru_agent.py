@@ -7,10 +7,12 @@ difficulty: advanced
 description: Restaurant drive-thru ordering system with modular tools and order management
 demonstrates:
   - Modular tool organization for menu items
-  - Dynamic tool generation based on menu data
+  - Dynamic tool generation based on menu data, cached per menu catalog
+  - Live menu updates: instructions follow item availability mid-session
   - Order state management with add/remove/list operations
   - Background audio playback during session
   - RPC handler registration for external control
+  - Order events pushed to displays and completed orders persisted
   - Structured userdata for session state
 ---
 """
@@ -25,8 +27,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 
 from agent_config import build_instructions
+from database import Menu
 from rpc_handlers import register_rpc_handlers
-from session_setup import Userdata, new_userdata, setup_background_audio, setup_session
+from session_setup import (
+    Userdata,
+    new_userdata,
+    setup_background_audio,
+    setup_order_events,
+    setup_session,
+)
 from tools.management_tools import complete_order, list_order_items, remove_order_item
 from tools.order_tools import (
     build_combo_order_tool,
@@ -34,41 +43,63 @@ from tools.order_tools import (
     build_regular_order_tool,
 )
 
-from livekit.agents import Agent, JobContext, WorkerOptions, cli
+from livekit.agents import Agent, FunctionTool, JobContext, WorkerOptions, cli
 
 load_dotenv()
 
 
-class DriveThruAgent(Agent):
-    """Drive-thru ordering agent with modular tool organization."""
+_tools: dict[tuple, tuple[FunctionTool, ...]] = {}
 
-    def __init__(self, *, userdata: Userdata) -> None:
-        instructions = build_instructions(userdata)
-        tools = [
-            build_regular_order_tool(
-                userdata.regular_items,
-                userdata.drink_items,
-                userdata.sauce_items
-            ),
-            build_combo_order_tool(
-                userdata.combo_items,
-                userdata.drink_items,
-                userdata.sauce_items
-            ),
-            build_happy_order_tool(
-                userdata.happy_items,
-                userdata.drink_items,
-                userdata.sauce_items
-            ),
+
+def build_tools(menu: Menu) -> tuple[FunctionTool, ...]:
+    """
+    Build the agent's tools once per menu catalog; they are shared by every session.
+    Tools only bake in item ids, so snapshots differing in availability share them.
+    """
+    tools = _tools.get(menu.catalog)
+    if tools is None:
+        tools = (
+            build_regular_order_tool(menu),
+            build_combo_order_tool(menu),
+            build_happy_order_tool(menu),
             remove_order_item,
             list_order_items,
             complete_order,
-        ]
+        )
+        _tools.clear()
+        _tools[menu.catalog] = tools
+    return tools
+
 
+class DriveThruAgent(Agent):
+    """Drive-thru ordering agent with modular tool organization."""
+
+    def __init__(self, *, userdata: Userdata) -> None:
         super().__init__(
-            instructions=instructions,
-            tools=tools,
+            instructions=build_instructions(userdata.menu),
+            tools=list(build_tools(userdata.menu)),
         )
+        self._live_menu = userdata.live_menu
+        self._unsubscribe_menu = None
+
+    async def on_enter(self) -> None:
+        self._unsubscribe_menu = self._live_menu.subscribe(self._on_menu_changed)
+        # The menu may have changed between __init__ and now
+        await self._on_menu_changed(self._live_menu.menu, True)
+
+    async def on_exit(self) -> None:
+        if self._unsubscribe_menu is not None:
+            self._unsubscribe_menu()
+            self._unsubscribe_menu = None
+
+    async def _on_menu_changed(self, menu: Menu, structural: bool) -> None:
+        instructions = build_instructions(menu)
+        if instructions != self.instructions:
+            await self.update_instructions(instructions)
+        if structural:
+            tools = list(build_tools(menu))
+            if tools != self.tools:
+                await self.update_tools(tools)
 
 
 async def entrypoint(ctx: JobContext):
@@ -78,6 +109,8 @@ async def entrypoint(ctx: JobContext):
     userdata = await new_userdata()
     userdata.room = ctx.room
     register_rpc_handlers(ctx.room, userdata)
+    order_events = setup_order_events(userdata)
+    ctx.add_shutdown_callback(order_events.aclose)
     session = setup_session(userdata)
     background_audio = setup_background_audio()
     await session.start(agent=DriveThruAgent(userdata=userdata), room=ctx.room)
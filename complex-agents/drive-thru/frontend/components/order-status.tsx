@@ -23,6 +23,41 @@ interface OrderState {
   items: OrderItem[];
   total_price: number;
   item_count: number;
+  seq: number;
+}
+
+interface OrderEvent {
+  seq: number;
+  type: 'add' | 'remove' | 'complete';
+  order_id: string | null;
+  item: OrderItem | null;
+  total_price: number;
+  item_count: number;
+}
+
+interface OrderUpdate {
+  seq: number;
+  events: OrderEvent[];
+  total_price: number;
+  item_count: number;
+}
+
+// Apply pushed order events; returns null if some were missed and the order must be refetched
+function applyOrderEvents(state: OrderState, update: OrderUpdate): OrderState | null {
+  let items = state.items;
+  let seq = state.seq;
+  for (const event of update.events) {
+    if (event.seq <= seq) continue;
+    if (event.seq !== seq + 1) return null;
+    if (event.type === 'add' && event.item) {
+      const item = event.item;
+      items = [...items.filter((existing) => existing.order_id !== item.order_id), item];
+    } else if (event.type === 'remove') {
+      items = items.filter((existing) => existing.order_id !== event.order_id);
+    }
+    seq = event.seq;
+  }
+  return { items, total_price: update.total_price, item_count: update.item_count, seq };
 }
 
 interface CheckoutState {
@@ -70,6 +105,27 @@ export function OrderStatus() {
 
       room.localParticipant.registerRpcMethod('show_checkout', handleShowCheckout);
 
+      // RPC handler for order events pushed by the agent
+      let current: OrderState | null = null;
+      const handleOrderUpdated = async (data: RpcInvocationData): Promise<string> => {
+        try {
+          const update: OrderUpdate = JSON.parse(data.payload);
+          const next = current ? applyOrderEvents(current, update) : null;
+          if (next) {
+            current = next;
+            setOrderState(next);
+          } else {
+            fetchOrderState();
+          }
+          return JSON.stringify({ success: true });
+        } catch (error) {
+          console.error('Error handling order update:', error);
+          return JSON.stringify({ success: false, error: String(error) });
+        }
+      };
+
+      room.localParticipant.registerRpcMethod('order_updated', handleOrderUpdated);
+
       // Fetch order state from agent
       const fetchOrderState = async () => {
         try {
@@ -87,7 +143,9 @@ export function OrderStatus() {
             payload: ''
           });
           const data = JSON.parse(response);
-          if (data.success) {
+          // A push may have arrived while this request was in flight
+          if (data.success && (!current || data.data.seq >= current.seq)) {
+            current = data.data;
             setOrderState(data.data);
           }
         } catch (error) {
@@ -98,15 +156,16 @@ export function OrderStatus() {
       // Initial fetch
       await fetchOrderState();
 
-      // Poll for updates every 1 second
+      // Updates are pushed; poll now and then in case a push was lost
       const interval = setInterval(() => {
         fetchOrderState();
-      }, 1000);
+      }, 10000);
 
       // Store cleanup function
       (window as any).orderStatusCleanup = () => {
         clearInterval(interval);
         room.localParticipant.unregisterRpcMethod('show_checkout');
+        room.localParticipant.unregisterRpcMethod('order_updated');
       };
     };
 
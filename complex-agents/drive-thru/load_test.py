@@ -0,0 +1,399 @@
+"""
+---
+title: Drive-Thru Load Test
+category: drive-thru
+tags: [load_testing, benchmark, fake_llm, concurrency, memory_profiling]
+difficulty: advanced
+description: Offline load test replaying scripted drive-thru conversations against DriveThruAgent
+demonstrates:
+  - A deterministic, scripted LLM implementing the livekit LLM interface
+  - Many AgentSessions running concurrently in one process
+  - Tool-dispatch latency, orders per minute and memory per session
+  - Regression checks of the tool and order-state hot path without network access
+---
+"""
+
+"""
+Offline load test for the drive-thru agent.
+
+Replays scripted conversations against DriveThruAgent through a real
+AgentSession, with ScriptedLLM standing in for the model: for each user turn
+it returns the recorded tool calls, then the recorded reply. User turns go in
+as text, the way final transcripts arrive from STT, and there is no audio
+output, so no STT or TTS runs. Everything else (tool schemas, argument
+parsing, the tools, order state, the order store) is the production code.
+
+A conversation is one JSON object per line:
+
+    {"turns": [{"user": "A Big Mac please",
+                "steps": [[{"name": "order_regular_item", "arguments": {"item_id": "big_mac"}}]],
+                "reply": "Sure thing!"}, ...]}
+
+`steps` are the LLM's successive tool-call rounds within the turn. An argument
+value of "@last" (or ["@last"]) is replaced by the most recent order_id seen
+in a tool output, for removals.
+
+    python load_test.py --sessions 300 --concurrency 50
+    python load_test.py --conversations recorded.jsonl
+    python load_test.py --sessions 50 --dump conversations.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from livekit.agents import AgentSession, llm, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, APIConnectOptions, NotGivenOr
+
+logger = logging.getLogger("drive-thru-load-test")
+
+_ORDER_ID = re.compile(r'"order_id":\s*"(O_[A-Z0-9]+)"')
+
+
+@dataclass
+class ScriptStats:
+    dispatch_latencies: list[float] = field(default_factory=list)
+    llm_calls: int = 0
+    tool_errors: int = 0
+
+
+class ScriptedLLM(llm.LLM):
+    """Replays one conversation: which turn and step to answer is read off the chat context."""
+
+    def __init__(self, turns: list[dict], *, latency: float = 0.0) -> None:
+        super().__init__()
+        self._turns = turns
+        self._latency = latency
+        self.stats = ScriptStats()
+        self._calls_sent_at: float | None = None
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    @property
+    def provider(self) -> str:
+        return "load-test"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.Tool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> "ScriptedLLMStream":
+        if self._calls_sent_at is not None:
+            # Time from handing out tool calls to being asked again with their outputs
+            self.stats.dispatch_latencies.append(time.perf_counter() - self._calls_sent_at)
+            self._calls_sent_at = None
+            for item in reversed(chat_ctx.items):
+                if item.type != "function_call_output":
+                    break
+                self.stats.tool_errors += item.is_error
+        self.stats.llm_calls += 1
+        return ScriptedLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+    def respond(self, chat_ctx: llm.ChatContext) -> tuple[str | None, list[dict]]:
+        items = chat_ctx.items
+        user_turns = [i for i, item in enumerate(items) if item.type == "message" and item.role == "user"]
+        if not user_turns:
+            return None, []
+        turn = self._turns[min(len(user_turns), len(self._turns)) - 1]
+
+        since_user = items[user_turns[-1] + 1 :]
+        calls_made = sum(1 for item in since_user if item.type == "function_call")
+        done = 0
+        for step in turn.get("steps", []):
+            if done == calls_made:
+                return None, [self._resolve(call, items) for call in step]
+            done += len(step)
+        return turn.get("reply", ""), []
+
+    @staticmethod
+    def _resolve(call: dict, items: list) -> dict:
+        arguments = dict(call.get("arguments", {}))
+        if any(value in ("@last", ["@last"]) for value in arguments.values()):
+            outputs = [item.output for item in items if item.type == "function_call_output"]
+            order_ids = [match for output in outputs for match in _ORDER_ID.findall(output)]
+            last = order_ids[-1] if order_ids else "O_UNKNOWN"
+            for key, value in arguments.items():
+                if value == "@last":
+                    arguments[key] = last
+                elif value == ["@last"]:
+                    arguments[key] = [last]
+        return {"name": call["name"], "arguments": arguments}
+
+
+class ScriptedLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        scripted: ScriptedLLM = self._llm
+        if scripted._latency:
+            await asyncio.sleep(scripted._latency)
+        text, calls = scripted.respond(self._chat_ctx)
+        request_id = utils.shortuuid("scripted_")
+        tool_calls = [
+            llm.FunctionToolCall(
+                name=call["name"], arguments=json.dumps(call["arguments"]), call_id=utils.shortuuid("call_")
+            )
+            for call in calls
+        ]
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=text, tool_calls=tool_calls),
+            )
+        )
+        if tool_calls:
+            scripted._calls_sent_at = time.perf_counter()
+
+
+# Conversation generation: plausible orders built from the menu
+
+
+def generate_conversations(menu, count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    regulars = [item for item in menu.items("regular") if item.available]
+    drinks = [item_id for item_id in menu.ids("drink") if menu.is_available(item_id)]
+    sauces = list(menu.ids("sauce"))
+    combos = list(menu.ids("combo_meal"))
+    happy = list(menu.ids("happy_meal"))
+
+    def regular_turn() -> dict:
+        item = rng.choice(regulars)
+        arguments = {"item_id": item.id}
+        if item.size:
+            arguments["size"] = rng.choice(menu.sizes(item.id))
+        return {
+            "user": f"Can I get a {item.name}?",
+            "steps": [[{"name": "order_regular_item", "arguments": arguments}]],
+            "reply": "Sure thing, anything else?",
+        }
+
+    def combo_turn() -> dict:
+        drink = rng.choice([d for d in drinks if set(menu.sizes(d)) & {"M", "L"}] or drinks)
+        drink_sizes = [size for size in menu.sizes(drink) if size in ("M", "L")]
+        arguments = {
+            "meal_id": rng.choice(combos),
+            "drink_id": drink,
+            "drink_size": rng.choice(drink_sizes) if drink_sizes else None,
+            "fries_size": rng.choice(["M", "L"]),
+            "sauce_id": rng.choice(sauces) if sauces and rng.random() < 0.5 else None,
+        }
+        return {
+            "user": "I'll take a combo meal",
+            "steps": [[{"name": "order_combo_meal", "arguments": arguments}]],
+            "reply": "Got it, that meal is in. Anything else?",
+        }
+
+    def happy_turn() -> dict:
+        drink = rng.choice(drinks)
+        arguments = {
+            "meal_id": rng.choice(happy),
+            "drink_id": drink,
+            "drink_size": rng.choice(menu.sizes(drink)) if menu.sizes(drink) else None,
+            "sauce_id": None,
+        }
+        return {
+            "user": "And a Happy Meal for the kid",
+            "steps": [[{"name": "order_happy_meal", "arguments": arguments}]],
+            "reply": "Happy Meal added.",
+        }
+
+    def remove_turn() -> dict:
+        return {
+            "user": "Actually, take off the last thing",
+            "steps": [
+                [{"name": "list_order_items", "arguments": {}}],
+                [{"name": "remove_order_item", "arguments": {"order_id": ["@last"]}}],
+            ],
+            "reply": "Removed it.",
+        }
+
+    def chat_turn() -> dict:
+        return {"user": "Hmm, let me think", "steps": [], "reply": "Take your time."}
+
+    kinds = [(regular_turn, 5), (combo_turn, 3), (happy_turn, 1), (remove_turn, 1), (chat_turn, 1)]
+    conversations = []
+    for _ in range(count):
+        turns = [regular_turn()]
+        items = 1
+        for _ in range(rng.randint(1, 6)):
+            kind = rng.choices([kind for kind, _ in kinds], [weight for _, weight in kinds])[0]
+            if kind is remove_turn and items < 2:
+                kind = regular_turn
+            turns.append(kind())
+            items += {remove_turn: -1, chat_turn: 0}.get(kind, 1)
+        turns.append({
+            "user": "That's all",
+            "steps": [[{"name": "complete_order", "arguments": {}}]],
+            "reply": "Please drive to the next window!",
+        })
+        conversations.append({"turns": turns})
+    return conversations
+
+
+# Running sessions
+
+
+@dataclass
+class SessionResult:
+    turn_latencies: list[float]
+    stats: ScriptStats
+    completed: bool
+    error: str | None = None
+
+
+async def run_conversation(
+    conversation: dict,
+    *,
+    llm_latency: float = 0.0,
+    played: asyncio.Semaphore | None = None,
+    hold: asyncio.Event | None = None,
+) -> SessionResult:
+    """Play one conversation; with `hold`, release `played` and keep the session open until it is set"""
+    from drivethru_agent import DriveThruAgent
+    from session_setup import load_order_store, new_userdata
+
+    userdata = await new_userdata()
+    userdata.order.subscribe(load_order_store().listener("load-test"))
+    scripted = ScriptedLLM(conversation["turns"], latency=llm_latency)
+    turn_latencies = []
+    try:
+        async with AgentSession(llm=scripted, userdata=userdata) as session:
+            await session.start(DriveThruAgent(userdata=userdata))
+            for turn in conversation["turns"]:
+                start = time.perf_counter()
+                await session.run(user_input=turn["user"])
+                turn_latencies.append(time.perf_counter() - start)
+            if hold is not None:
+                played.release()
+                played = None
+                await hold.wait()
+    except Exception as e:
+        return SessionResult(turn_latencies, scripted.stats, False, repr(e))
+    finally:
+        if played is not None:
+            played.release()
+    return SessionResult(turn_latencies, scripted.stats, userdata.order.completed)
+
+
+async def run_load(conversations: list[dict], concurrency: int, llm_latency: float) -> tuple[list[SessionResult], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(conversation: dict) -> SessionResult:
+        async with semaphore:
+            return await run_conversation(conversation, llm_latency=llm_latency)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_one(conversation) for conversation in conversations))
+    return results, time.perf_counter() - start
+
+
+async def measure_session_memory(conversations: list[dict], sessions: int) -> float:
+    """Bytes held per live session: `sessions` conversations played and kept open at once, under tracemalloc"""
+    played = asyncio.Semaphore(0)
+    hold = asyncio.Event()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = [
+            asyncio.create_task(
+                run_conversation(conversations[i % len(conversations)], played=played, hold=hold)
+            )
+            for i in range(sessions)
+        ]
+        for _ in range(sessions):
+            await played.acquire()
+        held = tracemalloc.get_traced_memory()[0]
+        hold.set()
+        await asyncio.gather(*tasks)
+    finally:
+        tracemalloc.stop()
+    return (held - baseline) / sessions
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return (
+        f"p50 {pick(0.50):7.2f}ms  p95 {pick(0.95):7.2f}ms  p99 {pick(0.99):7.2f}ms  "
+        f"max {ordered[-1] * 1000:7.2f}ms  mean {statistics.fmean(ordered) * 1000:7.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", help="JSONL file of recorded conversations (default: generated)")
+    parser.add_argument("--sessions", type=int, default=200, help="conversations to generate")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the scripted LLM waits per call")
+    parser.add_argument("--memory-sessions", type=int, default=20, help="sessions held open to measure memory (0 to skip)")
+    parser.add_argument("--dump", help="write the generated conversations to this JSONL file and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    # Keep the benchmark's menu and completed orders out of the real stores
+    scratch = tempfile.mkdtemp(prefix="drive-thru-load-test-")
+    os.environ.setdefault("DRIVE_THRU_MENU_DB", str(Path(scratch) / "menu.sqlite"))
+    os.environ.setdefault("DRIVE_THRU_ORDERS_DB", str(Path(scratch) / "orders.sqlite"))
+    os.environ.pop("DRIVE_THRU_MENU_DSN", None)
+
+    from session_setup import load_menu
+
+    if args.conversations:
+        with open(args.conversations) as f:
+            conversations = [json.loads(line) for line in f if line.strip()]
+    else:
+        conversations = generate_conversations((await load_menu()).menu, args.sessions, args.seed)
+
+    if args.dump:
+        with open(args.dump, "w") as f:
+            f.writelines(json.dumps(conversation) + "\n" for conversation in conversations)
+        print(f"Wrote {len(conversations)} conversations to {args.dump}")
+        return
+
+    turns = sum(len(conversation["turns"]) for conversation in conversations)
+    print(f"\n🚗 Replaying {len(conversations)} conversations ({turns} turns), {args.concurrency} at a time")
+
+    results, elapsed = await run_load(conversations, args.concurrency, args.llm_latency)
+    failed = [result for result in results if result.error]
+    completed = sum(result.completed for result in results)
+
+    print(f"   sessions:          {len(results)} ({len(failed)} failed)")
+    print(f"   wall time:         {elapsed:.2f}s")
+    print(f"   orders/minute:     {completed / elapsed * 60:.0f} ({completed} completed)")
+    print(f"   turns/second:      {turns / elapsed:.0f}")
+    print(f"   tool errors:       {sum(result.stats.tool_errors for result in results)}")
+    print(f"   tool dispatch:     {percentiles([t for r in results for t in r.stats.dispatch_latencies])}")
+    print(f"   turn latency:      {percentiles([t for r in results for t in r.turn_latencies])}")
+    for result in failed[:5]:
+        print(f"   ✗ {result.error}")
+
+    if args.memory_sessions:
+        per_session = await measure_session_memory(conversations, args.memory_sessions)
+        print(f"   memory/session:    {per_session / 1024:.0f} KiB ({args.memory_sessions} live sessions, tracemalloc)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
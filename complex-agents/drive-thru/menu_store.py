@@ -0,0 +1,423 @@
+"""
+---
+title: Drive-Thru Menu Store
+category: drive-thru
+tags: [sqlite, postgres, hot_reload, availability, menu_snapshot]
+difficulty: advanced
+description: Persistent menu backend with a worker-wide snapshot that is hot-swapped on change
+demonstrates:
+  - SQLite menu table with an availability column (Postgres pluggable)
+  - Change detection with trigger-maintained version counters
+  - Atomic swap of an immutable menu snapshot
+  - Availability updates without reloading the whole menu
+  - Notifying live sessions of menu changes
+---
+"""
+
+"""
+Persistent menu store for the drive-thru agent.
+
+The menu lives in a menu_items table (SQLite by default, Postgres when
+DRIVE_THRU_MENU_DSN is set) with an `available` column. Triggers bump one of
+two counters in menu_versions: `availability` when only availability changed,
+`menu` for anything else. LiveMenu polls those counters and swaps in a new Menu
+snapshot: a full reload for menu changes, and for availability changes just the
+(id, size, available) rows applied to the current snapshot.
+
+Mark an item as sold out from the command line:
+
+    python menu_store.py unavailable sweet_tea
+    python menu_store.py available sweet_tea --size L
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+
+from database import FakeDB, ItemSize, Menu, MenuItem
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger("drive-thru-agent")
+
+DEFAULT_SQLITE_PATH = Path(__file__).parent / "menu.sqlite"
+DEFAULT_POLL_INTERVAL = 2.0
+
+# (id, size) -> available
+Availability = dict[tuple[str, ItemSize | None], bool]
+MenuListener = Callable[[Menu, bool], Awaitable[None]]
+
+_COLUMNS = "id, size, category, name, calories, price, available, voice_alias, position"
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id TEXT NOT NULL,
+    size TEXT NOT NULL DEFAULT '',  -- '' for items without sizes
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calories INTEGER NOT NULL,
+    price REAL NOT NULL,
+    available INTEGER NOT NULL DEFAULT 1,
+    voice_alias TEXT,
+    position INTEGER NOT NULL,  -- menu order, which the instructions follow
+    PRIMARY KEY (id, size)
+);
+
+CREATE TABLE IF NOT EXISTS menu_versions (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    menu INTEGER NOT NULL DEFAULT 0,
+    availability INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO menu_versions (id) VALUES (1);
+
+CREATE TRIGGER IF NOT EXISTS menu_items_availability AFTER UPDATE OF available ON menu_items
+WHEN OLD.available IS NOT NEW.available
+BEGIN
+    UPDATE menu_versions SET availability = availability + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_update
+AFTER UPDATE OF id, size, category, name, calories, price, voice_alias, position ON menu_items
+BEGIN
+    UPDATE menu_versions SET menu = menu + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_insert AFTER INSERT ON menu_items
+BEGIN
+    UPDATE menu_versions SET menu = menu + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS menu_items_delete AFTER DELETE ON menu_items
+BEGIN
+    UPDATE menu_versions SET menu = menu + 1;
+END;
+"""
+
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id TEXT NOT NULL,
+    size TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calories INTEGER NOT NULL,
+    price DOUBLE PRECISION NOT NULL,
+    available BOOLEAN NOT NULL DEFAULT TRUE,
+    voice_alias TEXT,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (id, size)
+);
+
+CREATE TABLE IF NOT EXISTS menu_versions (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    menu BIGINT NOT NULL DEFAULT 0,
+    availability BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO menu_versions (id) VALUES (1) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_menu_availability() RETURNS trigger AS $$
+BEGIN
+    UPDATE menu_versions SET availability = availability + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_menu_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE menu_versions SET menu = menu + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS menu_items_availability ON menu_items;
+CREATE TRIGGER menu_items_availability AFTER UPDATE OF available ON menu_items
+FOR EACH STATEMENT EXECUTE FUNCTION bump_menu_availability();
+
+DROP TRIGGER IF EXISTS menu_items_changed ON menu_items;
+CREATE TRIGGER menu_items_changed
+AFTER INSERT OR DELETE OR UPDATE OF id, size, category, name, calories, price, voice_alias, position
+ON menu_items FOR EACH STATEMENT EXECUTE FUNCTION bump_menu_version();
+"""
+
+
+def _item_row(item: MenuItem, position: int) -> tuple:
+    return (
+        item.id,
+        item.size or "",
+        item.category,
+        item.name,
+        item.calories,
+        item.price,
+        item.available,
+        item.voice_alias,
+        position,
+    )
+
+
+def _row_item(row) -> MenuItem:
+    return MenuItem(
+        id=row[0],
+        size=row[1] or None,
+        category=row[2],
+        name=row[3],
+        calories=row[4],
+        price=row[5],
+        available=bool(row[6]),
+        voice_alias=row[7],
+    )
+
+
+class MenuStore(ABC):
+    """Where the menu is kept. Implementations must be safe to call from one event loop."""
+
+    @abstractmethod
+    async def versions(self) -> tuple[int, int]:
+        """(menu, availability) change counters"""
+
+    @abstractmethod
+    async def load_items(self) -> list[MenuItem]:
+        """Every menu row, in menu order"""
+
+    @abstractmethod
+    async def load_availability(self) -> Availability:
+        """Just the availability of every row"""
+
+    @abstractmethod
+    async def replace_items(self, items: Iterable[MenuItem]) -> None:
+        """Replace the whole menu"""
+
+    @abstractmethod
+    async def set_available(self, item_id: str, available: bool, size: ItemSize | None = None) -> int:
+        """Change availability of every size of item_id, or just one; returns the rows changed"""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SQLiteMenuStore(MenuStore):
+    def __init__(self, path: str | Path = DEFAULT_SQLITE_PATH) -> None:
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA)
+        self._conn.commit()
+        # One statement at a time: the connection is shared with the worker thread
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], object]):
+        async with self._lock:
+            return await asyncio.to_thread(fn, self._conn)
+
+    async def versions(self) -> tuple[int, int]:
+        return await self._run(
+            lambda conn: conn.execute("SELECT menu, availability FROM menu_versions").fetchone()
+        )
+
+    async def load_items(self) -> list[MenuItem]:
+        rows = await self._run(
+            lambda conn: conn.execute(f"SELECT {_COLUMNS} FROM menu_items ORDER BY position").fetchall()
+        )
+        return [_row_item(row) for row in rows]
+
+    async def load_availability(self) -> Availability:
+        rows = await self._run(lambda conn: conn.execute("SELECT id, size, available FROM menu_items").fetchall())
+        return {(item_id, size or None): bool(available) for item_id, size, available in rows}
+
+    async def replace_items(self, items: Iterable[MenuItem]) -> None:
+        rows = [_item_row(item, position) for position, item in enumerate(items)]
+
+        def replace(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("DELETE FROM menu_items")
+                conn.executemany(f"INSERT INTO menu_items ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        await self._run(replace)
+
+    async def set_available(self, item_id: str, available: bool, size: ItemSize | None = None) -> int:
+        def update(conn: sqlite3.Connection) -> int:
+            with conn:
+                if size is None:
+                    cursor = conn.execute(
+                        "UPDATE menu_items SET available = ? WHERE id = ? AND available <> ?",
+                        (available, item_id, available),
+                    )
+                else:
+                    cursor = conn.execute(
+                        "UPDATE menu_items SET available = ? WHERE id = ? AND size = ? AND available <> ?",
+                        (available, item_id, size, available),
+                    )
+                return cursor.rowcount
+
+        return await self._run(update)
+
+    async def aclose(self) -> None:
+        self._conn.close()
+
+
+class PostgresMenuStore(MenuStore):
+    def __init__(self, dsn: str) -> None:
+        if asyncpg is None:
+            raise RuntimeError("PostgresMenuStore needs asyncpg: pip install asyncpg")
+        self._dsn = dsn
+        self._pool = None
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=2)
+            async with self._pool.acquire() as conn:
+                await conn.execute(POSTGRES_SCHEMA)
+        return self._pool
+
+    async def versions(self) -> tuple[int, int]:
+        pool = await self._get_pool()
+        row = await pool.fetchrow("SELECT menu, availability FROM menu_versions")
+        return row["menu"], row["availability"]
+
+    async def load_items(self) -> list[MenuItem]:
+        pool = await self._get_pool()
+        return [_row_item(row) for row in await pool.fetch(f"SELECT {_COLUMNS} FROM menu_items ORDER BY position")]
+
+    async def load_availability(self) -> Availability:
+        pool = await self._get_pool()
+        rows = await pool.fetch("SELECT id, size, available FROM menu_items")
+        return {(row["id"], row["size"] or None): row["available"] for row in rows}
+
+    async def replace_items(self, items: Iterable[MenuItem]) -> None:
+        pool = await self._get_pool()
+        rows = [_item_row(item, position) for position, item in enumerate(items)]
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM menu_items")
+                await conn.copy_records_to_table("menu_items", records=rows, columns=_COLUMNS.split(", "))
+
+    async def set_available(self, item_id: str, available: bool, size: ItemSize | None = None) -> int:
+        pool = await self._get_pool()
+        if size is None:
+            status = await pool.execute(
+                "UPDATE menu_items SET available = $1 WHERE id = $2 AND available <> $1", available, item_id
+            )
+        else:
+            status = await pool.execute(
+                "UPDATE menu_items SET available = $1 WHERE id = $2 AND size = $3 AND available <> $1",
+                available,
+                item_id,
+                size,
+            )
+        return int(status.split()[-1])
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+
+
+def open_menu_store() -> MenuStore:
+    """Postgres when DRIVE_THRU_MENU_DSN is set, otherwise SQLite (DRIVE_THRU_MENU_DB or menu.sqlite)"""
+    dsn = os.getenv("DRIVE_THRU_MENU_DSN")
+    if dsn:
+        return PostgresMenuStore(dsn)
+    return SQLiteMenuStore(os.getenv("DRIVE_THRU_MENU_DB", DEFAULT_SQLITE_PATH))
+
+
+async def seed_if_empty(store: MenuStore) -> bool:
+    """Fill an empty store with the default menu from FakeDB; returns whether it did"""
+    if await store.load_items():
+        return False
+    logger.info("Menu store is empty, seeding it with the default menu")
+    await store.replace_items(await Menu.load(FakeDB()))
+    return True
+
+
+class LiveMenu:
+    """
+    The worker's current Menu. Reading `menu` never blocks: a background task
+    polls the store and replaces the snapshot with a single assignment, then
+    tells subscribers (the live sessions) about it.
+    """
+
+    def __init__(self, store: MenuStore, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self._store = store
+        self._poll_interval = poll_interval
+        self._menu: Menu | None = None
+        self._versions = (-1, -1)
+        self._listeners: list[MenuListener] = []
+        self._poll_task: asyncio.Task | None = None
+
+    @property
+    def menu(self) -> Menu:
+        if self._menu is None:
+            raise RuntimeError("LiveMenu.start() has not been called")
+        return self._menu
+
+    async def start(self) -> None:
+        """Load the menu (seeding an empty store from FakeDB) and start watching for changes."""
+        await seed_if_empty(self._store)
+        # Versions first: a change made while loading is picked up by the next poll
+        self._versions = await self._store.versions()
+        self._menu = Menu(await self._store.load_items())
+        self._poll_task = asyncio.create_task(self._poll())
+
+    async def refresh(self) -> bool:
+        """Check the store once; returns whether the menu changed."""
+        versions = await self._store.versions()
+        if versions == self._versions:
+            return False
+
+        structural = versions[0] != self._versions[0]
+        if structural:
+            menu = Menu(await self._store.load_items())
+        else:
+            menu = self.menu.with_availability(await self._store.load_availability())
+        self._menu = menu
+        self._versions = versions
+        logger.info(f"Menu {'reloaded' if structural else 'availability updated'} (versions {versions})")
+
+        results = await asyncio.gather(
+            *(listener(menu, structural) for listener in list(self._listeners)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Menu change listener failed: {result}")
+        return True
+
+    def subscribe(self, listener: MenuListener) -> Callable[[], None]:
+        """Call listener(menu, structural) after every swap; returns an unsubscribe function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh the menu: {e}")
+
+    async def aclose(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+        await self._store.aclose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Change item availability in the drive-thru menu store")
+    parser.add_argument("action", choices=["available", "unavailable"])
+    parser.add_argument("item_id")
+    parser.add_argument("--size", choices=["S", "M", "L"], default=None)
+    args = parser.parse_args()
+
+    store = open_menu_store()
+    try:
+        await seed_if_empty(store)
+        changed = await store.set_available(args.item_id, args.action == "available", args.size)
+        print(f"{changed} row(s) of {args.item_id} marked {args.action}")
+    finally:
+        await store.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import secrets
 import string
+import time
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from typing import Annotated, Literal, Union
 
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger("drive-thru-agent")
+
 
 def order_uid() -> str:
     alphabet = string.ascii_uppercase + string.digits  # b36
@@ -44,6 +50,24 @@ OrderedItem = Annotated[
 ]
 
 
+OrderEventType = Literal["add", "remove", "complete"]
+
+
+class OrderEvent(BaseModel):
+    """One entry of an order's event log, carrying the order totals after it was applied"""
+
+    seq: int
+    type: OrderEventType
+    order_id: str | None = None  # the item added (or replaced) or removed
+    item: dict | None = None  # formatted as in OrderState.get_formatted_order()
+    total_price: float
+    item_count: int
+    timestamp: float = Field(default_factory=time.time)
+
+
+OrderListener = Callable[["OrderState", OrderEvent], Awaitable[None]]
+
+
 @dataclass
 class OrderStateItem:
     ordered_item: OrderedItem
@@ -51,51 +75,111 @@ class OrderStateItem:
     price: float
     details: dict[str, str] = field(default_factory=dict)
 
+    def formatted(self) -> dict:
+        item = self.ordered_item
+        formatted_item = {
+            "order_id": item.order_id,
+            "type": item.type,
+            "name": self.name,
+            "price": self.price,
+            "details": self.details
+        }
+
+        if item.type == "combo_meal":
+            formatted_item["meal_id"] = item.meal_id
+            formatted_item["drink_size"] = item.drink_size
+            formatted_item["fries_size"] = item.fries_size
+        elif item.type == "happy_meal":
+            formatted_item["meal_id"] = item.meal_id
+            formatted_item["drink_size"] = item.drink_size
+        elif item.type == "regular":
+            formatted_item["item_id"] = item.item_id
+            formatted_item["size"] = item.size
+
+        return formatted_item
+
 
 @dataclass
 class OrderState:
+    """
+    An order as an append-only event log (add/remove/complete). `items` and
+    `item_details` are the log applied so far, and the totals are kept up to
+    date as events are appended instead of being summed on every read.
+    """
+
     items: dict[str, OrderedItem]
     item_details: dict[str, OrderStateItem] = field(default_factory=dict)
+    id: str = field(default_factory=order_uid)
+    events: list[OrderEvent] = field(default_factory=list)
+    completed: bool = False
+    _total_cents: int = 0
+    _formatted: dict[str, dict] = field(default_factory=dict, repr=False)
+    _listeners: list[OrderListener] = field(default_factory=list, repr=False)
+
+    @property
+    def total_price(self) -> float:
+        return self._total_cents / 100
+
+    @property
+    def item_count(self) -> int:
+        return len(self.item_details)
+
+    def subscribe(self, listener: OrderListener) -> Callable[[], None]:
+        """Call listener(order, event) after every appended event; returns an unsubscribe function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    async def _append(self, type: OrderEventType, order_id: str | None = None, item: dict | None = None) -> OrderEvent:
+        event = OrderEvent(
+            seq=len(self.events) + 1,
+            type=type,
+            order_id=order_id,
+            item=item,
+            total_price=self.total_price,
+            item_count=self.item_count,
+        )
+        self.events.append(event)
+
+        results = await asyncio.gather(
+            *(listener(self, event) for listener in list(self._listeners)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Order event listener failed: {result}")
+        return event
 
     async def add(self, item: OrderedItem, name: str = "", price: float = 0.0, details: dict[str, str] | None = None) -> None:
-        self.items[item.order_id] = item
-        self.item_details[item.order_id] = OrderStateItem(
+        replaced = self.item_details.get(item.order_id)
+        if replaced is not None:
+            self._total_cents -= round(replaced.price * 100)
+        state_item = OrderStateItem(
             ordered_item=item,
             name=name,
             price=price,
             details=details or {}
         )
+        self.items[item.order_id] = item
+        self.item_details[item.order_id] = state_item
+        self._formatted[item.order_id] = formatted_item = state_item.formatted()
+        self._total_cents += round(price * 100)
+        await self._append("add", item.order_id, formatted_item)
 
     async def remove(self, order_id: str) -> OrderedItem:
-        self.item_details.pop(order_id, None)
-        return self.items.pop(order_id)
+        item = self.items.pop(order_id)
+        state_item = self.item_details.pop(order_id, None)
+        self._formatted.pop(order_id, None)
+        if state_item is not None:
+            self._total_cents -= round(state_item.price * 100)
+        await self._append("remove", order_id)
+        return item
+
+    async def complete(self) -> OrderEvent:
+        """Record that the customer finished ordering; the event carries the final totals."""
+        self.completed = True
+        return await self._append("complete")
 
     def get(self, order_id: str) -> OrderedItem | None:
         return self.items.get(order_id)
     
     def get_formatted_order(self) -> list[dict]:
-        formatted_items = []
-        for order_id, state_item in self.item_details.items():
-            item = state_item.ordered_item
-            formatted_item = {
-                "order_id": order_id,
-                "type": item.type,
-                "name": state_item.name,
-                "price": state_item.price,
-                "details": state_item.details
-            }
-            
-            if item.type == "combo_meal":
-                formatted_item["meal_id"] = item.meal_id
-                formatted_item["drink_size"] = item.drink_size
-                formatted_item["fries_size"] = item.fries_size
-            elif item.type == "happy_meal":
-                formatted_item["meal_id"] = item.meal_id
-                formatted_item["drink_size"] = item.drink_size
-            elif item.type == "regular":
-                formatted_item["item_id"] = item.item_id
-                formatted_item["size"] = item.size
-                
-            formatted_items.append(formatted_item)
-            
-        return formatted_items
+        return list(self._formatted.values())
@@ -0,0 +1,114 @@
+"""
+---
+title: Drive-Thru Order Display Fan-Out
+category: drive-thru
+tags: [rpc, pub_sub, order_events, concurrency]
+difficulty: advanced
+description: Pushes order events to every display participant in the room as they happen
+demonstrates:
+  - Subscribing to an order event log
+  - Batching events that pile up while a push is in flight
+  - Concurrent RPC fan-out with a per-destination timeout
+  - Checkout screen triggered by the `complete` event
+---
+"""
+
+"""Order event fan-out to the room's display participants."""
+
+import asyncio
+import json
+import logging
+
+from order import OrderEvent, OrderState
+
+from livekit import rtc
+
+logger = logging.getLogger("drive-thru-agent")
+
+DEFAULT_RPC_TIMEOUT = 2.0
+
+
+class OrderDisplayFanout:
+    """
+    Sends every order event to all remote participants over the `order_updated`
+    RPC, and `show_checkout` when the order completes. Events are queued by the
+    order listener and sent by one task, so the agent never waits on a display
+    and displays see events in order; events queued during a send go out
+    together in the next one. Each payload carries the sequence number of its
+    last event, so a display that missed one can resync with get_order_state.
+    """
+
+    def __init__(self, room: rtc.Room, order: OrderState, *, rpc_timeout: float = DEFAULT_RPC_TIMEOUT) -> None:
+        self._room = room
+        self._order = order
+        self._rpc_timeout = rpc_timeout
+        self._queue: asyncio.Queue[OrderEvent] = asyncio.Queue()
+        self._unsubscribe = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._unsubscribe = self._order.subscribe(self._on_event)
+        self._task = asyncio.create_task(self._run())
+
+    async def _on_event(self, _: OrderState, event: OrderEvent) -> None:
+        self._queue.put_nowait(event)
+
+    async def _run(self) -> None:
+        while True:
+            events = [await self._queue.get()]
+            while not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            try:
+                await self._send(events)
+            except Exception as e:
+                logger.error(f"Failed to send order events: {e}")
+
+    async def _send(self, events: list[OrderEvent]) -> None:
+        last = events[-1]
+        calls = [
+            (
+                "order_updated",
+                json.dumps({
+                    "seq": last.seq,
+                    "events": [event.model_dump() for event in events],
+                    "total_price": last.total_price,
+                    "item_count": last.item_count,
+                }),
+            )
+        ]
+        if any(event.type == "complete" for event in events):
+            calls.append((
+                "show_checkout",
+                json.dumps({
+                    "total_price": last.total_price,
+                    "message": f"Your total is ${last.total_price:.2f}. Please drive to the next window!"
+                }),
+            ))
+
+        identities = list(self._room.remote_participants)
+        await asyncio.gather(
+            *(self._send_to(identity, method, payload) for method, payload in calls for identity in identities)
+        )
+
+    async def _send_to(self, identity: str, method: str, payload: str) -> None:
+        try:
+            # wait_for as well: response_timeout doesn't cover the connection timeout
+            await asyncio.wait_for(
+                self._room.local_participant.perform_rpc(
+                    destination_identity=identity,
+                    method=method,
+                    payload=payload,
+                    response_timeout=self._rpc_timeout,
+                ),
+                self._rpc_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"{method} to {identity} timed out")
+        except Exception as e:
+            logger.warning(f"Failed to send {method} to {identity}: {e}")
+
+    async def aclose(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+        if self._task is not None:
+            self._task.cancel()
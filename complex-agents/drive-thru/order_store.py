@@ -0,0 +1,164 @@
+"""
+---
+title: Drive-Thru Completed Order Store
+category: drive-thru
+tags: [sqlite, persistence, reporting, throughput]
+difficulty: intermediate
+description: Durable log of completed orders shared by every lane, with a throughput report
+demonstrates:
+  - Persisting completed orders from an order event listener
+  - SQLite in WAL mode shared by several worker processes
+  - Per-lane throughput reporting
+---
+"""
+
+"""
+Completed orders of every lane, kept in one SQLite file.
+
+Each lane (one worker process per lane, all pointing at the same
+DRIVE_THRU_ORDERS_DB) records an order when its `complete` event is
+appended; the write is committed before complete_order tells the customer
+to drive on. WAL mode lets lanes write while a report is being read.
+
+Report throughput per lane over the last hours:
+
+    python order_store.py --hours 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from order import OrderEvent, OrderState
+
+DEFAULT_ORDERS_PATH = Path(__file__).parent / "orders.sqlite"
+
+ORDERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completed_orders (
+    id TEXT PRIMARY KEY,
+    lane TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    completed_at REAL NOT NULL,
+    total_price REAL NOT NULL,
+    item_count INTEGER NOT NULL,
+    items TEXT NOT NULL,  -- JSON, as returned by OrderState.get_formatted_order()
+    events TEXT NOT NULL  -- JSON, the order's event log
+);
+CREATE INDEX IF NOT EXISTS completed_orders_lane_time ON completed_orders (lane, completed_at);
+"""
+
+
+@dataclass
+class LaneThroughput:
+    lane: str
+    orders: int
+    orders_per_hour: float
+    average_total: float
+    average_items: float
+    average_duration: float  # seconds from first event to completion
+
+
+class CompletedOrderStore:
+    def __init__(self, path: str | Path = DEFAULT_ORDERS_PATH) -> None:
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(ORDERS_SCHEMA)
+        self._conn.commit()
+        # One statement at a time: the connection is shared with the worker thread
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], object]):
+        async with self._lock:
+            return await asyncio.to_thread(fn, self._conn)
+
+    async def record(self, order: OrderState, lane: str) -> None:
+        """Store a completed order; completing the same order again replaces it"""
+        completed = order.events[-1]
+        row = (
+            order.id,
+            lane,
+            order.events[0].timestamp,
+            completed.timestamp,
+            completed.total_price,
+            completed.item_count,
+            json.dumps(order.get_formatted_order()),
+            json.dumps([event.model_dump() for event in order.events]),
+        )
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO completed_orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+        await self._run(insert)
+
+    def listener(self, lane: str):
+        """An OrderState listener that records the order on its `complete` event"""
+
+        async def on_event(order: OrderState, event: OrderEvent) -> None:
+            if event.type == "complete":
+                await self.record(order, lane)
+
+        return on_event
+
+    async def throughput(self, since: float, until: float | None = None) -> list[LaneThroughput]:
+        until = until or time.time()
+
+        def query(conn: sqlite3.Connection) -> list[tuple]:
+            return conn.execute(
+                """
+                SELECT lane, COUNT(*), AVG(total_price), AVG(item_count), AVG(completed_at - started_at)
+                FROM completed_orders
+                WHERE completed_at >= ? AND completed_at < ?
+                GROUP BY lane ORDER BY lane
+                """,
+                (since, until),
+            ).fetchall()
+
+        hours = max(until - since, 1) / 3600
+        return [
+            LaneThroughput(lane, orders, orders / hours, average_total, average_items, average_duration)
+            for lane, orders, average_total, average_items, average_duration in await self._run(query)
+        ]
+
+    async def aclose(self) -> None:
+        self._conn.close()
+
+
+def open_order_store() -> CompletedOrderStore:
+    return CompletedOrderStore(os.getenv("DRIVE_THRU_ORDERS_DB", DEFAULT_ORDERS_PATH))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Report completed orders per drive-thru lane")
+    parser.add_argument("--hours", type=float, default=24, help="how far back to look")
+    args = parser.parse_args()
+
+    store = open_order_store()
+    try:
+        lanes = await store.throughput(since=time.time() - args.hours * 3600)
+    finally:
+        await store.aclose()
+
+    if not lanes:
+        print(f"No completed orders in the last {args.hours:g}h")
+        return
+
+    print(f"{'lane':<20}{'orders':>8}{'per hour':>10}{'avg total':>11}{'avg items':>11}{'avg time':>10}")
+    for lane in lanes:
+        print(
+            f"{lane.lane:<20}{lane.orders:>8}{lane.orders_per_hour:>10.1f}"
+            f"{lane.average_total:>11.2f}{lane.average_items:>11.1f}{lane.average_duration:>9.0f}s"
+        )
+    total = sum(lane.orders for lane in lanes)
+    print(f"{'all lanes':<20}{total:>8}{total / args.hours:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
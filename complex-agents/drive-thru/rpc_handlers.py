@@ -14,15 +14,15 @@ def create_get_order_state_handler(userdata):
     async def get_order_state(_: RpcInvocationData) -> str:
         """Get current order state"""
         try:
-            order_items = userdata.order.get_formatted_order()
-            total_price = sum(item["price"] for item in order_items)
-            
+            order = userdata.order
             response = {
                 "success": True,
                 "data": {
-                    "items": order_items,
-                    "total_price": total_price,
-                    "item_count": len(order_items)
+                    "items": order.get_formatted_order(),
+                    "total_price": order.total_price,
+                    "item_count": order.item_count,
+                    # Displays apply order_updated pushes on top of this
+                    "seq": len(order.events),
                 }
             }
             
@@ -6,11 +6,12 @@ tags: [session_management, userdata_initialization, background_audio_setup]
 difficulty: intermediate
 description: Session setup utilities for drive-thru ordering system
 demonstrates:
-  - Userdata initialization with menu items
+  - Userdata initialization with a shared, hot-swapped menu snapshot
   - Session configuration with agent configs
   - Background audio player setup
-  - Database integration for menu loading
+  - Persistent menu store integration for menu loading
   - Max tool steps configuration
+  - Order event subscribers: display fan-out and completed order store
 ---
 """
 
@@ -26,8 +27,11 @@ from agent_config import (
     get_turn_detection_config,
     get_vad_config,
 )
-from database import FakeDB, MenuItem
+from database import Menu, MenuItem
+from menu_store import LiveMenu, open_menu_store
 from order import OrderState
+from order_display import OrderDisplayFanout
+from order_store import CompletedOrderStore, open_order_store
 
 from livekit.agents import AgentSession, AudioConfig, BackgroundAudioPlayer
 
@@ -35,31 +39,74 @@ from livekit.agents import AgentSession, AudioConfig, BackgroundAudioPlayer
 @dataclass
 class Userdata:
     order: OrderState
-    drink_items: list[MenuItem]
-    combo_items: list[MenuItem]
-    happy_items: list[MenuItem]
-    regular_items: list[MenuItem]
-    sauce_items: list[MenuItem] = None
+    live_menu: LiveMenu
     room: any = None
 
+    @property
+    def menu(self) -> Menu:
+        """The current menu snapshot; it changes when the store does"""
+        return self.live_menu.menu
+
+    @property
+    def drink_items(self) -> list[MenuItem]:
+        return list(self.menu.items("drink"))
+
+    @property
+    def combo_items(self) -> list[MenuItem]:
+        return list(self.menu.items("combo_meal"))
+
+    @property
+    def happy_items(self) -> list[MenuItem]:
+        return list(self.menu.items("happy_meal"))
+
+    @property
+    def regular_items(self) -> list[MenuItem]:
+        return list(self.menu.items("regular"))
+
+    @property
+    def sauce_items(self) -> list[MenuItem]:
+        return list(self.menu.items("sauce"))
+
+
+_live_menu: LiveMenu | None = None
+
+
+async def load_menu() -> LiveMenu:
+    """The worker's live menu, loaded from the menu store on first use and shared by every session."""
+    global _live_menu
+    if _live_menu is None:
+        live_menu = LiveMenu(open_menu_store())
+        await live_menu.start()
+        _live_menu = live_menu
+    return _live_menu
+
+
+_order_store: CompletedOrderStore | None = None
+
+
+def load_order_store() -> CompletedOrderStore:
+    """The worker's completed order store, opened on first use"""
+    global _order_store
+    if _order_store is None:
+        _order_store = open_order_store()
+    return _order_store
+
+
+def setup_order_events(userdata: Userdata) -> OrderDisplayFanout:
+    """Record completed orders for this lane and push order events to the room's displays."""
+    lane = os.getenv("DRIVE_THRU_LANE") or userdata.room.name
+    userdata.order.subscribe(load_order_store().listener(lane))
+    fanout = OrderDisplayFanout(userdata.room, userdata.order)
+    fanout.start()
+    return fanout
+
 
 async def new_userdata() -> Userdata:
     """Create and initialize user data."""
-    fake_db = FakeDB()
-    drink_items = await fake_db.list_drinks()
-    combo_items = await fake_db.list_combo_meals()
-    happy_items = await fake_db.list_happy_meals()
-    regular_items = await fake_db.list_regulars()
-    sauce_items = await fake_db.list_sauces()
-
     order_state = OrderState(items={})
     userdata = Userdata(
         order=order_state,
-        drink_items=drink_items,
-        combo_items=combo_items,
-        happy_items=happy_items,
-        regular_items=regular_items,
-        sauce_items=sauce_items,
+        live_menu=await load_menu(),
     )
     return userdata
 
@@ -0,0 +1,76 @@
+"""
+---
+title: Drive-Thru Menu Store Tests
+category: drive-thru
+tags: [pytest, sqlite, hot_reload, availability]
+difficulty: intermediate
+description: Tests for the live menu snapshot against a temporary SQLite menu store
+demonstrates:
+  - Availability changes applied without a full reload
+  - Structural menu changes reloading the snapshot
+---
+"""
+
+import asyncio
+
+import pytest
+
+from database import Menu
+from menu_store import LiveMenu, MenuStore, SQLiteMenuStore
+
+
+async def _live_menu(store: MenuStore) -> tuple[LiveMenu, list[bool]]:
+    # A poll interval long enough that only the test's refresh() calls check the store
+    live_menu = LiveMenu(store, poll_interval=3600)
+    await live_menu.start()
+    changes: list[bool] = []
+
+    async def on_change(menu: Menu, structural: bool) -> None:
+        changes.append(structural)
+
+    live_menu.subscribe(on_change)
+    return live_menu, changes
+
+
+def test_menu_store_is_abstract():
+    with pytest.raises(TypeError):
+        MenuStore()
+
+
+def test_availability_change_updates_the_snapshot(tmp_path):
+    async def main():
+        store = SQLiteMenuStore(tmp_path / "menu.sqlite")
+        live_menu, changes = await _live_menu(store)
+        try:
+            before = live_menu.menu
+            assert before.is_available("sweet_tea")
+            assert not await live_menu.refresh()
+
+            assert await store.set_available("sweet_tea", False) > 0
+            assert await live_menu.refresh()
+            return before, live_menu.menu, changes
+        finally:
+            await live_menu.aclose()
+
+    before, after, changes = asyncio.run(main())
+    assert changes == [False]  # availability only, not a structural change
+    assert not after.is_available("sweet_tea")
+    assert after.is_available("coca_cola")
+    assert before.is_available("sweet_tea")  # snapshots are immutable
+
+
+def test_menu_change_reloads_the_snapshot(tmp_path):
+    async def main():
+        store = SQLiteMenuStore(tmp_path / "menu.sqlite")
+        live_menu, changes = await _live_menu(store)
+        try:
+            items = await store.load_items()
+            await store.replace_items(item for item in items if item.id != "sweet_tea")
+            assert await live_menu.refresh()
+            return live_menu.menu, changes
+        finally:
+            await live_menu.aclose()
+
+    menu, changes = asyncio.run(main())
+    assert changes == [True]
+    assert not menu.find("sweet_tea")
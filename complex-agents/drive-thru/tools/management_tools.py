@@ -9,15 +9,14 @@ demonstrates:
   - Order removal with validation
   - Order listing and formatting
   - Checkout completion flow
-  - RPC integration for UI updates
+  - Checkout recorded as an order event (displays and order store subscribe to it)
   - Error handling with ToolError
-  - Order total calculation
+  - Incrementally maintained order totals
 ---
 """
 
 """Order management tools for drive-thru agent."""
 
-import json
 import logging
 from typing import Annotated
 
@@ -88,28 +87,12 @@ async def complete_order(ctx: RunContext) -> str:
 
     This will show the total and direct them to drive to the payment window.
     """
-    order_items = ctx.userdata.order.get_formatted_order()
-    if not order_items:
+    order = ctx.userdata.order
+    if not order.items:
         return "Cannot complete order - the order is empty. Please add items first."
 
-    total_price = sum(item["price"] for item in order_items)
-
-    # Send RPC to show checkout screen
-    try:
-        room = ctx.userdata.room
-        if room:
-            # Send to all participants
-            remote_participants = list(room.remote_participants.values())
-            for participant in remote_participants:
-                await room.local_participant.perform_rpc(
-                    destination_identity=participant.identity,
-                    method="show_checkout",
-                    payload=json.dumps({
-                        "total_price": total_price,
-                        "message": f"Your total is ${total_price:.2f}. Please drive to the next window!"
-                    })
-                )
-    except Exception as e:
-        logger.error(f"Failed to send checkout RPC: {e}")
-
-    return f"Order completed! Total: ${total_price:.2f}. Please drive to the next window for payment."
\ No newline at end of file
+    # Displays get the checkout screen from the `complete` event (see order_display.py),
+    # and the order is stored for throughput reporting before we return
+    completed = await order.complete()
+
+    return f"Order completed! Total: ${completed.total_price:.2f}. Please drive to the next window for payment."
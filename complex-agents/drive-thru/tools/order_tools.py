@@ -25,19 +25,26 @@ from pydantic import Field
 
 from livekit.agents import FunctionTool, RunContext, ToolError, function_tool
 
-from database import MenuItem, find_items_by_id
+from database import Menu
 from order import OrderedCombo, OrderedHappy, OrderedRegular
 
 
-def build_combo_order_tool(
-    combo_items: list[MenuItem], 
-    drink_items: list[MenuItem], 
-    sauce_items: list[MenuItem] | None
-) -> FunctionTool:
+def _unavailable(menu: Menu, *items: str | tuple[str, str | None] | None) -> str | None:
+    """The first of items (ids, or (id, size) pairs) that can't be ordered right now"""
+    for item in items:
+        item_id, size = item if isinstance(item, tuple) else (item, None)
+        if size not in menu.sizes(item_id):
+            size = None
+        if item_id and not menu.is_available(item_id, size):
+            return " ".join(filter(None, [size, item_id]))
+    return None
+
+
+def build_combo_order_tool(menu: Menu) -> FunctionTool:
     """Build the combo meal ordering tool."""
-    available_combo_ids = {item.id for item in combo_items}
-    available_drink_ids = {item.id for item in drink_items}
-    available_sauce_ids = {item.id for item in sauce_items} if sauce_items else set()
+    available_combo_ids = menu.ids("combo_meal")
+    available_drink_ids = menu.ids("drink")
+    available_sauce_ids = menu.ids("sauce")
 
     @function_tool
     async def order_combo_meal(
@@ -84,17 +91,20 @@ def build_combo_order_tool(
         Don't repeat the item name, just say something like "sure thing", or "yep absolutely".
         Don't say something like "Item XYZ coming right up!"
         """
-        if not find_items_by_id(combo_items, meal_id):
+        # The worker's current menu: availability may have changed since the tool was built
+        current = ctx.userdata.menu
+        meals = current.find(meal_id, "combo_meal")
+        if not meals:
             raise ToolError(f"error: the meal {meal_id} was not found")
 
-        drink_sizes = find_items_by_id(drink_items, drink_id)
+        drink_sizes = current.find(drink_id, "drink")
         if not drink_sizes:
             raise ToolError(f"error: the drink {drink_id} was not found")
 
         if drink_size == "null":
             drink_size = None
 
-        available_sizes = list({item.size for item in drink_sizes if item.size})
+        available_sizes = current.sizes(drink_id)
         if drink_size is None and len(available_sizes) > 1:
             raise ToolError(
                 f"error: {drink_id} comes with multiple sizes: {', '.join(available_sizes)}. "
@@ -106,13 +116,17 @@ def build_combo_order_tool(
                 f"error: size should not be specified for item {drink_id} as it does not support sizing options."
             )
 
-        available_sizes = list({item.size for item in drink_sizes if item.size})
         if drink_size not in available_sizes:
             drink_size = None
 
-        if sauce_id and not find_items_by_id(sauce_items, sauce_id):
+        sauces = current.find(sauce_id, "sauce") if sauce_id else ()
+        if sauce_id and not sauces:
             raise ToolError(f"error: the sauce {sauce_id} was not found")
 
+        unavailable = _unavailable(current, meal_id, (drink_id, drink_size), sauce_id)
+        if unavailable:
+            raise ToolError(f"error: {unavailable} is unavailable right now")
+
         item = OrderedCombo(
             meal_id=meal_id,
             drink_id=drink_id,
@@ -122,9 +136,9 @@ def build_combo_order_tool(
         )
         
         # Get menu item details
-        meal = find_items_by_id(combo_items, meal_id)[0]
-        drink = find_items_by_id(drink_items, drink_id)[0] if drink_sizes else None
-        sauce = find_items_by_id(sauce_items, sauce_id)[0] if sauce_id else None
+        meal = meals[0]
+        drink = drink_sizes[0]
+        sauce = sauces[0] if sauces else None
         
         details = {
             "meal": meal.name,
@@ -141,15 +155,11 @@ def build_combo_order_tool(
     return order_combo_meal
 
 
-def build_happy_order_tool(
-    happy_items: list[MenuItem],
-    drink_items: list[MenuItem],
-    sauce_items: list[MenuItem] | None,
-) -> FunctionTool:
+def build_happy_order_tool(menu: Menu) -> FunctionTool:
     """Build the happy meal ordering tool."""
-    available_happy_ids = {item.id for item in happy_items}
-    available_drink_ids = {item.id for item in drink_items}
-    available_sauce_ids = {item.id for item in sauce_items} if sauce_items else set()
+    available_happy_ids = menu.ids("happy_meal")
+    available_drink_ids = menu.ids("drink")
+    available_sauce_ids = menu.ids("sauce")
 
     @function_tool
     async def order_happy_meal(
@@ -193,17 +203,19 @@ def build_happy_order_tool(
         Don't repeat the item name, just say something like "sure thing", or "yep absolutely".
         Don't say something like "Item XYZ coming right up!"
         """
-        if not find_items_by_id(happy_items, meal_id):
+        current = ctx.userdata.menu
+        meals = current.find(meal_id, "happy_meal")
+        if not meals:
             raise ToolError(f"error: the meal {meal_id} was not found")
 
-        drink_sizes = find_items_by_id(drink_items, drink_id)
+        drink_sizes = current.find(drink_id, "drink")
         if not drink_sizes:
             raise ToolError(f"error: the drink {drink_id} was not found")
 
         if drink_size == "null":
             drink_size = None
 
-        available_sizes = list({item.size for item in drink_sizes if item.size})
+        available_sizes = current.sizes(drink_id)
         if drink_size is None and len(available_sizes) > 1:
             raise ToolError(
                 f"error: {drink_id} comes with multiple sizes: {', '.join(available_sizes)}. "
@@ -213,9 +225,14 @@ def build_happy_order_tool(
         if drink_size is not None and not available_sizes:
             drink_size = None
 
-        if sauce_id and not find_items_by_id(sauce_items, sauce_id):
+        sauces = current.find(sauce_id, "sauce") if sauce_id else ()
+        if sauce_id and not sauces:
             raise ToolError(f"error: the sauce {sauce_id} was not found")
 
+        unavailable = _unavailable(current, meal_id, (drink_id, drink_size), sauce_id)
+        if unavailable:
+            raise ToolError(f"error: {unavailable} is unavailable right now")
+
         item = OrderedHappy(
             meal_id=meal_id,
             drink_id=drink_id,
@@ -224,9 +241,9 @@ def build_happy_order_tool(
         )
         
         # Get menu item details
-        meal = find_items_by_id(happy_items, meal_id)[0]
-        drink = find_items_by_id(drink_items, drink_id)[0] if drink_sizes else None
-        sauce = find_items_by_id(sauce_items, sauce_id)[0] if sauce_id else None
+        meal = meals[0]
+        drink = drink_sizes[0]
+        sauce = sauces[0] if sauces else None
         
         details = {
             "meal": meal.name,
@@ -242,14 +259,9 @@ def build_happy_order_tool(
     return order_happy_meal
 
 
-def build_regular_order_tool(
-    regular_items: list[MenuItem],
-    drink_items: list[MenuItem],
-    sauce_items: list[MenuItem] | None,
-) -> FunctionTool:
+def build_regular_order_tool(menu: Menu) -> FunctionTool:
     """Build the regular item ordering tool."""
-    all_items = regular_items + drink_items + (sauce_items or [])
-    available_ids = {item.id for item in all_items}
+    available_ids = menu.ids("regular") + menu.ids("drink") + menu.ids("sauce")
 
     @function_tool
     async def order_regular_item(
@@ -284,14 +296,15 @@ def build_regular_order_tool(
         Don't repeat the item name, just say something like "sure thing", or "yep absolutely".
         Don't say something like "Item XYZ coming right up!"
         """
-        item_sizes = find_items_by_id(all_items, item_id)
+        current = ctx.userdata.menu
+        item_sizes = current.find(item_id, "regular", "drink", "sauce")
         if not item_sizes:
             raise ToolError(f"error: {item_id} was not found.")
 
         if size == "null":
             size = None
 
-        available_sizes = list({item.size for item in item_sizes if item.size})
+        available_sizes = current.sizes(item_id)
         if size is None and len(available_sizes) > 1:
             raise ToolError(
                 f"error: {item_id} comes with multiple sizes: {', '.join(available_sizes)}. "
@@ -306,10 +319,15 @@ def build_regular_order_tool(
                 f"error: unknown size {size} for {item_id}. Available sizes: {', '.join(available_sizes)}."
             )
 
+        unavailable = _unavailable(current, (item_id, size))
+        if unavailable:
+            raise ToolError(f"error: {unavailable} is unavailable right now")
+
         item = OrderedRegular(item_id=item_id, size=size)
         
         # Get menu item details
-        menu_item = item_sizes[0]  # We already have the items from find_items_by_id
+        # Price of the size that was ordered, not just the first size on the menu
+        menu_item = current.find(item_id, size=size)[0] if size else item_sizes[0]
         
         details = {}
         if size:
@@ -18,14 +18,21 @@ demonstrates:
 
 import logging
 import json
+import os
 from dotenv import load_dotenv
 
-from livekit.agents import JobContext, WorkerOptions, cli, AgentSession
+from livekit.agents import JobContext, JobProcess, WorkerOptions, cli, AgentSession
 from livekit.rtc import RpcInvocationData
 
 # Import our modular components
 from core.game_state import GameUserData
+from core.state_broadcaster import StateBroadcaster
+from core.campaign_store import CampaignSnapshotter, campaign_id_for, open_campaign_store, restore_game_state
 from agents.narrator_agent import NarratorAgent
+from agents.combat_agent import CombatAgent
+from game_mechanics import set_event_sinks
+from utils.display import render_combat_event
+from utils.prompt_loader import documents
 
 logger = logging.getLogger("dungeons-and-agents")
 logger.setLevel(logging.INFO)
@@ -33,12 +40,53 @@ logger.setLevel(logging.INFO)
 load_dotenv()
 
 
+def prewarm(proc: JobProcess):
+    """Parse the prompts and rules once per process, before any session needs them"""
+    loaded = documents.preload()
+    logger.info(f"Preloaded {loaded} prompt and rule files")
+
+
 async def entrypoint(ctx: JobContext):
     """Main entry point for the game"""
-    await ctx.connect()
     # Initialize user data
     userdata = GameUserData(ctx=ctx)
     
+    # Rolls and attacks of this session go to its own event log, and to the
+    # console only when asked for: sessions sharing a worker don't contend for stdout.
+    # Set before anything starts tasks, so they all inherit it.
+    if os.getenv("GAME_CONSOLE_EVENTS"):
+        set_event_sinks(userdata.combat_events, render_combat_event)
+    else:
+        set_event_sinks(userdata.combat_events)
+    
+    # Designers editing rules/*.yaml or prompts/*.yaml see their changes in the next
+    # NPC, item or handoff without restarting the worker
+    if os.getenv("GAME_RULES_HOT_RELOAD"):
+        documents.start_watching()
+    
+    await ctx.connect()
+    userdata.state_broadcaster = StateBroadcaster(ctx.room)
+    ctx.add_shutdown_callback(userdata.state_broadcaster.aclose)
+    # Don't leave NPC generations (LLM calls) running for a room that is gone
+    ctx.add_shutdown_callback(userdata.npc_pool.aclose)
+    # Nor a summary of evicted turns (an LLM call) for a session that is over
+    ctx.add_shutdown_callback(userdata.rolling_context.aclose)
+    
+    # Pick the campaign up where a previous worker left it, and keep saving it
+    campaign_store = open_campaign_store()
+    campaign_id = campaign_id_for(ctx)
+    snapshot = await campaign_store.load(campaign_id)
+    if snapshot:
+        try:
+            restore_game_state(userdata, snapshot)
+            logger.info(f"Restored campaign {campaign_id} ({len(snapshot)} bytes, {userdata.game_state})")
+        except Exception as e:
+            logger.error(f"Failed to restore campaign {campaign_id}, starting over: {e}")
+    snapshotter = CampaignSnapshotter(campaign_store, campaign_id, userdata)
+    snapshotter.start()
+    ctx.add_shutdown_callback(snapshotter.aclose)
+    ctx.add_shutdown_callback(campaign_store.aclose)
+    
     # RPC Handlers
     async def get_game_state(data: RpcInvocationData) -> str:
         """Get current game state, player stats, and inventory"""
@@ -109,7 +157,8 @@ async def entrypoint(ctx: JobContext):
                     "round": cs.round_number,
                     "current_turn_index": cs.current_turn_index,
                     "turn_order": [char.name for char in cs.initiative_order],
-                    "participants": []
+                    "participants": [],
+                    "recent_events": [event._asdict() for event in userdata.combat_events.recent(20)]
                 }
                 
                 # Add all participants from the initiative order
@@ -203,17 +252,19 @@ async def entrypoint(ctx: JobContext):
     
     logger.info("RPC methods registered: get_game_state, get_combat_state, get_inventory, get_current_context")
     
-    # Create initial agent
-    narrator_agent = NarratorAgent()
+    # Create initial agent: back into the fight if the campaign was saved mid-combat
+    if userdata.combat_state and not userdata.combat_state.is_complete:
+        initial_agent = CombatAgent()
+    else:
+        initial_agent = NarratorAgent()
     
     # Create session with user data
     session = AgentSession[GameUserData](userdata=userdata)
     
     userdata.session = session
     
-    # Start with narrator agent
-    await session.start(agent=narrator_agent, room=ctx.room)
+    await session.start(agent=initial_agent, room=ctx.room)
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
\ No newline at end of file
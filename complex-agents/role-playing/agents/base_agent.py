@@ -11,15 +11,14 @@ demonstrates:
   - Game state integration and management
   - RPC communication for client updates
   - Agent lifecycle management with session data
-  - Context truncation and memory management
+  - Token-budgeted context carried over incrementally on handoff
 ---
 """
 
 import logging
-import json
 from typing import List
 from livekit.agents.voice import Agent
-from livekit.agents.llm import ChatContext
+from livekit.agents.llm import ChatContext, ChatMessage
 
 from character import NPCCharacter
 
@@ -39,56 +38,28 @@ class BaseGameAgent(Agent):
         if userdata.ctx and userdata.ctx.room:
             await userdata.ctx.room.local_participant.set_attributes({"agent": agent_name})
         
-        # Preserve chat context across agent switches
-        chat_ctx = self.chat_ctx.copy()
-        
-        # If there was a previous agent, inherit its chat context
-        if hasattr(userdata, 'prev_agent') and userdata.prev_agent:
-            items_copy = self._truncate_chat_ctx(
-                userdata.prev_agent.chat_ctx.items, 
-                keep_function_call=True,
-                keep_last_n_messages=200  # Keep many messages for RPG context
-            )
-            existing_ids = {item.id for item in chat_ctx.items}
-            items_copy = [item for item in items_copy if item.id not in existing_ids]
-            chat_ctx.items.extend(items_copy)
-        
-        # Add current game state as system message
-        chat_ctx.add_message(
-            role="system",
-            content=f"Current game state:\n{userdata.summarize()}"
-        )
-        await self.update_chat_ctx(chat_ctx)
-    
-    def _truncate_chat_ctx(
-        self,
-        items: list,
-        keep_last_n_messages: int = 200,
-        keep_system_message: bool = False,
-        keep_function_call: bool = False,
-    ) -> list:
-        """Truncate the chat context to keep the last n messages."""
-        def _valid_item(item) -> bool:
-            if not keep_system_message and item.type == "message" and item.role == "system":
-                return False
-            if not keep_function_call and item.type in ["function_call", "function_call_output"]:
-                return False
-            return True
+        # Carry the conversation over from the previous agent: only what it added since the
+        # last handoff is looked at, and the rolling context keeps the total under budget
+        rolling_context = userdata.rolling_context
+        if userdata.prev_agent:
+            rolling_context.sync(userdata.prev_agent.chat_ctx.items)
+            # Nothing else needs the previous agent; don't keep its context alive
+            userdata.prev_agent = None
+        await self.update_chat_ctx(rolling_context.build(self.chat_ctx, userdata.summarize()))
+        self._rolling_evictions = rolling_context.evictions
 
-        new_items = []
-        for item in reversed(items):
-            if _valid_item(item):
-                new_items.append(item)
-            if len(new_items) >= keep_last_n_messages:
-                break
-        new_items = new_items[::-1]
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage) -> None:
+        """Keep a long stay with one agent within the token budget too"""
+        userdata = self.session.userdata
+        rolling_context = userdata.rolling_context
+        rolling_context.sync(self.chat_ctx.items)
+        if rolling_context.evictions != getattr(self, "_rolling_evictions", None):
+            chat_ctx = rolling_context.build(self.chat_ctx, userdata.summarize())
+            await self.update_chat_ctx(chat_ctx)
+            # This turn's reply is generated from turn_ctx, a copy taken before the update
+            turn_ctx.items[:] = chat_ctx.items
+            self._rolling_evictions = rolling_context.evictions
 
-        # Remove orphaned function calls at the beginning
-        while new_items and new_items[0].type in ["function_call", "function_call_output"]:
-            new_items.pop(0)
-
-        return new_items
-    
     def _get_active_enemies(self, userdata) -> List[NPCCharacter]:
         """Get list of active enemy NPCs"""
         if userdata.combat_state and not userdata.combat_state.is_complete:
@@ -96,37 +67,13 @@ class BaseGameAgent(Agent):
         return []
     
     async def emit_state_update(self, update_type: str, data: dict = None) -> None:
-        """Emit a state update to all connected clients via RPC"""
+        """Emit a state update to all connected clients via RPC (queued; doesn't wait for the clients)"""
         from core.game_state import GameUserData
         userdata: GameUserData = self.session.userdata
         
-        if not userdata.ctx or not userdata.ctx.room:
+        if not userdata.state_broadcaster:
             logger.warning("Cannot emit state update: no room context")
             return
-            
-        payload = {
-            "type": update_type,
-            "data": data or {}
-        }
-        
-        logger.info(f"Emitting state update: {update_type}")
         
-        try:
-            room = userdata.ctx.room
-            remote_participants = list(room.remote_participants.values())
-            
-            logger.info(f"Found {len(remote_participants)} remote participants to notify")
-            
-            for participant in remote_participants:
-                try:
-                    await room.local_participant.perform_rpc(
-                        destination_identity=participant.identity,
-                        method="game_state_update",
-                        payload=json.dumps(payload)
-                    )
-                    logger.info(f"Successfully emitted {update_type} update to {participant.identity}")
-                except Exception as e:
-                    logger.error(f"Failed to emit update to {participant.identity}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Failed to emit state update: {e}")
\ No newline at end of file
+        seq = userdata.state_broadcaster.publish(update_type, data)
+        logger.debug(f"Queued state update {seq}: {update_type}")
\ No newline at end of file
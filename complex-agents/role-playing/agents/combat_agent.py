@@ -190,6 +190,7 @@ class CombatAgent(BaseGameAgent):
             logger.info("Player defeated - ending session")
             await self.session.say("Thank you for playing Dungeons and Agents. Until next time, brave adventurer!")
             await self.session.drain()  # Ensure all messages are sent
+            await userdata.state_broadcaster.flush()  # and the defeat reaches the UI
             await self.session.aclose()
             
             # Delete the room
@@ -9,6 +9,7 @@ demonstrates:
   - Dynamic storytelling and narrative flow
   - Multi-voice character portrayal with TTS switching
   - NPC interaction and dialogue management
+  - NPCs pre-generated in the background for the current location
   - World exploration and location transitions
   - Character creation and progression
   - Trading and inventory management
@@ -26,7 +27,6 @@ from livekit.plugins import deepgram, openai, silero, inworld
 
 from agents.base_agent import BaseGameAgent
 from character import PlayerCharacter, NPCCharacter, CharacterClass, CharacterStats, Item
-from generators.npc_generator import create_npc_by_role
 from core.game_state import RunContext_T
 from game_mechanics import SkillCheck, Combat, GameUtilities, DiceRoller
 from utils.display import Colors
@@ -54,6 +54,9 @@ class NarratorAgent(BaseGameAgent):
         await super().on_enter()
         userdata = self.session.userdata
         
+        # Get the NPCs of this location ready while we talk
+        userdata.npc_pool.warm(userdata.current_location, userdata.story_context[-3:])
+        
         # Track if we handled combat ending
         combat_was_just_ended = False
         
@@ -300,7 +303,7 @@ class NarratorAgent(BaseGameAgent):
         if not npc:
             # Create NPC with dynamic generation
             recent_events = userdata.story_context[-3:] if userdata.story_context else []
-            npc = await create_npc_by_role(npc_name, userdata.current_location, recent_events)
+            npc = await userdata.npc_pool.get(npc_name, userdata.current_location, recent_events)
             userdata.current_npcs.append(npc)
             npc_created = True
         
@@ -424,6 +427,7 @@ class NarratorAgent(BaseGameAgent):
                 userdata.current_npcs.extend(enemies)
                 return await self._initiate_combat(context, enemies)
             
+            userdata.npc_pool.warm(new_location, userdata.story_context[-3:])
             location_desc = GameUtilities.describe_environment(new_location.split("_")[0])
             return f"You travel {specific_direction} to {new_location.replace('_', ' ')}. {location_desc}"
         else:
@@ -730,7 +734,7 @@ class NarratorAgent(BaseGameAgent):
         if not npc:
             # Create NPC with dynamic inventory
             recent_events = userdata.story_context[-3:] if userdata.story_context else []
-            npc = await create_npc_by_role(npc_name, userdata.current_location, recent_events)
+            npc = await userdata.npc_pool.get(npc_name, userdata.current_location, recent_events)
             userdata.current_npcs.append(npc)
             npc_created = True
         
@@ -8,10 +8,12 @@ description: Centralized game state management for RPG sessions with type-safe d
 demonstrates:
   - Dataclass-based state management
   - Session data persistence across agent switches
+  - Token-budgeted conversation shared across agent switches
   - Type-safe context handling with generics
   - Game progression tracking and history
   - Multi-agent state coordination
   - Combat state integration
+  - Per-session log of structured combat events
 ---
 """
 
@@ -21,7 +23,10 @@ from livekit.agents import JobContext, AgentSession
 from livekit.agents.voice import RunContext
 
 from character import PlayerCharacter, NPCCharacter
-from game_mechanics import CombatState
+from game_mechanics import CombatState, CombatEventLog
+from core.rolling_context import RollingContext
+from generators.npc_pool import NPCPool
+from core.state_broadcaster import StateBroadcaster
 
 if TYPE_CHECKING:
     from livekit.agents.voice import Agent
@@ -36,11 +41,15 @@ class GameUserData:
     current_npcs: List[NPCCharacter] = field(default_factory=list)
     game_state: str = "character_creation"  # character_creation, exploration, combat, dialogue
     combat_state: Optional[CombatState] = None
+    state_broadcaster: Optional[StateBroadcaster] = None  # game_state_update fan-out to the room
+    combat_events: CombatEventLog = field(default_factory=CombatEventLog)  # Recent rolls and attacks of this session
     story_context: List[str] = field(default_factory=list)
     current_agent_type: str = "narrator"
     current_location: str = "tavern"
     prev_agent: Optional['Agent'] = None  # For context preservation
+    rolling_context: RollingContext = field(default_factory=RollingContext)  # Conversation shared by all agents
     active_npc: Optional[NPCCharacter] = None  # NPC currently in dialogue
+    npc_pool: NPCPool = field(default_factory=NPCPool)  # NPCs pre-generated for the current location
     voice_acting_character: Optional[str] = None  # Character currently being voice acted
     combat_just_ended: bool = False  # Flag to indicate combat recently ended
     combat_result: Optional[dict] = None  # Store combat results (xp, loot) for narrator
@@ -0,0 +1,251 @@
+"""
+---
+title: Rolling Story Context
+category: complex-agents
+tags: [rpg, chat-context, token-budget, summarization, agent-switching]
+difficulty: advanced
+description: Conversation shared across agent handoffs, kept under a token budget by summarizing old turns
+demonstrates:
+  - Incremental sync of an agent's chat context (only new items are looked at)
+  - Token-budgeted rolling window with turn-aligned eviction
+  - Background LLM summarization of evicted turns
+  - A single, replaceable game-state system message
+---
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+from livekit.agents.llm import ChatContext, ChatMessage
+
+from generators.llm_client import get_llm
+
+logger = logging.getLogger("dungeons-and-agents")
+
+SUMMARY_MESSAGE_ID = "rolling_context_summary"
+GAME_STATE_MESSAGE_ID = "rolling_context_game_state"
+
+DEFAULT_MAX_TOKENS = 6000
+DEFAULT_SUMMARY_MAX_TOKENS = 600
+CHARS_PER_TOKEN = 4  # rough estimate for English prose; good enough for a budget
+ITEM_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "You keep the running summary of a tabletop RPG session. Merge the new events into the "
+    "story so far. Keep names, places, quests, promises, items gained or lost and unresolved "
+    "threads; drop banter and dice mechanics. Write at most {max_words} words of plain prose."
+)
+
+# (summary so far, evicted lines) -> new summary
+Summarizer = Callable[[str, List[str]], Awaitable[str]]
+
+
+def estimate_tokens(item) -> int:
+    """Approximate token count of a chat item"""
+    if item.type == "message":
+        text = item.text_content or ""
+    elif item.type == "function_call":
+        text = item.name + item.arguments
+    elif item.type == "function_call_output":
+        text = item.output
+    else:
+        text = ""
+    return len(text) // CHARS_PER_TOKEN + ITEM_OVERHEAD_TOKENS
+
+
+def describe_item(item) -> Optional[str]:
+    """One line per chat item for the summarizer"""
+    if item.type == "message":
+        speaker = "Player" if item.role == "user" else "Game master"
+        return f"{speaker}: {item.text_content or ''}"
+    if item.type == "function_call":
+        return f"[{item.name}({item.arguments})]"
+    if item.type == "function_call_output":
+        return f"[-> {item.output[:300]}]"
+    return None
+
+
+async def summarize_with_llm(summary: str, lines: List[str], max_words: int = 300) -> str:
+    """Default summarizer: fold the evicted lines into the summary with a small model"""
+    ctx = ChatContext([
+        ChatMessage(type="message", role="system", content=[SUMMARY_INSTRUCTIONS.format(max_words=max_words)]),
+        ChatMessage(
+            type="message",
+            role="user",
+            content=[f"Story so far:\n{summary or '(nothing yet)'}\n\nNew events:\n" + "\n".join(lines)],
+        ),
+    ])
+
+    response = ""
+    async with get_llm("gpt-4o-mini").chat(chat_ctx=ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                response += chunk.delta.content
+    return response.strip()
+
+
+class RollingContext:
+    """
+    The conversation carried from agent to agent, kept under a token budget.
+
+    `sync` takes in the items an agent added since the last sync, scanning its
+    chat context backwards only until the last item already seen. When the
+    window goes over budget, the oldest turns are evicted and folded into a
+    running summary by a background task, so neither handoffs nor turns wait
+    on the summarizer. `build` lays out an agent's chat context as: its own
+    system messages, the summary, the window, then one game-state message that
+    replaces the previous one instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        summary_max_tokens: int = DEFAULT_SUMMARY_MAX_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summary = ""
+        self.evictions = 0  # bumped whenever the window loses items
+        self._summarizer = summarizer or (
+            lambda summary, lines: summarize_with_llm(summary, lines, max_words=summary_max_tokens // 2)
+        )
+        self._items = deque()
+        self._ids = set()
+        self._tokens = 0
+        self._last_id: Optional[str] = None
+        self._pending: List[str] = []  # evicted lines not summarized yet
+        self._summary_task: Optional[asyncio.Task] = None
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of the window plus the summary"""
+        return self._tokens + len(self.summary_text()) // CHARS_PER_TOKEN
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def _carried(item) -> bool:
+        # System messages belong to the agent that made them (or are rebuilt by us)
+        if item.type == "message":
+            return item.role in ("user", "assistant")
+        return item.type in ("function_call", "function_call_output")
+
+    def sync(self, items: list) -> int:
+        """Take in the items of a chat context added since the last sync; returns how many"""
+        start = 0
+        if self._last_id is not None:
+            for i in range(len(items) - 1, -1, -1):
+                if items[i].id == self._last_id:
+                    start = i + 1
+                    break
+            # Not found: a context rebuilt after that item was evicted; the ids below catch repeats
+
+        new_items = [item for item in items[start:] if self._carried(item) and item.id not in self._ids]
+        for item in new_items:
+            self._items.append(item)
+            self._ids.add(item.id)
+            self._tokens += estimate_tokens(item)
+        if new_items:
+            self._last_id = new_items[-1].id
+        self._evict()
+        return len(new_items)
+
+    def _evict(self) -> None:
+        evicted = []
+        while self._tokens > self.max_tokens and len(self._items) > 1:
+            evicted.append(self._pop())
+        # Don't leave tool calls or outputs without the turn that made them
+        while evicted and self._items and self._items[0].type in ("function_call", "function_call_output"):
+            evicted.append(self._pop())
+        if not evicted:
+            return
+
+        self.evictions += 1
+        self._pending.extend(line for line in map(describe_item, evicted) if line)
+        # If the summarizer can't keep up, drop the oldest pending lines rather than grow
+        budget = self.summary_max_tokens * CHARS_PER_TOKEN * 4
+        while len(self._pending) > 1 and sum(len(line) for line in self._pending) > budget:
+            self._pending.pop(0)
+
+        if self._summary_task is None or self._summary_task.done():
+            try:
+                self._summary_task = asyncio.get_running_loop().create_task(self._summarize())
+            except RuntimeError:
+                pass  # no loop (offline use): pending lines are shown as they are
+
+    def _pop(self):
+        item = self._items.popleft()
+        self._ids.discard(item.id)
+        self._tokens -= estimate_tokens(item)
+        return item
+
+    async def _summarize(self) -> None:
+        while self._pending:
+            lines, self._pending = self._pending, []
+            try:
+                self.summary = await self._summarizer(self.summary, lines)
+            except Exception as e:
+                logger.error(f"Failed to summarize evicted turns: {e}")
+                self.summary = self._clip("\n".join([self.summary, *lines]).strip())
+
+    def _clip(self, text: str) -> str:
+        # Keep the most recent part
+        limit = self.summary_max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= limit else "..." + text[-limit:]
+
+    def summary_text(self) -> str:
+        """The summary, plus evicted lines the summarizer hasn't folded in yet"""
+        if not self._pending:
+            return self.summary
+        return self._clip("\n".join([self.summary, *self._pending]).strip())
+
+    def build(self, chat_ctx: ChatContext, game_state: str) -> ChatContext:
+        """A copy of chat_ctx laid out from the rolling context, ending with the current game state"""
+        ctx = chat_ctx.copy()
+        own = [
+            item
+            for item in ctx.items
+            if not self._carried(item) and item.id not in (SUMMARY_MESSAGE_ID, GAME_STATE_MESSAGE_ID)
+        ]
+        items = own
+        summary = self.summary_text()
+        if summary:
+            items.append(ChatMessage(
+                id=SUMMARY_MESSAGE_ID,
+                role="system",
+                content=[f"Story so far (earlier turns, summarized):\n{summary}"],
+            ))
+        items.extend(self._items)
+        items.append(ChatMessage(id=GAME_STATE_MESSAGE_ID, role="system", content=[f"Current game state:\n{game_state}"]))
+        ctx.items[:] = items
+        return ctx
+
+    def to_dict(self) -> dict:
+        """The summary (with pending lines folded in) and the window, for a campaign snapshot"""
+        return {
+            "summary": self.summary_text(),
+            "items": ChatContext(list(self._items)).to_dict(exclude_metrics=True)["items"],
+        }
+
+    def load(self, data: dict) -> None:
+        """Replace the summary and window with those of a snapshot"""
+        items = ChatContext.from_dict({"items": data.get("items", [])}).items
+        self.summary = data.get("summary", "")
+        self._pending = []
+        self._items.clear()
+        self._ids.clear()
+        self._tokens = 0
+        for item in items:
+            self._items.append(item)
+            self._ids.add(item.id)
+            self._tokens += estimate_tokens(item)
+        self._last_id = self._items[-1].id if self._items else None
+        self.evictions += 1  # agents rebuild their context from the new window
+
+    async def aclose(self) -> None:
+        if self._summary_task is not None:
+            self._summary_task.cancel()
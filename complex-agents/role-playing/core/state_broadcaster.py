@@ -0,0 +1,155 @@
+"""
+---
+title: Game State Broadcaster
+category: complex-agents
+tags: [rpg, rpc, ui-sync, concurrency, metrics]
+difficulty: advanced
+description: Per-room fan-out of game_state_update messages that never holds up the agents
+demonstrates:
+  - Coalescing updates published within a short window into one message
+  - Concurrent RPC sends with a per-destination timeout
+  - Dropping superseded updates queued for slow clients
+  - Send latency metrics
+---
+"""
+
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+from livekit import rtc
+
+logger = logging.getLogger("dungeons-and-agents")
+
+DEFAULT_WINDOW = 0.05
+DEFAULT_RPC_TIMEOUT = 2.0
+
+
+@dataclass
+class _Destination:
+    # update type -> (seq, data, published at); a newer update of a type supersedes the queued one
+    pending: Dict[str, Tuple[int, dict, float]] = field(default_factory=dict)
+    task: Optional[asyncio.Task] = None
+
+
+class StateBroadcaster:
+    """
+    Sends game_state_update messages to every remote participant of a room.
+
+    `publish` returns immediately. Each participant has its own sender task,
+    so a slow client only delays itself: updates published while a send to it
+    is in flight wait for the next one, where an update of the same type
+    replaces the older one (the clients re-fetch state on an update rather
+    than apply it, so only the latest of a type matters). A message carries
+    every queued update, in order, and the sequence number of the last one:
+
+        {"seq": 12, "updates": [{"type": "combat_action", "data": {...}}, ...]}
+    """
+
+    def __init__(
+        self,
+        room: rtc.Room,
+        *,
+        window: float = DEFAULT_WINDOW,
+        rpc_timeout: float = DEFAULT_RPC_TIMEOUT,
+        method: str = "game_state_update",
+    ) -> None:
+        self._room = room
+        self._window = window
+        self._rpc_timeout = rpc_timeout
+        self._method = method
+        self._seq = 0
+        self._destinations: Dict[str, _Destination] = {}
+
+        self.sent = 0  # messages delivered
+        self.superseded = 0  # updates replaced by a newer one before being sent
+        self.failed = 0  # messages that timed out or errored
+        self.send_latencies: Deque[float] = deque(maxlen=500)  # RPC round trip
+        self.update_latencies: Deque[float] = deque(maxlen=500)  # publish to delivery, oldest update of a message
+
+    def publish(self, update_type: str, data: Optional[dict] = None) -> int:
+        """Queue an update for every remote participant; returns its sequence number"""
+        self._seq += 1
+        now = time.perf_counter()
+        identities = set(self._room.remote_participants)
+
+        # Forget participants that left
+        for identity in set(self._destinations) - identities:
+            destination = self._destinations.pop(identity)
+            if destination.task is not None:
+                destination.task.cancel()
+
+        for identity in identities:
+            destination = self._destinations.setdefault(identity, _Destination())
+            if destination.pending.pop(update_type, None) is not None:
+                self.superseded += 1
+            destination.pending[update_type] = (self._seq, data or {}, now)
+            if destination.task is None or destination.task.done():
+                destination.task = asyncio.create_task(self._drain(identity, destination))
+        return self._seq
+
+    async def _drain(self, identity: str, destination: _Destination) -> None:
+        # Let the updates of the same moment (e.g. one NPC round) go out together
+        await asyncio.sleep(self._window)
+        while destination.pending:
+            updates = list(destination.pending.items())  # in seq order: superseding moves an update to the end
+            destination.pending = {}
+            payload = json.dumps({
+                "seq": updates[-1][1][0],
+                "updates": [{"type": update_type, "data": data} for update_type, (_, data, _) in updates],
+            })
+            start = time.perf_counter()
+            if await self._send(identity, payload):
+                self.sent += 1
+                end = time.perf_counter()
+                self.send_latencies.append(end - start)
+                self.update_latencies.append(end - min(published for _, (_, _, published) in updates))
+
+    async def _send(self, identity: str, payload: str) -> bool:
+        try:
+            # wait_for as well: response_timeout doesn't cover the connection timeout
+            await asyncio.wait_for(
+                self._room.local_participant.perform_rpc(
+                    destination_identity=identity,
+                    method=self._method,
+                    payload=payload,
+                    response_timeout=self._rpc_timeout,
+                ),
+                self._rpc_timeout,
+            )
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._method} to {identity} timed out")
+        except Exception as e:
+            logger.warning(f"Failed to send {self._method} to {identity}: {e}")
+        self.failed += 1
+        return False
+
+    async def flush(self, timeout: float = DEFAULT_RPC_TIMEOUT) -> None:
+        """Wait (up to timeout) for the queued updates to be sent"""
+        tasks = [d.task for d in self._destinations.values() if d.task is not None and not d.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def stats(self) -> str:
+        def median_ms(values) -> float:
+            return statistics.median(values) * 1000 if values else 0.0
+
+        return (
+            f"{self.sent} sent, {self.superseded} superseded, {self.failed} failed, "
+            f"median send {median_ms(self.send_latencies):.0f}ms, "
+            f"median update delay {median_ms(self.update_latencies):.0f}ms"
+        )
+
+    async def aclose(self) -> None:
+        logger.info(f"State broadcast: {self.stats()}")
+        tasks = [d.task for d in self._destinations.values() if d.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._destinations.clear()
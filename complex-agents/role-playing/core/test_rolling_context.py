@@ -0,0 +1,126 @@
+"""
+---
+title: Rolling Context Tests
+category: complex-agents
+tags: [pytest, rpg, chat-context, token-budget]
+difficulty: intermediate
+description: Unit tests for the rolling context shared across agent handoffs, with a stub summarizer
+demonstrates:
+  - Incremental sync touching only the new items
+  - Turn-aligned eviction that keeps tool calls with their outputs
+  - A single, replaceable game-state message
+---
+"""
+
+import asyncio
+
+from livekit.agents.llm import ChatContext, ChatMessage, FunctionCall, FunctionCallOutput
+
+from core.rolling_context import GAME_STATE_MESSAGE_ID, SUMMARY_MESSAGE_ID, RollingContext, estimate_tokens
+
+
+class CountingList(list):
+    """A list that counts the items read from it, by index or slice"""
+
+    reads = 0
+
+    def __getitem__(self, index):
+        result = super().__getitem__(index)
+        self.reads += len(result) if isinstance(index, slice) else 1
+        return result
+
+
+async def stub_summarizer(summary, lines):
+    return " | ".join(filter(None, [summary, *lines]))
+
+
+def turn(i: int, with_tool: bool = False) -> list:
+    items = [ChatMessage(role="user", content=[f"player line {i} " * (2 + i % 5)])]
+    if with_tool:
+        call_id = f"call_{i}"
+        items += [
+            FunctionCall(call_id=call_id, name="roll_dice", arguments='{"dice": "1d20"}'),
+            FunctionCallOutput(call_id=call_id, name="roll_dice", output=f"rolled {i}", is_error=False),
+        ]
+    items.append(ChatMessage(role="assistant", content=[f"narration {i} " * 5]))
+    return items
+
+
+def test_sync_reads_only_new_items():
+    context = RollingContext(max_tokens=1_000_000)
+    items = CountingList(item for i in range(200) for item in turn(i, with_tool=i % 3 == 0))
+    assert context.sync(items) == len(items)
+
+    new_items = turn(200) + turn(201, with_tool=True)
+    items.extend(new_items)
+    items.reads = 0
+    assert context.sync(items) == len(new_items)
+    # The backward scan stops at the last item already seen, then reads the new ones once
+    assert items.reads <= 2 * len(new_items) + 1
+    assert len(context) == len(items)
+
+    items.reads = 0
+    assert context.sync(items) == 0
+    assert items.reads <= 1
+
+
+def test_system_messages_are_not_carried():
+    context = RollingContext()
+    items = [ChatMessage(role="system", content=["You are the narrator"]), *turn(0)]
+    assert context.sync(items) == 2
+
+
+def test_eviction_does_not_split_a_tool_call_from_its_turn():
+    items = turn(0, with_tool=True) + turn(1)
+    # Just over budget by the first user message: without turn alignment the window would start at its tool call
+    context = RollingContext(max_tokens=sum(map(estimate_tokens, items)) - estimate_tokens(items[0]))
+    context.sync(items)
+    assert [item.type for item in context._items] == ["message"] * 3
+    assert list(context._items) == items[3:]
+    assert context.evictions == 1
+
+
+def test_eviction_keeps_tool_calls_with_their_turn():
+    async def main():
+        context = RollingContext(max_tokens=120, summarizer=stub_summarizer)
+        items = []
+        for i in range(30):
+            items += turn(i, with_tool=True)
+            context.sync(items)
+            window = list(context._items)
+
+            assert context.tokens <= context.max_tokens + context.summary_max_tokens
+            assert window[0].type not in ("function_call", "function_call_output")
+            calls = {item.call_id for item in window if item.type == "function_call"}
+            outputs = [item for item in window if item.type == "function_call_output"]
+            assert all(output.call_id in calls for output in outputs)
+        await asyncio.sleep(0)  # let the summarizer run
+        return context
+
+    context = asyncio.run(main())
+    assert context.evictions > 0
+    assert "Player: player line 0" in context.summary
+
+
+def test_build_keeps_a_single_game_state_message():
+    async def main():
+        context = RollingContext(max_tokens=150, summarizer=stub_summarizer)
+        agent_ctx = ChatContext([ChatMessage(role="system", content=["You are the narrator"])])
+        items = []
+        for i in range(10):
+            items += turn(i)
+            context.sync(items)
+            agent_ctx = context.build(agent_ctx, f"turn {i}")
+            await asyncio.sleep(0)
+        return context, agent_ctx
+
+    context, agent_ctx = asyncio.run(main())
+    ids = [item.id for item in agent_ctx.items]
+    assert ids.count(GAME_STATE_MESSAGE_ID) == 1
+    assert ids.count(SUMMARY_MESSAGE_ID) == 1
+    assert ids[-1] == GAME_STATE_MESSAGE_ID
+    assert agent_ctx.items[-1].text_content == "Current game state:\nturn 9"
+    # The agent's own instructions first, then the summary, then the window
+    assert agent_ctx.items[0].text_content == "You are the narrator"
+    assert ids[1] == SUMMARY_MESSAGE_ID
+    assert [item.id for item in agent_ctx.items[2:-1]] == [item.id for item in context._items]
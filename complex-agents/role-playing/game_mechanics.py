@@ -1,13 +1,109 @@
 import random
 import re
-from typing import Tuple, List, Optional, Dict, NamedTuple
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Deque, Iterator, Tuple, List, Optional, Dict, NamedTuple
 from dataclasses import dataclass, field
 from queue import Queue
 
 from character import Character, PlayerCharacter, NPCCharacter, CharacterClass
 
 
-from utils.display import Colors
+from utils.display import render_combat_event
+
+
+DICE_PATTERN = re.compile(r'(\d+)d(\d+)([\+\-]\d+)?')
+
+
+class DiceExpression(NamedTuple):
+    """A parsed dice string such as "2d6+3" """
+    num_dice: int
+    die_size: int
+    modifier: int = 0
+
+    def roll(self) -> Tuple[int, List[int]]:
+        """Returns (total, individual rolls)"""
+        rolls = [random.randint(1, self.die_size) for _ in range(self.num_dice)]
+        return sum(rolls) + self.modifier, rolls
+
+
+@lru_cache(maxsize=1024)
+def compile_dice(dice_string: str) -> Optional[DiceExpression]:
+    """Parse a dice string once; None if it isn't one"""
+    match = DICE_PATTERN.match(dice_string)
+    if not match:
+        return None
+    return DiceExpression(int(match.group(1)), int(match.group(2)), int(match.group(3) or 0))
+
+
+class CombatEvent(NamedTuple):
+    """A roll or action resolved by the rules; fields that don't apply stay empty"""
+    kind: str  # roll, d20, combat_start, initiative_order, attack, skill_check, spell
+    actor: str = ""
+    target: str = ""
+    detail: str = ""  # dice string, skill, spell, advantage/disadvantage, or turn order
+    rolls: Tuple[int, ...] = ()
+    modifier: int = 0
+    total: int = 0
+    against: int = 0  # armor class or difficulty class
+    outcome: str = ""  # hit, miss, crit, success, failure, nat20, nat1
+    damage: int = 0  # damage dealt or health healed
+    hp: int = 0  # target health after the action
+    max_hp: int = 0
+
+
+EventSink = Callable[[CombatEvent], None]
+
+
+class CombatEventLog:
+    """Ring buffer of the most recent combat events, usable as an event sink"""
+
+    def __init__(self, maxlen: int = 256) -> None:
+        self._events: Deque[CombatEvent] = deque(maxlen=maxlen)
+
+    def __call__(self, event: CombatEvent) -> None:
+        self._events.append(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def recent(self, count: Optional[int] = None) -> List[CombatEvent]:
+        events = list(self._events)
+        return events if count is None else events[-count:]
+
+    def clear(self) -> None:
+        self._events.clear()
+
+
+# Where the rules send their events. A context variable, so each game session
+# (and each task it starts) can have its own sinks; by default events are
+# rendered on the console. With no sinks at all, no event is built.
+_event_sinks: ContextVar[Tuple[EventSink, ...]] = ContextVar("combat_event_sinks", default=(render_combat_event,))
+
+
+def set_event_sinks(*sinks: EventSink) -> None:
+    """Send the events of the current context (and tasks started from it) to sinks; none is quiet"""
+    _event_sinks.set(sinks)
+
+
+@contextmanager
+def event_sinks(*sinks: EventSink) -> Iterator[None]:
+    """set_event_sinks for the duration of a with block"""
+    token = _event_sinks.set(sinks)
+    try:
+        yield
+    finally:
+        _event_sinks.reset(token)
+
+
+def _emit(kind: str, **fields) -> None:
+    sinks = _event_sinks.get()
+    if sinks:
+        event = CombatEvent(kind, **fields)
+        for sink in sinks:
+            sink(event)
 
 
 class CombatAction(NamedTuple):
@@ -76,36 +172,19 @@ class DiceRoller:
         Roll dice based on a dice string (e.g., "1d20", "2d6+3", "1d8-1")
         Returns (total, breakdown)
         """
-        # Parse dice string
-        match = re.match(r'(\d+)d(\d+)([\+\-]\d+)?', dice_string)
-        if not match:
+        dice = compile_dice(dice_string)
+        if dice is None:
             return 0, "Invalid dice string"
         
-        num_dice = int(match.group(1))
-        die_size = int(match.group(2))
-        modifier = 0
-        
-        if match.group(3):
-            modifier = int(match.group(3))
-        
-        # Roll the dice
-        rolls = [random.randint(1, die_size) for _ in range(num_dice)]
-        total = sum(rolls) + modifier
+        total, rolls = dice.roll()
         
         # Create breakdown string
-        breakdown = f"{num_dice}d{die_size}: {rolls}"
-        if modifier != 0:
-            breakdown += f" {'+' if modifier > 0 else ''}{modifier}"
+        breakdown = f"{dice.num_dice}d{dice.die_size}: {rolls}"
+        if dice.modifier != 0:
+            breakdown += f" {'+' if dice.modifier > 0 else ''}{dice.modifier}"
         breakdown += f" = {total}"
         
-        # Print stylized output to console
-        print(f"\n{Colors.CYAN}{'═' * 40}{Colors.ENDC}")
-        print(f"{Colors.YELLOW}🎲 DICE ROLL: {dice_string}{Colors.ENDC}")
-        print(f"{Colors.BOLD}   Rolls: {rolls}{Colors.ENDC}")
-        if modifier != 0:
-            print(f"{Colors.BOLD}   Modifier: {'+' if modifier > 0 else ''}{modifier}{Colors.ENDC}")
-        print(f"{Colors.GREEN if total >= 15 else Colors.YELLOW if total >= 10 else Colors.RED}   ➤ Total: {total}{Colors.ENDC}")
-        print(f"{Colors.CYAN}{'═' * 40}{Colors.ENDC}\n")
+        _emit("roll", detail=dice_string, rolls=tuple(rolls), modifier=dice.modifier, total=total)
         
         return total, breakdown
     
@@ -115,18 +194,24 @@ class DiceRoller:
         Roll a d20 with modifier and advantage/disadvantage
         Returns (total, breakdown, is_nat_20)
         """
+        total, base_roll, breakdown = DiceRoller._roll_d20(modifier, advantage, disadvantage)
+        return total, breakdown, base_roll == 20
+    
+    @staticmethod
+    def _roll_d20(modifier: int, advantage: bool, disadvantage: bool) -> Tuple[int, int, str]:
+        """Returns (total, natural roll, breakdown)"""
         if advantage or disadvantage:
-            roll1 = random.randint(1, 20)
-            roll2 = random.randint(1, 20)
+            rolls = (random.randint(1, 20), random.randint(1, 20))
             
             if advantage:
-                base_roll = max(roll1, roll2)
-                breakdown = f"d20 with advantage: [{roll1}, {roll2}] → {base_roll}"
+                base_roll = max(rolls)
+                breakdown = f"d20 with advantage: [{rolls[0]}, {rolls[1]}] → {base_roll}"
             else:
-                base_roll = min(roll1, roll2)
-                breakdown = f"d20 with disadvantage: [{roll1}, {roll2}] → {base_roll}"
+                base_roll = min(rolls)
+                breakdown = f"d20 with disadvantage: [{rolls[0]}, {rolls[1]}] → {base_roll}"
         else:
             base_roll = random.randint(1, 20)
+            rolls = (base_roll,)
             breakdown = f"d20: {base_roll}"
         
         total = base_roll + modifier
@@ -134,32 +219,16 @@ class DiceRoller:
         if modifier != 0:
             breakdown += f" {'+' if modifier > 0 else ''}{modifier} = {total}"
         
-        is_nat_20 = base_roll == 20
-        is_nat_1 = base_roll == 1
-        
-        # Print stylized d20 roll
-        print(f"\n{Colors.BLUE}{'▬' * 40}{Colors.ENDC}")
-        print(f"{Colors.HEADER}⚔️  D20 ROLL{Colors.ENDC}")
-        
-        if advantage or disadvantage:
-            print(f"{Colors.BOLD}   Type: {'Advantage' if advantage else 'Disadvantage'}{Colors.ENDC}")
-            print(f"{Colors.BOLD}   Rolls: [{roll1}, {roll2}] → {base_roll}{Colors.ENDC}")
-        else:
-            print(f"{Colors.BOLD}   Roll: {base_roll}{Colors.ENDC}")
-        
-        if is_nat_20:
-            print(f"{Colors.GREEN}{Colors.BOLD}   ★ NATURAL 20! ★{Colors.ENDC}")
-        elif is_nat_1:
-            print(f"{Colors.RED}{Colors.BOLD}   ☠ NATURAL 1! ☠{Colors.ENDC}")
-        
-        if modifier != 0:
-            print(f"{Colors.BOLD}   Modifier: {'+' if modifier > 0 else ''}{modifier}{Colors.ENDC}")
-        
-        color = Colors.GREEN if total >= 15 else Colors.YELLOW if total >= 10 else Colors.RED
-        print(f"{color}   ➤ Total: {total}{Colors.ENDC}")
-        print(f"{Colors.BLUE}{'▬' * 40}{Colors.ENDC}\n")
+        _emit(
+            "d20",
+            detail="advantage" if advantage else "disadvantage" if disadvantage else "",
+            rolls=rolls,
+            modifier=modifier,
+            total=total,
+            outcome="nat20" if base_roll == 20 else "nat1" if base_roll == 1 else "",
+        )
         
-        return total, breakdown, is_nat_20
+        return total, base_roll, breakdown
     
     @staticmethod
     def roll_initiative(character: Character) -> Tuple[int, str]:
@@ -187,6 +256,48 @@ class SkillCheck:
         "nearly_impossible": 30
     }
     
+    # Ability each skill is checked with
+    SKILL_ABILITIES = {
+        # Strength-based skills
+        "strength": "strength",
+        "athletics": "strength",
+        "intimidation": "strength",
+
+        # Dexterity-based skills
+        "dexterity": "dexterity",
+        "stealth": "dexterity",
+        "acrobatics": "dexterity",
+        "sleight_of_hand": "dexterity",
+        "lockpicking": "dexterity",
+        "archery": "dexterity",
+
+        # Intelligence-based skills
+        "intelligence": "intelligence",
+        "investigation": "intelligence",
+        "arcana": "intelligence",
+        "history": "intelligence",
+        "nature": "intelligence",
+        "religion": "intelligence",
+        "medicine": "intelligence",
+        "engineering": "intelligence",
+
+        # Wisdom-based skills
+        "wisdom": "wisdom",
+        "perception": "wisdom",
+        "insight": "wisdom",
+        "survival": "wisdom",
+        "animal_handling": "wisdom",
+        "medicine_practical": "wisdom",
+
+        # Charisma-based skills
+        "charisma": "charisma",
+        "persuasion": "charisma",
+        "deception": "charisma",
+        "performance": "charisma",
+        "intimidation_social": "charisma",
+        "leadership": "charisma"
+    }
+    
     @staticmethod
     def perform_check(character: Character, skill: str, difficulty: str = "medium") -> Tuple[bool, int, str, str]:
         """
@@ -196,66 +307,15 @@ class SkillCheck:
         dc = SkillCheck.DIFFICULTY_CLASSES.get(difficulty, 15)
         
         # Determine ability modifier based on skill
-        ability_map = {
-            # Strength-based skills
-            "strength": "strength",
-            "athletics": "strength",
-            "intimidation": "strength",
-
-            # Dexterity-based skills
-            "dexterity": "dexterity",
-            "stealth": "dexterity",
-            "acrobatics": "dexterity",
-            "sleight_of_hand": "dexterity",
-            "lockpicking": "dexterity",
-            "archery": "dexterity",
-
-            # Intelligence-based skills
-            "intelligence": "intelligence",
-            "investigation": "intelligence",
-            "arcana": "intelligence",
-            "history": "intelligence",
-            "nature": "intelligence",
-            "religion": "intelligence",
-            "medicine": "intelligence",
-            "engineering": "intelligence",
-
-            # Wisdom-based skills
-            "wisdom": "wisdom",
-            "perception": "wisdom",
-            "insight": "wisdom",
-            "survival": "wisdom",
-            "animal_handling": "wisdom",
-            "medicine_practical": "wisdom",
-
-            # Charisma-based skills
-            "charisma": "charisma",
-            "persuasion": "charisma",
-            "deception": "charisma",
-            "performance": "charisma",
-            "intimidation_social": "charisma",
-            "leadership": "charisma"
-        }
-        
-        ability = ability_map.get(skill, "wisdom")
+        ability = SkillCheck.SKILL_ABILITIES.get(skill, "wisdom")
         modifier = character.stats.get_modifier(ability)
         
         # Add skill proficiency if character has it
         if hasattr(character, 'skills') and skill in character.skills:
             modifier += character.skills[skill]
         
-        # Print skill check header
-        print(f"\n{Colors.HEADER}{'━' * 40}{Colors.ENDC}")
-        print(f"{Colors.BOLD}📜 SKILL CHECK: {skill.upper()}{Colors.ENDC}")
-        print(f"{Colors.BOLD}   Character: {character.name}{Colors.ENDC}")
-        print(f"{Colors.BOLD}   Ability: {ability.capitalize()} (modifier: {'+' if modifier >= 0 else ''}{modifier}){Colors.ENDC}")
-        print(f"{Colors.BOLD}   Difficulty: {difficulty.capitalize()} (DC {dc}){Colors.ENDC}")
-        print(f"{Colors.HEADER}{'━' * 40}{Colors.ENDC}")
-        
-        roll_total, breakdown, is_nat20 = DiceRoller.roll_d20(modifier)
-        
-        # Check for natural 1
-        base_roll = int(breakdown.split(':')[1].split()[0]) if ':' in breakdown else roll_total - modifier
+        roll_total, base_roll, breakdown = DiceRoller._roll_d20(modifier, False, False)
+        is_nat20 = base_roll == 20
         is_nat1 = base_roll == 1
         
         # Determine critical status
@@ -269,13 +329,16 @@ class SkillCheck:
         else:
             success = roll_total >= dc
         
-        # Print result
-        print(f"\n{Colors.BOLD}   Result: {Colors.ENDC}", end="")
-        if success:
-            print(f"{Colors.GREEN}{Colors.BOLD}✓ SUCCESS!{Colors.ENDC}")
-        else:
-            print(f"{Colors.RED}{Colors.BOLD}✗ FAILURE!{Colors.ENDC}")
-        print(f"{Colors.HEADER}{'━' * 40}{Colors.ENDC}\n")
+        _emit(
+            "skill_check",
+            actor=character.name,
+            detail=skill,
+            rolls=(base_roll,),
+            modifier=modifier,
+            total=roll_total,
+            against=dc,
+            outcome="success" if success else "failure",
+        )
         
         description = f"{character.name} rolls {skill.capitalize()}: {breakdown} vs DC {dc} - {'Success!' if success else 'Failure!'}"
         
@@ -293,17 +356,13 @@ class Combat:
         # Add all participants
         combat_state.participants = [player] + enemies
         
-        # Print combat start
-        print(f"\n{Colors.RED}{Colors.BOLD}{'🔥' * 20}{Colors.ENDC}")
-        print(f"{Colors.RED}{Colors.BOLD}         ⚔️  COMBAT BEGINS! ⚔️{Colors.ENDC}")
-        print(f"{Colors.RED}{Colors.BOLD}{'🔥' * 20}{Colors.ENDC}\n")
+        _emit("combat_start", actor=player.name, target=", ".join(enemy.name for enemy in enemies))
         
         # Roll initiative for everyone
         initiative_rolls = []
         combat_state.combat_log.append("=== COMBAT BEGINS ===")
         combat_state.combat_log.append("\nInitiative rolls:")
         
-        print(f"{Colors.YELLOW}{Colors.BOLD}Rolling Initiative...{Colors.ENDC}")
         for character in combat_state.participants:
             initiative, breakdown = DiceRoller.roll_initiative(character)
             initiative_rolls.append((initiative, character))
@@ -313,11 +372,11 @@ class Combat:
         initiative_rolls.sort(key=lambda x: x[0], reverse=True)
         combat_state.initiative_order = [char for _, char in initiative_rolls]
         
-        # Print initiative order
-        print(f"\n{Colors.CYAN}{Colors.BOLD}Initiative Order:{Colors.ENDC}")
-        for i, (init_value, char) in enumerate(initiative_rolls):
-            print(f"  {i+1}. {Colors.BOLD}{char.name}{Colors.ENDC} (Initiative: {init_value})")
-        print()
+        _emit(
+            "initiative_order",
+            detail=", ".join(char.name for _, char in initiative_rolls),
+            rolls=tuple(init_value for init_value, _ in initiative_rolls),
+        )
         
         combat_state.combat_log.append(f"\nInitiative order: {', '.join(c.name for c in combat_state.initiative_order)}")
         combat_state.combat_log.append(f"\n--- Round 1 ---")
@@ -325,32 +384,28 @@ class Combat:
         return combat_state
     
     @staticmethod
-    def perform_attack(attacker: Character, defender: Character) -> Tuple[bool, int, str]:
+    def perform_attack(attacker: Character, defender: Character, advantage: bool = False, disadvantage: bool = False) -> Tuple[bool, int, str]:
         """
         Perform an attack
         Returns (hit, damage, description)
         """
-        # Print attack header
-        print(f"\n{Colors.RED}{'⚔' * 20}{Colors.ENDC}")
-        print(f"{Colors.BOLD}⚔️  ATTACK: {attacker.name} → {defender.name}{Colors.ENDC}")
-        print(f"{Colors.BOLD}   Target AC: {defender.armor_class}{Colors.ENDC}")
-        print(f"{Colors.RED}{'⚔' * 20}{Colors.ENDC}")
-        
         # Attack roll
-        attack_roll, attack_breakdown, is_crit = DiceRoller.roll_d20(attacker.attack_bonus)
+        attack_roll, attack_breakdown, is_crit = DiceRoller.roll_d20(attacker.attack_bonus, advantage, disadvantage)
         
         # Check if hit
         hit = attack_roll >= defender.armor_class or is_crit
         
-        # Print hit/miss
-        print(f"\n{Colors.BOLD}   Attack Result: {Colors.ENDC}", end="")
-        if hit:
-            print(f"{Colors.GREEN}{Colors.BOLD}HIT!{Colors.ENDC}")
-        else:
-            print(f"{Colors.RED}{Colors.BOLD}MISS!{Colors.ENDC}")
-        
         if not hit and not is_crit:
-            print(f"{Colors.RED}{'⚔' * 20}{Colors.ENDC}\n")
+            _emit(
+                "attack",
+                actor=attacker.name,
+                target=defender.name,
+                total=attack_roll,
+                against=defender.armor_class,
+                outcome="miss",
+                hp=defender.current_health,
+                max_hp=defender.max_health,
+            )
             return False, 0, f"{attacker.name} attacks {defender.name}: {attack_breakdown} vs AC {defender.armor_class} - Miss!"
         
         # Roll damage
@@ -358,7 +413,6 @@ class Combat:
         total_damage = 0
         damage_breakdowns = []
         
-        print(f"\n{Colors.BOLD}   Rolling Damage...{Colors.ENDC}")
         for _ in range(damage_rolls):
             damage, breakdown = DiceRoller.roll(attacker.damage_dice)
             total_damage += damage
@@ -367,17 +421,17 @@ class Combat:
         # Apply damage
         actual_damage, is_dead = defender.take_damage(total_damage)
         
-        # Print damage summary
-        print(f"{Colors.BOLD}   Total Damage: {Colors.RED}{total_damage}{Colors.ENDC}")
-        print(f"{Colors.BOLD}   {defender.name} HP: {Colors.ENDC}", end="")
-        if is_dead:
-            print(f"{Colors.RED}{Colors.BOLD}DEFEATED!{Colors.ENDC}")
-        else:
-            hp_percent = (defender.current_health / defender.max_health) * 100
-            color = Colors.GREEN if hp_percent > 50 else Colors.YELLOW if hp_percent > 25 else Colors.RED
-            print(f"{color}{defender.current_health}/{defender.max_health}{Colors.ENDC}")
-        
-        print(f"{Colors.RED}{'⚔' * 20}{Colors.ENDC}\n")
+        _emit(
+            "attack",
+            actor=attacker.name,
+            target=defender.name,
+            total=attack_roll,
+            against=defender.armor_class,
+            outcome="crit" if is_crit else "hit",
+            damage=actual_damage,
+            hp=defender.current_health,
+            max_hp=defender.max_health,
+        )
         
         # Build description
         description = f"{attacker.name} attacks {defender.name}: {attack_breakdown} vs AC {defender.armor_class} - Hit!"
@@ -442,6 +496,13 @@ class SpellCasting:
         }
     }
     
+    # Cinematic spell descriptions
+    SPELL_DESCRIPTIONS = {
+        "firebolt": "A bolt of fire shoots from {caster}'s hand, streaking through the air!",
+        "heal": "Divine light emanates from {caster}'s hands!",
+        "shield": "{caster} weaves protective magic around themselves!"
+    }
+    
     @staticmethod
     def cast_spell(caster: Character, spell_name: str, target: Optional[Character] = None) -> str:
         """Cast a spell"""
@@ -458,22 +519,23 @@ class SpellCasting:
         if spell_name == "heal" and caster.character_class != CharacterClass.CLERIC:
             return f"Only clerics can cast healing spells!"
         
-        # Add cinematic spell descriptions
-        spell_descriptions = {
-            "firebolt": f"A bolt of fire shoots from {caster.name}'s hand, streaking through the air!",
-            "heal": f"Divine light emanates from {caster.name}'s hands!",
-            "shield": f"{caster.name} weaves protective magic around themselves!"
-        }
-        
-        result = spell_descriptions.get(spell_name, f"{caster.name} casts {spell_name}!")
+        result = SpellCasting.SPELL_DESCRIPTIONS.get(spell_name, "{caster} casts {spell}!").format(
+            caster=caster.name, spell=spell_name
+        )
         
         if "damage" in spell and target:
             damage, breakdown = DiceRoller.roll(spell["damage"])
-            print(f"[SpellCasting] {target.name} health before damage: {target.current_health}/{target.max_health}")
             actual_damage, is_dead = target.take_damage(damage)
-            print(f"[SpellCasting] Damage roll: {damage}, Actual damage: {actual_damage}")
-            print(f"[SpellCasting] {target.name} health after damage: {target.current_health}/{target.max_health}")
-            print(f"[SpellCasting] Is dead: {is_dead}")
+            _emit(
+                "spell",
+                actor=caster.name,
+                target=target.name,
+                detail=spell_name,
+                total=damage,
+                damage=actual_damage,
+                hp=target.current_health,
+                max_hp=target.max_health,
+            )
             
             # Add impact description
             if spell_name == "firebolt":
@@ -498,10 +560,21 @@ class SpellCasting:
                 target = caster
             healing, breakdown = DiceRoller.roll(spell["healing"])
             actual_healing = target.heal(healing)
+            _emit(
+                "spell",
+                actor=caster.name,
+                target=target.name,
+                detail=spell_name,
+                total=healing,
+                damage=actual_healing,
+                hp=target.current_health,
+                max_hp=target.max_health,
+            )
             result += f"\n{breakdown} healing to {target.name}!"
             result += f"\n{target.name} heals {actual_healing} HP. ({target.current_health}/{target.max_health} HP)"
         
         elif "effect" in spell:
+            _emit("spell", actor=caster.name, target=caster.name, detail=spell_name)
             if spell["effect"] == "ac_bonus":
                 result += f"\n{caster.name} gains +{spell['bonus']} AC for {spell['duration']} round(s)!"
         
@@ -16,35 +16,28 @@ demonstrates:
 """
 
 import json
-import yaml
 import logging
 import random
 from typing import List, Dict, Any, Optional
-from pathlib import Path
 
-from livekit.plugins import openai
+from generators.llm_client import get_llm
+from utils.prompt_loader import documents, rules_path
 from livekit.agents.llm import ChatContext, ChatMessage
 
 from character import Item
 
 logger = logging.getLogger("dungeons-and-agents")
 
+RULES_PATH = rules_path("item_generation_rules.yaml")
+
 
 class ItemGenerator:
     """Generates dynamic items using LLM and rule files"""
     
-    def __init__(self):
-        self.rules = self._load_rules()
-    
-    def _load_rules(self) -> dict:
-        """Load item generation rules from YAML"""
-        rules_path = Path(__file__).parent.parent / "rules" / "item_generation_rules.yaml"
-        try:
-            with open(rules_path, 'r') as f:
-                return yaml.safe_load(f)
-        except Exception as e:
-            logger.error(f"Failed to load item generation rules: {e}")
-            return {}
+    @property
+    def rules(self) -> dict:
+        """Item generation rules, from the process-wide cache (hot reloaded)"""
+        return documents.get(RULES_PATH)
     
     async def generate_npc_inventory(self, npc_name: str, npc_class: str, 
                                    npc_level: int, location: str,
@@ -169,7 +162,7 @@ Example format:
     
     async def _generate_json(self, prompt: str, model: str = "gpt-4o-mini", use_cerebras: bool = False) -> Any:
         """Generate JSON response using LLM"""
-        llm = openai.LLM.with_cerebras() if use_cerebras else openai.LLM(model=model)
+        llm = get_llm(model, use_cerebras)
         
         ctx = ChatContext([
             ChatMessage(
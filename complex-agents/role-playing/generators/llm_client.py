@@ -0,0 +1,31 @@
+"""
+---
+title: Shared Generator LLM Clients
+category: complex-agents
+tags: [rpg, llm, connection-reuse]
+difficulty: beginner
+description: One LLM client per model for all content generators, instead of one per call
+demonstrates:
+  - Reusing LLM clients (and their HTTP connection pools) across calls
+---
+"""
+
+import asyncio
+import weakref
+from typing import Dict, Tuple
+
+from livekit.plugins import openai
+
+# Clients hold connection pools tied to the event loop that first used them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, bool], openai.LLM]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_llm(model: str = "gpt-4o-mini", use_cerebras: bool = False) -> openai.LLM:
+    """The shared client for this model on the running event loop"""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = ("cerebras" if use_cerebras else model, use_cerebras)
+    if key not in clients:
+        clients[key] = openai.LLM.with_cerebras() if use_cerebras else openai.LLM(model=model)
+    return clients[key]
@@ -16,12 +16,11 @@ demonstrates:
 """
 
 import random
-import yaml
 import logging
 from typing import List, Dict, Any, Optional
-from pathlib import Path
 
-from livekit.plugins import openai
+from generators.llm_client import get_llm
+from utils.prompt_loader import PromptTemplate, documents, rules_path
 from livekit.agents.llm import ChatContext, ChatMessage
 
 from character import NPCCharacter, CharacterClass, CharacterStats, create_random_npc
@@ -29,23 +28,24 @@ from generators.item_generator import ItemGenerator
 
 logger = logging.getLogger("dungeons-and-agents")
 
+RULES_PATH = rules_path("npc_generation_rules.yaml")
+
 
 class NPCGenerator:
     """Generates dynamic NPCs using LLM and rule files"""
     
     def __init__(self):
-        self.rules = self._load_rules()
         self.item_generator = ItemGenerator()
     
-    def _load_rules(self) -> dict:
-        """Load NPC generation rules from YAML"""
-        rules_path = Path(__file__).parent.parent / "rules" / "npc_generation_rules.yaml"
-        try:
-            with open(rules_path, 'r') as f:
-                return yaml.safe_load(f)
-        except Exception as e:
-            logger.error(f"Failed to load NPC generation rules: {e}")
-            return {}
+    @property
+    def rules(self) -> dict:
+        """NPC generation rules, from the process-wide cache (hot reloaded)"""
+        return documents.get(RULES_PATH)
+    
+    @property
+    def prompts(self) -> Dict[str, PromptTemplate]:
+        """Compiled generation_prompts of the rules"""
+        return documents.templates(RULES_PATH)
     
     async def generate_npc(self, name: str, location: str, 
                           recent_events: List[str] = None,
@@ -134,7 +134,7 @@ class NPCGenerator:
         # Prepare prompts
         traits = random.sample(type_rules['personality_traits'], 3)
         
-        personality_prompt = self.rules['generation_prompts']['personality'].format(
+        personality_prompt = self.prompts['personality'].format(
             name=npc.name,
             character_class=npc.character_class.value,
             npc_type=npc_type,
@@ -146,7 +146,7 @@ class NPCGenerator:
         # Generate personality first (needed for backstory) - using Cerebras for speed
         personality = await self._generate_text(personality_prompt, use_cerebras=True)
         
-        backstory_prompt = self.rules['generation_prompts']['backstory'].format(
+        backstory_prompt = self.prompts['backstory'].format(
             name=npc.name,
             level=npc.level,
             character_class=npc.character_class.value,
@@ -175,7 +175,7 @@ class NPCGenerator:
                                location: str, type_rules: dict) -> List[str]:
         """Generate dialogue options for the NPC"""
         
-        dialogue_prompt = self.rules['generation_prompts']['dialogue'].format(
+        dialogue_prompt = self.prompts['dialogue'].format(
             name=npc.name,
             personality=getattr(npc, 'personality', ''),
             backstory=getattr(npc, 'backstory', ''),
@@ -201,7 +201,7 @@ class NPCGenerator:
     
     async def _generate_text(self, prompt: str, model: str = "gpt-4o-mini", use_cerebras: bool = False) -> str:
         """Generate text using LLM"""
-        llm = openai.LLM.with_cerebras() if use_cerebras else openai.LLM(model=model)
+        llm = get_llm(model, use_cerebras)
         
         ctx = ChatContext([
             ChatMessage(
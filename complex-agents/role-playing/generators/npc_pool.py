@@ -0,0 +1,159 @@
+"""
+---
+title: NPC Warm Pool
+category: complex-agents
+tags: [rpg, procedural-generation, prefetching, background-tasks, metrics]
+difficulty: advanced
+description: Pre-generates NPCs for the current location in the background so meeting one is instant
+demonstrates:
+  - Background pre-generation while the narrator is talking
+  - Per-location, per-NPC-type pools with on-demand fallback
+  - Joining a generation that is already in flight
+  - Pool hit rate and time-to-first-NPC-line metrics
+---
+"""
+
+import asyncio
+import logging
+import re
+import statistics
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from character import NPCCharacter
+from generators.npc_generator import NPCGenerator
+
+logger = logging.getLogger("dungeons-and-agents")
+
+# Pre-generated NPCs are written under this name and renamed when handed out.
+# One word, so the generated text can't refer to them by half of it, and unusual
+# enough that the LLM copies it verbatim and nothing else matches it.
+PLACEHOLDER_NAME = "Vesqueth"
+_PLACEHOLDER_RE = re.compile(rf"\b{PLACEHOLDER_NAME}\b", re.IGNORECASE)
+
+DEFAULT_NPC_TYPES = ("merchant", "guard", "wizard", "commoner")
+
+
+class NPCPool:
+    """
+    Ready-made NPCs for the locations the player is at, one pool per
+    (location, NPC type). `warm` tops the pools up in the background; `get`
+    hands out a ready NPC renamed to what the player called them, waits for
+    one already being generated, or generates one on demand if neither.
+    """
+
+    def __init__(
+        self,
+        generator: Optional[NPCGenerator] = None,
+        per_type: int = 1,
+        npc_types: Tuple[str, ...] = DEFAULT_NPC_TYPES,
+        max_locations: int = 2,
+    ) -> None:
+        self._generator = generator
+        self.per_type = per_type
+        self.npc_types = npc_types
+        self.max_locations = max_locations
+        self._ready: "OrderedDict[str, Dict[str, Deque[NPCCharacter]]]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], Set[asyncio.Task]] = {}
+
+        self.hits = 0  # a ready NPC was handed out
+        self.joined = 0  # waited for one already being generated
+        self.misses = 0  # generated on demand
+        self.first_line_latencies: Deque[float] = deque(maxlen=200)
+
+    @property
+    def generator(self) -> NPCGenerator:
+        if self._generator is None:
+            self._generator = NPCGenerator()
+        return self._generator
+
+    def warm(self, location: str, recent_events: Optional[List[str]] = None) -> None:
+        """Start generating NPCs for location, up to per_type of each type; returns immediately"""
+        pools = self._location(location)
+        for npc_type in self.npc_types:
+            key = (location, npc_type)
+            pending = self._pending.setdefault(key, set())
+            for _ in range(self.per_type - len(pools[npc_type]) - len(pending)):
+                task = asyncio.create_task(self._fill(location, npc_type, list(recent_events or [])))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+    def _location(self, location: str) -> Dict[str, Deque[NPCCharacter]]:
+        if location in self._ready:
+            self._ready.move_to_end(location)
+        else:
+            self._ready[location] = {npc_type: deque() for npc_type in self.npc_types}
+            # Forget ready NPCs of places the player has long left
+            while len(self._ready) > self.max_locations:
+                self._ready.popitem(last=False)
+        return self._ready[location]
+
+    async def _fill(self, location: str, npc_type: str, recent_events: List[str]) -> None:
+        try:
+            npc = await self.generator.generate_npc(PLACEHOLDER_NAME, location, recent_events, npc_type=npc_type)
+        except Exception as e:
+            logger.error(f"Failed to pre-generate a {npc_type} for {location}: {e}")
+            return
+        if location in self._ready:
+            self._ready[location][npc_type].append(npc)
+
+    async def get(self, name: str, location: str, recent_events: Optional[List[str]] = None) -> NPCCharacter:
+        """An NPC called `name` at location, from the pool when possible"""
+        start = time.perf_counter()
+        npc_type = self.generator._determine_npc_type(name)
+        npc = None
+
+        if npc_type in self.npc_types:
+            ready = self._location(location)[npc_type]
+            pending = self._pending.get((location, npc_type))
+            if not ready and pending:
+                await asyncio.wait(set(pending), return_when=asyncio.FIRST_COMPLETED)
+                if ready:
+                    self.joined += 1
+                    npc = self._rename(ready.popleft(), name)
+            elif ready:
+                self.hits += 1
+                npc = self._rename(ready.popleft(), name)
+
+        if npc is None:
+            self.misses += 1
+            npc = await self.generator.generate_npc(name, location, recent_events)
+
+        self.first_line_latencies.append(time.perf_counter() - start)
+        # Replace what was taken while the player talks to this one
+        self.warm(location, recent_events)
+        logger.info(f"NPC {npc.name} ready in {self.first_line_latencies[-1]:.2f}s ({self.stats()})")
+        return npc
+
+    @staticmethod
+    def _rename(npc: NPCCharacter, name: str) -> NPCCharacter:
+        name = name.title()
+
+        def rename(text: str) -> str:
+            return _PLACEHOLDER_RE.sub(lambda _: name, text)
+
+        npc.name = name
+        for attr in ("personality", "backstory"):
+            if isinstance(getattr(npc, attr, None), str):
+                setattr(npc, attr, rename(getattr(npc, attr)))
+        npc.dialogue_options = [rename(line) for line in npc.dialogue_options]
+        for item in npc.inventory:
+            item.name = rename(item.name)
+            item.description = rename(item.description)
+        return npc
+
+    def stats(self) -> str:
+        requests = self.hits + self.joined + self.misses
+        hit_rate = (self.hits + self.joined) / requests if requests else 0.0
+        latency = statistics.median(self.first_line_latencies) if self.first_line_latencies else 0.0
+        return (
+            f"hit rate {hit_rate:.0%} ({self.hits} ready, {self.joined} joined, {self.misses} on demand), "
+            f"median time to first line {latency:.2f}s"
+        )
+
+    async def aclose(self) -> None:
+        tasks = [task for pending in self._pending.values() for task in pending]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
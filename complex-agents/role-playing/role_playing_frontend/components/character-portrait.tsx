@@ -114,13 +114,15 @@ export function CharacterPortrait({ className }: CharacterPortraitProps) {
       // Register RPC handler for game state updates
       const handleGameStateUpdate = async (data: RpcInvocationData): Promise<string> => {
         try {
-          const update = JSON.parse(data.payload);
-          console.log('[CharacterPortrait] Received game state update:', update);
+          // Updates arrive coalesced: { seq, updates: [{ type, data }, ...] }
+          const { updates = [] } = JSON.parse(data.payload);
+          console.log('[CharacterPortrait] Received game state updates:', updates);
           
           // Fetch updated context on relevant events
-          if (update.type === 'voice_acting_start' || 
+          if (updates.some((update: { type: string }) =>
+              update.type === 'voice_acting_start' || 
               update.type === 'voice_acting_end' || 
-              update.type === 'combat_start') {
+              update.type === 'combat_start')) {
             console.log('[CharacterPortrait] Event matches, fetching context...');
             await fetchCurrentContext();
           }
@@ -82,13 +82,14 @@ export function GameStatus() {
       // RPC handler for game state updates
       const handleGameStateUpdate = async (data: RpcInvocationData): Promise<string> => {
         try {
-          const update = JSON.parse(data.payload);
+          // Updates arrive coalesced: { seq, updates: [{ type, data }, ...] }
+          const types = (JSON.parse(data.payload).updates ?? []).map((update: { type: string }) => update.type);
           
           // Refresh states based on update type
-          if (update.type === 'combat_action' || update.type === 'character_defeated') {
+          if (types.includes('combat_action') || types.includes('character_defeated')) {
             await fetchCombatState();
             await fetchGameState();
-          } else if (update.type === 'inventory_changed') {
+          } else if (types.includes('inventory_changed')) {
             await fetchGameState();
           }
           
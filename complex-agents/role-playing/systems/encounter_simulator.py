@@ -0,0 +1,401 @@
+"""
+---
+title: Encounter Simulator
+category: complex-agents
+tags: [rpg, combat-system, monte-carlo, numpy, balancing]
+difficulty: advanced
+description: Headless batch simulation of combat encounters for balancing enemies and classes
+demonstrates:
+  - Vectorized dice rolls over many fights at once with NumPy
+  - The game's combat rules (initiative, armor class, crits, advantage, spells) without narration
+  - Win rate, expected rounds and damage distributions in seconds
+  - Statistical cross-check against the scalar rules in game_mechanics.py
+---
+"""
+
+"""
+Simulates many fights of a player against a group of enemies with the rules of
+game_mechanics.py, all fights at once: every turn is a handful of NumPy array
+operations over the fights still going, so a million fights take seconds.
+
+The player follows a fixed plan each turn: heal (clerics, below a health
+fraction) or else attack or firebolt the first enemy still standing, which is
+what the combat agent does when the player names no target. Enemies always
+attack the player, like CombatAgent._queue_single_npc_action.
+
+Run from the role-playing directory:
+
+    python -m systems.encounter_simulator --class rogue --enemy orc --count 2 --fights 1000000
+    python -m systems.encounter_simulator --class mage --action firebolt --check
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from character import CharacterClass, CharacterStats, Item, NPCCharacter, PlayerCharacter, create_random_npc
+from game_mechanics import Combat, DiceExpression, SpellCasting, compile_dice, event_sinks
+
+ROLL_MODES = ("normal", "advantage", "disadvantage")
+PLAYER_ACTIONS = ("attack", "firebolt")
+
+DEFAULT_MAX_ROUNDS = 100
+
+
+def roll_dice(rng: np.random.Generator, dice: Optional[DiceExpression], size: int) -> np.ndarray:
+    """`size` independent rolls of dice; None rolls 0 like an invalid dice string"""
+    if dice is None:
+        return np.zeros(size, dtype=np.int64)
+    num_dice, die_size, modifier = dice
+    return rng.integers(1, die_size + 1, size=(size, num_dice)).sum(axis=1) + modifier
+
+
+def roll_d20(rng: np.random.Generator, size: int, mode: str = "normal") -> np.ndarray:
+    """`size` d20 rolls, keeping the higher (advantage) or lower (disadvantage) of two"""
+    if mode == "normal":
+        return rng.integers(1, 21, size=size)
+    rolls = rng.integers(1, 21, size=(size, 2))
+    return rolls.max(axis=1) if mode == "advantage" else rolls.min(axis=1)
+
+
+def resolve_attacks(
+    rng: np.random.Generator,
+    size: int,
+    attack_bonus: int,
+    damage_dice: Optional[DiceExpression],
+    armor_class: np.ndarray,
+    mode: str = "normal",
+) -> np.ndarray:
+    """Damage of `size` attacks as Combat.perform_attack rolls them (0 on a miss)"""
+    base = roll_d20(rng, size, mode)
+    crit = base == 20
+    hit = (base + attack_bonus >= armor_class) | crit
+    # Critical hits roll damage twice
+    damage = roll_dice(rng, damage_dice, size) + np.where(crit, roll_dice(rng, damage_dice, size), 0)
+    return np.where(hit, damage, 0)
+
+
+@dataclass
+class EncounterResult:
+    """Per-fight outcomes of a simulation"""
+    outcome: np.ndarray  # 1 won, -1 lost, 0 still going after max_rounds
+    rounds: np.ndarray
+    damage_taken: np.ndarray  # by the player
+    damage_dealt: np.ndarray  # by the player
+    seconds: float = 0.0
+
+    @property
+    def fights(self) -> int:
+        return len(self.outcome)
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.mean(self.outcome == 1))
+
+    @property
+    def loss_rate(self) -> float:
+        return float(np.mean(self.outcome == -1))
+
+    @property
+    def expected_rounds(self) -> float:
+        return float(np.mean(self.rounds))
+
+    def rounds_distribution(self) -> Dict[int, float]:
+        """Share of fights that lasted each number of rounds"""
+        counts = np.bincount(self.rounds)
+        return {rounds: count / self.fights for rounds, count in enumerate(counts) if count}
+
+    @staticmethod
+    def percentiles(values: np.ndarray, qs=(5, 25, 50, 75, 95)) -> Dict[int, float]:
+        return dict(zip(qs, np.percentile(values, qs).tolist()))
+
+    def summary(self) -> str:
+        taken = self.percentiles(self.damage_taken)
+        dealt = self.percentiles(self.damage_dealt)
+        lines = [
+            f"{self.fights:,} fights in {self.seconds:.2f}s",
+            f"  win rate {self.win_rate:.2%}, loss rate {self.loss_rate:.2%}, "
+            f"unfinished {np.mean(self.outcome == 0):.2%}",
+            f"  expected rounds {self.expected_rounds:.2f}",
+            "  damage taken  " + "  ".join(f"p{q} {v:g}" for q, v in taken.items()),
+            "  damage dealt  " + "  ".join(f"p{q} {v:g}" for q, v in dealt.items()),
+            "  rounds        " + "  ".join(
+                f"{rounds}: {share:.1%}" for rounds, share in list(self.rounds_distribution().items())[:10]
+            ),
+        ]
+        return "\n".join(lines)
+
+
+class MetricCheck(NamedTuple):
+    metric: str
+    vectorized: float
+    scalar: float
+    z: float  # difference of the means in (pooled) standard errors
+
+
+class EncounterSimulator:
+    """
+    Fights of `player` against `enemies`, starting from their current health.
+
+    `run` simulates them vectorized; `run_scalar` plays them one by one through
+    Combat and SpellCasting as the combat agent does, as the reference the
+    vectorized engine is checked against. Neither touches the characters given.
+    """
+
+    def __init__(
+        self,
+        player: PlayerCharacter,
+        enemies: List[NPCCharacter],
+        *,
+        player_action: str = "attack",
+        heal_below: Optional[float] = None,
+        player_roll: str = "normal",
+        enemy_roll: str = "normal",
+        max_rounds: int = DEFAULT_MAX_ROUNDS,
+    ) -> None:
+        if not enemies:
+            raise ValueError("An encounter needs at least one enemy")
+        if player_action not in PLAYER_ACTIONS:
+            raise ValueError(f"Unknown player action '{player_action}', expected one of {PLAYER_ACTIONS}")
+        if player_roll not in ROLL_MODES or enemy_roll not in ROLL_MODES:
+            raise ValueError(f"Attack rolls must be one of {ROLL_MODES}")
+        # Same restrictions as SpellCasting.cast_spell
+        if player_action == "firebolt" and player.character_class not in (CharacterClass.MAGE, CharacterClass.CLERIC):
+            raise ValueError(f"A {player.character_class.value} cannot cast firebolt")
+        if heal_below is not None and player.character_class != CharacterClass.CLERIC:
+            raise ValueError("Only clerics can cast healing spells")
+
+        self.player = player
+        self.enemies = enemies
+        self.player_action = player_action
+        self.heal_below = heal_below
+        self.player_roll = player_roll
+        self.enemy_roll = enemy_roll
+        self.max_rounds = max_rounds
+
+    def run(self, fights: int = 100_000, seed: Optional[int] = None) -> EncounterResult:
+        start = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        player, enemies = self.player, self.enemies
+        party = [player, *enemies]
+
+        # Column 0 is the player, columns 1.. the enemies
+        hp = np.tile(np.array([c.current_health for c in party], dtype=np.int64), (fights, 1))
+        enemy_ac = np.array([enemy.armor_class for enemy in enemies])
+        player_dice = compile_dice(player.damage_dice)
+        enemy_dice = [compile_dice(enemy.damage_dice) for enemy in enemies]
+        firebolt = compile_dice(SpellCasting.SPELLS["firebolt"]["damage"])
+        heal = compile_dice(SpellCasting.SPELLS["heal"]["healing"])
+
+        # Highest initiative first; ties keep the participant order, like the stable sort in initialize_combat
+        initiative = rng.integers(1, 21, size=(fights, len(party))) + np.array([c.initiative_bonus for c in party])
+        order = np.argsort(-initiative, axis=1, kind="stable")
+
+        outcome = np.zeros(fights, dtype=np.int8)
+        rounds = np.ones(fights, dtype=np.int64)
+        taken = np.zeros(fights, dtype=np.int64)
+        dealt = np.zeros(fights, dtype=np.int64)
+        live = np.arange(fights)  # fights still going
+
+        for _ in range(self.max_rounds):
+            for slot in range(len(party)):
+                actor = order[live, slot]
+
+                turn = live[actor == 0]
+                if self.heal_below is not None:
+                    healing = hp[turn, 0] < self.heal_below * player.max_health
+                    healed = turn[healing]
+                    amount = np.minimum(roll_dice(rng, heal, len(healed)), player.max_health - hp[healed, 0])
+                    hp[healed, 0] += amount
+                    turn = turn[~healing]
+                # The first enemy still standing
+                target = (hp[turn, 1:] > 0).argmax(axis=1) + 1
+                if self.player_action == "firebolt":
+                    damage = roll_dice(rng, firebolt, len(turn))
+                else:
+                    damage = resolve_attacks(
+                        rng, len(turn), player.attack_bonus, player_dice, enemy_ac[target - 1], self.player_roll
+                    )
+                damage = np.minimum(damage, hp[turn, target])  # as Character.take_damage
+                hp[turn, target] -= damage
+                dealt[turn] += damage
+
+                for column, enemy in enumerate(enemies, start=1):
+                    turn = live[(actor == column) & (hp[live, column] > 0)]
+                    damage = resolve_attacks(
+                        rng, len(turn), enemy.attack_bonus, enemy_dice[column - 1], player.armor_class, self.enemy_roll
+                    )
+                    damage = np.minimum(damage, hp[turn, 0])
+                    hp[turn, 0] -= damage
+                    taken[turn] += damage
+
+                won = (hp[live, 1:] <= 0).all(axis=1)
+                lost = hp[live, 0] <= 0
+                outcome[live[won]] = 1
+                outcome[live[lost]] = -1
+                live = live[~(won | lost)]
+
+            if not len(live):
+                break
+            rounds[live] += 1
+        rounds[live] = self.max_rounds
+
+        return EncounterResult(outcome, rounds, taken, dealt, seconds=time.perf_counter() - start)
+
+    def run_scalar(self, fights: int = 1_000, seed: Optional[int] = None) -> EncounterResult:
+        """Play the fights one at a time with the game's own rules (seeds the global `random`)"""
+        start = time.perf_counter()
+        if seed is not None:
+            random.seed(seed)
+        results = np.zeros((fights, 4), dtype=np.int64)
+        # Quiet: no console banners, no events
+        with event_sinks():
+            for i in range(fights):
+                results[i] = self._scalar_fight()
+        outcome, rounds, taken, dealt = results.T
+        return EncounterResult(outcome.astype(np.int8), rounds, taken, dealt, seconds=time.perf_counter() - start)
+
+    def _scalar_fight(self) -> Tuple[int, int, int, int]:
+        player = copy.deepcopy(self.player)
+        enemies = copy.deepcopy(self.enemies)
+        player_rolls = {"advantage": self.player_roll == "advantage", "disadvantage": self.player_roll == "disadvantage"}
+        enemy_rolls = {"advantage": self.enemy_roll == "advantage", "disadvantage": self.enemy_roll == "disadvantage"}
+        taken = dealt = 0
+        outcome = 0
+
+        state = Combat.initialize_combat(player, enemies)
+        while state.round_number <= self.max_rounds:
+            actor = state.get_current_character()
+            if actor is player:
+                if self.heal_below is not None and player.current_health < self.heal_below * player.max_health:
+                    SpellCasting.cast_spell(player, "heal", player)
+                else:
+                    target = next(c for c in state.participants if isinstance(c, NPCCharacter))
+                    before = target.current_health
+                    if self.player_action == "firebolt":
+                        SpellCasting.cast_spell(player, "firebolt", target)
+                    else:
+                        Combat.perform_attack(player, target, **player_rolls)
+                    dealt += before - target.current_health
+                    if target.current_health <= 0:
+                        state.remove_defeated(target)
+                        if state.is_complete:
+                            outcome = 1
+                            break
+            else:
+                _, damage, _ = Combat.perform_attack(actor, player, **enemy_rolls)
+                taken += damage
+                if player.current_health <= 0:
+                    outcome = -1
+                    break
+            state.next_turn()
+
+        return outcome, min(state.round_number, self.max_rounds), taken, dealt
+
+    def cross_check(
+        self, fights: int = 200_000, scalar_fights: int = 2_000, seed: Optional[int] = 0
+    ) -> List[MetricCheck]:
+        """Compare the vectorized engine with the scalar rules on the main metrics"""
+        vectorized = self.run(fights, seed)
+        scalar = self.run_scalar(scalar_fights, seed)
+        checks = []
+        for metric, values in (
+            ("win rate", lambda r: r.outcome == 1),
+            ("loss rate", lambda r: r.outcome == -1),
+            ("rounds", lambda r: r.rounds),
+            ("damage taken", lambda r: r.damage_taken),
+            ("damage dealt", lambda r: r.damage_dealt),
+        ):
+            a, b = values(vectorized).astype(float), values(scalar).astype(float)
+            # Pooled variance: both samples come from the same distribution if the engines agree.
+            # Each sample's own variance would be 0 for an outcome it never saw (e.g. a rare win).
+            pooled = np.concatenate([a, b]).var()
+            error = np.sqrt(pooled * (1 / len(a) + 1 / len(b)))
+            difference = a.mean() - b.mean()
+            z = difference / error if error else (0.0 if difference == 0 else float("inf"))
+            checks.append(MetricCheck(metric, a.mean(), b.mean(), float(z)))
+        return checks
+
+
+# The enemies of NarratorAgent.start_combat: (class, level)
+ENEMY_TYPES = {
+    "goblin": (CharacterClass.WARRIOR, 1),
+    "orc": (CharacterClass.WARRIOR, 2),
+    "bandit": (CharacterClass.ROGUE, 2),
+    "skeleton": (CharacterClass.WARRIOR, 1),
+    "dark_mage": (CharacterClass.MAGE, 3),
+    "wolf": (CharacterClass.ROGUE, 1),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate combat encounters with the game's rules")
+    parser.add_argument("--class", dest="character_class", default="warrior", choices=[c.value for c in CharacterClass])
+    parser.add_argument("--stats", default="10,10,10,10,10,10", help="STR,DEX,CON,INT,WIS,CHA")
+    parser.add_argument("--weapon", help="weapon damage dice, e.g. 1d8+1 (unarmed if not set)")
+    parser.add_argument("--armor-bonus", type=int, default=0, help="AC bonus of the player's armor")
+    parser.add_argument("--enemy", default="goblin", choices=sorted(ENEMY_TYPES))
+    parser.add_argument("--count", type=int, default=1, help="number of enemies")
+    parser.add_argument("--action", default="attack", choices=PLAYER_ACTIONS)
+    parser.add_argument("--heal-below", type=float, help="clerics heal themselves below this fraction of their health")
+    parser.add_argument("--player-roll", default="normal", choices=ROLL_MODES)
+    parser.add_argument("--enemy-roll", default="normal", choices=ROLL_MODES)
+    parser.add_argument("--fights", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0, help="also picks the enemies' random stats")
+    parser.add_argument("--check", action="store_true", help="cross-check against the scalar rules")
+    parser.add_argument("--scalar-fights", type=int, default=2_000)
+    parser.add_argument("--tolerance", type=float, default=4.0, help="largest |z| the cross-check accepts")
+    args = parser.parse_args()
+
+    stats = CharacterStats(*(int(value) for value in args.stats.split(",")))
+    player = PlayerCharacter(name="Player", character_class=CharacterClass(args.character_class), stats=stats)
+    for item in (
+        Item("weapon", "", "weapon", {"damage": args.weapon}) if args.weapon else None,
+        Item("armor", "", "armor", {"ac_bonus": args.armor_bonus}) if args.armor_bonus else None,
+    ):
+        if item:
+            player.add_item(item)
+            player.equip_item(item.name)
+
+    random.seed(args.seed)
+    enemy_class, level = ENEMY_TYPES[args.enemy]
+    enemies = [
+        create_random_npc(f"{args.enemy} {i + 1}", enemy_class, level=level, disposition="hostile")
+        for i in range(args.count)
+    ]
+
+    for character in (player, *enemies):
+        print(
+            f"{character.name:<14} HP {character.current_health:>3}  AC {character.armor_class:>2}  "
+            f"attack {character.attack_bonus:+d}  damage {character.damage_dice:<6}  initiative {character.initiative_bonus:+d}"
+        )
+
+    simulator = EncounterSimulator(
+        player,
+        enemies,
+        player_action=args.action,
+        heal_below=args.heal_below,
+        player_roll=args.player_roll,
+        enemy_roll=args.enemy_roll,
+    )
+    print(simulator.run(args.fights, args.seed).summary())
+
+    if args.check:
+        checks = simulator.cross_check(args.fights, args.scalar_fights, args.seed)
+        print(f"\nCross-check against {args.scalar_fights:,} scalar fights:")
+        for check in checks:
+            print(f"  {check.metric:<14}{check.vectorized:>10.3f}{check.scalar:>10.3f}   z {check.z:+.2f}")
+        if any(abs(check.z) > args.tolerance for check in checks):
+            print(f"FAILED: a metric differs by more than {args.tolerance:g} standard errors")
+            sys.exit(1)
+        print("OK")
+
+
+if __name__ == "__main__":
+    main()
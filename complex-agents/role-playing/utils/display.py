@@ -8,4 +8,103 @@ class Colors:
     RED = '\033[91m'
     ENDC = '\033[0m'
     BOLD = '\033[1m'
-    UNDERLINE = '\033[4m'
\ No newline at end of file
+    UNDERLINE = '\033[4m'
+
+def _signed(value: int) -> str:
+    return f"{'+' if value > 0 else ''}{value}"
+
+
+def _total_color(total: int) -> str:
+    return Colors.GREEN if total >= 15 else Colors.YELLOW if total >= 10 else Colors.RED
+
+
+def _health(hp: int, max_hp: int) -> str:
+    if hp <= 0:
+        return f"{Colors.RED}{Colors.BOLD}DEFEATED!{Colors.ENDC}"
+    hp_percent = (hp / max_hp) * 100 if max_hp else 0
+    color = Colors.GREEN if hp_percent > 50 else Colors.YELLOW if hp_percent > 25 else Colors.RED
+    return f"{color}{hp}/{max_hp}{Colors.ENDC}"
+
+
+def render_combat_event(event) -> None:
+    """Console sink for game_mechanics combat events: prints the stylized banner of each"""
+    lines = []
+    if event.kind == "roll":
+        lines += [
+            f"\n{Colors.CYAN}{'═' * 40}{Colors.ENDC}",
+            f"{Colors.YELLOW}🎲 DICE ROLL: {event.detail}{Colors.ENDC}",
+            f"{Colors.BOLD}   Rolls: {list(event.rolls)}{Colors.ENDC}",
+        ]
+        if event.modifier != 0:
+            lines.append(f"{Colors.BOLD}   Modifier: {_signed(event.modifier)}{Colors.ENDC}")
+        lines += [
+            f"{_total_color(event.total)}   ➤ Total: {event.total}{Colors.ENDC}",
+            f"{Colors.CYAN}{'═' * 40}{Colors.ENDC}\n",
+        ]
+    elif event.kind == "d20":
+        lines += [f"\n{Colors.BLUE}{'▬' * 40}{Colors.ENDC}", f"{Colors.HEADER}⚔️  D20 ROLL{Colors.ENDC}"]
+        if event.detail:
+            rolls = list(event.rolls)
+            base_roll = max(rolls) if event.detail == "advantage" else min(rolls)
+            lines += [
+                f"{Colors.BOLD}   Type: {event.detail.capitalize()}{Colors.ENDC}",
+                f"{Colors.BOLD}   Rolls: {rolls} → {base_roll}{Colors.ENDC}",
+            ]
+        else:
+            lines.append(f"{Colors.BOLD}   Roll: {event.rolls[0]}{Colors.ENDC}")
+        if event.outcome == "nat20":
+            lines.append(f"{Colors.GREEN}{Colors.BOLD}   ★ NATURAL 20! ★{Colors.ENDC}")
+        elif event.outcome == "nat1":
+            lines.append(f"{Colors.RED}{Colors.BOLD}   ☠ NATURAL 1! ☠{Colors.ENDC}")
+        if event.modifier != 0:
+            lines.append(f"{Colors.BOLD}   Modifier: {_signed(event.modifier)}{Colors.ENDC}")
+        lines += [
+            f"{_total_color(event.total)}   ➤ Total: {event.total}{Colors.ENDC}",
+            f"{Colors.BLUE}{'▬' * 40}{Colors.ENDC}\n",
+        ]
+    elif event.kind == "combat_start":
+        lines += [
+            f"\n{Colors.RED}{Colors.BOLD}{'🔥' * 20}{Colors.ENDC}",
+            f"{Colors.RED}{Colors.BOLD}         ⚔️  COMBAT BEGINS! ⚔️{Colors.ENDC}",
+            f"{Colors.RED}{Colors.BOLD}{'🔥' * 20}{Colors.ENDC}\n",
+            f"{Colors.YELLOW}{Colors.BOLD}Rolling Initiative...{Colors.ENDC}",
+        ]
+    elif event.kind == "initiative_order":
+        lines.append(f"\n{Colors.CYAN}{Colors.BOLD}Initiative Order:{Colors.ENDC}")
+        for i, (name, initiative) in enumerate(zip(event.detail.split(", "), event.rolls)):
+            lines.append(f"  {i+1}. {Colors.BOLD}{name}{Colors.ENDC} (Initiative: {initiative})")
+        lines.append("")
+    elif event.kind == "attack":
+        lines += [
+            f"\n{Colors.RED}{'⚔' * 20}{Colors.ENDC}",
+            f"{Colors.BOLD}⚔️  ATTACK: {event.actor} → {event.target}{Colors.ENDC}",
+            f"{Colors.BOLD}   Target AC: {event.against} (attack roll {event.total}){Colors.ENDC}",
+        ]
+        if event.outcome == "miss":
+            lines.append(f"{Colors.BOLD}   Attack Result: {Colors.RED}{Colors.BOLD}MISS!{Colors.ENDC}")
+        else:
+            crit = " CRITICAL!" if event.outcome == "crit" else ""
+            lines += [
+                f"{Colors.BOLD}   Attack Result: {Colors.GREEN}{Colors.BOLD}HIT!{crit}{Colors.ENDC}",
+                f"{Colors.BOLD}   Total Damage: {Colors.RED}{event.damage}{Colors.ENDC}",
+                f"{Colors.BOLD}   {event.target} HP: {Colors.ENDC}{_health(event.hp, event.max_hp)}",
+            ]
+        lines.append(f"{Colors.RED}{'⚔' * 20}{Colors.ENDC}\n")
+    elif event.kind == "skill_check":
+        roll = f"{event.rolls[0]} {_signed(event.modifier)} = {event.total}" if event.modifier else str(event.total)
+        result = f"{Colors.GREEN}{Colors.BOLD}✓ SUCCESS!" if event.outcome == "success" else f"{Colors.RED}{Colors.BOLD}✗ FAILURE!"
+        lines += [
+            f"\n{Colors.HEADER}{'━' * 40}{Colors.ENDC}",
+            f"{Colors.BOLD}📜 SKILL CHECK: {event.detail.upper()}{Colors.ENDC}",
+            f"{Colors.BOLD}   Character: {event.actor}{Colors.ENDC}",
+            f"{Colors.BOLD}   Roll: {roll} vs DC {event.against}{Colors.ENDC}",
+            f"{Colors.BOLD}   Result: {result}{Colors.ENDC}",
+            f"{Colors.HEADER}{'━' * 40}{Colors.ENDC}\n",
+        ]
+    elif event.kind == "spell":
+        line = f"{Colors.CYAN}✨ SPELL: {event.actor} casts {event.detail}"
+        if event.target and event.max_hp:
+            verb = "heals" if event.detail == "heal" else "takes"
+            line += f" → {event.target} {verb} {event.damage} (rolled {event.total}), HP {_health(event.hp, event.max_hp)}"
+        lines.append(line + Colors.ENDC)
+    print("\n".join(lines))
@@ -1,16 +1,163 @@
+import asyncio
+import glob
+import logging
 import os
+import string
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
 import yaml
 
+logger = logging.getLogger("dungeons-and-agents")
+
+# Go up one directory from utils to the project root
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPTS_DIR = os.path.join(PROJECT_DIR, 'prompts')
+RULES_DIR = os.path.join(PROJECT_DIR, 'rules')
+
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+class PromptTemplate(NamedTuple):
+    """A `str.format` template parsed once, when its document is loaded"""
+    text: str
+    fields: frozenset
+
+    @classmethod
+    def compile(cls, text: str) -> "PromptTemplate":
+        # Raises ValueError on unbalanced braces, so a broken template fails at load, not mid-generation
+        fields = frozenset(
+            field.split('.')[0].split('[')[0]
+            for _, field, _, _ in string.Formatter().parse(text)
+            if field
+        )
+        return cls(text, fields)
+
+    def format(self, **kwargs) -> str:
+        return self.text.format(**kwargs)
+
+
+class _Document(NamedTuple):
+    data: dict
+    templates: Dict[str, PromptTemplate]  # from the document's generation_prompts
+    stamp: Tuple[int, int]  # (mtime_ns, size) of the file it was parsed from
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _parse(path: str) -> _Document:
+    stamp = _stamp(path)
+    with open(path, 'r') as file:
+        data = yaml.safe_load(file) or {}
+    if not isinstance(data, dict):
+        raise yaml.YAMLError(f"expected a mapping at the top level, got {type(data).__name__}")
+    templates = {
+        name: PromptTemplate.compile(text)
+        for name, text in (data.get('generation_prompts') or {}).items()
+        if isinstance(text, str)
+    }
+    return _Document(data, templates, stamp)
+
+
+class DocumentCache:
+    """
+    Parsed prompt and rule documents, shared by every session of the process.
+
+    `get` only touches the disk the first time a file is asked for, so agents
+    and generators built on a handoff read their YAML from memory. Files are
+    re-checked (by mtime and size) only by `refresh`, which `watch` runs
+    periodically for hot reloading; a file that no longer parses keeps serving
+    its last good version.
+    """
+
+    def __init__(self) -> None:
+        self._documents: Dict[str, _Document] = {}
+        self._lock = threading.Lock()  # documents are parsed off the event loop by refresh
+        self._watch_task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    def _load(self, path: str) -> Optional[_Document]:
+        try:
+            document = _parse(path)
+        except (OSError, yaml.YAMLError, ValueError) as e:
+            logger.error(f"Failed to load {os.path.relpath(path, PROJECT_DIR)}: {e}")
+            return None
+        with self._lock:
+            self._documents[path] = document
+        return document
+
+    def _document(self, path: str) -> Optional[_Document]:
+        path = os.path.abspath(path)
+        return self._documents.get(path) or self._load(path)
+
+    def get(self, path: str) -> dict:
+        """The parsed document at path; an empty dict if it can't be loaded"""
+        document = self._document(path)
+        return document.data if document else {}
+
+    def templates(self, path: str) -> Dict[str, PromptTemplate]:
+        """The compiled generation_prompts of the document at path"""
+        document = self._document(path)
+        return document.templates if document else {}
+
+    def preload(self, *directories: str) -> int:
+        """Parse every YAML file of the directories; returns how many were loaded"""
+        paths = [
+            path
+            for directory in directories or (PROMPTS_DIR, RULES_DIR)
+            for path in sorted(glob.glob(os.path.join(directory, '*.yaml')))
+        ]
+        return sum(self._load(os.path.abspath(path)) is not None for path in paths)
+
+    def refresh(self) -> List[str]:
+        """Re-parse the cached documents whose file changed; returns their paths"""
+        reloaded = []
+        for path, document in list(self._documents.items()):
+            try:
+                stamp = _stamp(path)
+            except OSError:
+                continue  # deleted or being replaced: keep the last version
+            if stamp == document.stamp:
+                continue
+            if self._load(path) is not None:
+                reloaded.append(path)
+                logger.info(f"Reloaded {os.path.relpath(path, PROJECT_DIR)}")
+            else:
+                # Keep serving the last good version, and don't retry until the file changes again
+                with self._lock:
+                    self._documents[path] = document._replace(stamp=stamp)
+        self.reloads += len(reloaded)
+        return reloaded
+
+    async def watch(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Refresh every interval seconds, forever"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.refresh)
+
+    def start_watching(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Start `watch` on the running loop, unless it is already running there"""
+        loop = asyncio.get_running_loop()
+        task = self._watch_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._watch_task = loop.create_task(self.watch(interval))
+
+
+documents = DocumentCache()
+
+
+def prompt_path(filename: str) -> str:
+    return os.path.join(PROMPTS_DIR, filename)
+
+
+def rules_path(filename: str) -> str:
+    return os.path.join(RULES_DIR, filename)
+
+
 def load_prompt(filename):
     """Load a prompt from a YAML file."""
-    # Go up one directory from utils to the project root
-    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    prompt_path = os.path.join(project_dir, 'prompts', filename)
-    
-    try:
-        with open(prompt_path, 'r') as file:
-            prompt_data = yaml.safe_load(file)
-            return prompt_data.get('instructions', '')
-    except (FileNotFoundError, yaml.YAMLError) as e:
-        print(f"Error loading prompt file {filename}: {e}")
-        return ""
\ No newline at end of file
+    return documents.get(prompt_path(filename)).get('instructions', '')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark SentenceChunker against its previous implementation.
+
+The input (data/raw_data.txt by default) is repeated up to --size-mb and
+chunked by the previous implementation, the current one in this process, and
+the current one in a process pool. Reports time and throughput, checks that
+the serial and pooled runs produce the same chunks, and that no chunk of more
+than one word exceeds the maximum. The previous implementation's chunks
+differ: it prepended the overlap on top of a full-size chunk, and emitted an
+empty chunk for a paragraph opening with a word longer than the maximum.
+
+Usage:
+    python benchmark_chunker.py [--input data/raw_data.txt] [--size-mb 50] [--max-chunk-size 120] [--overlap 30]
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+from livekit.agents import tokenize
+
+from rag_db_builder import SentenceChunker
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+class LegacySentenceChunker:
+    """SentenceChunker before it tracked running lengths: re-joins the buffer for every word"""
+
+    def __init__(self, *, max_chunk_size: int = 120, chunk_overlap: int = 30) -> None:
+        self._max_chunk_size = max_chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._paragraph_tokenizer: Callable[[str], list[str]] = tokenize.basic.tokenize_paragraphs
+        self._sentence_tokenizer = tokenize.basic.SentenceTokenizer()
+        self._word_tokenizer = tokenize.basic.WordTokenizer(ignore_punctuation=False)
+
+    def chunk(self, *, text: str) -> list[str]:
+        chunks = []
+
+        buf_words: list[str] = []
+        for paragraph in self._paragraph_tokenizer(text):
+            last_buf_words: list[str] = []
+
+            for sentence in self._sentence_tokenizer.tokenize(text=paragraph):
+                for word in self._word_tokenizer.tokenize(text=sentence):
+                    reconstructed = self._word_tokenizer.format_words(buf_words + [word])
+
+                    if len(reconstructed) > self._max_chunk_size:
+                        while len(self._word_tokenizer.format_words(last_buf_words)) > self._chunk_overlap:
+                            last_buf_words = last_buf_words[1:]
+
+                        new_chunk = self._word_tokenizer.format_words(last_buf_words + buf_words)
+                        chunks.append(new_chunk)
+                        last_buf_words = buf_words
+                        buf_words = []
+
+                    buf_words.append(word)
+
+            if buf_words:
+                while len(self._word_tokenizer.format_words(last_buf_words)) > self._chunk_overlap:
+                    last_buf_words = last_buf_words[1:]
+
+                new_chunk = self._word_tokenizer.format_words(last_buf_words + buf_words)
+                chunks.append(new_chunk)
+                buf_words = []
+
+        return chunks
+
+
+def load_corpus(path: Path, size_mb: float) -> str:
+    text = path.read_text()
+    if not text.strip():
+        raise SystemExit(f"{path} is empty")
+    target = int(size_mb * 1024 * 1024)
+    copies = max(1, -(-target // len(text)))
+    return "\n\n".join([text] * copies)[:target]
+
+
+def timed(label: str, fn: Callable[[], list[str]], size: int) -> list[str]:
+    start = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<28}{elapsed:9.2f}s {size / elapsed / 1e6:9.2f} MB/s {len(chunks):>10} chunks")
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=str(DATA_DIR / "raw_data.txt"))
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--max-chunk-size", type=int, default=120)
+    parser.add_argument("--overlap", type=int, default=30)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--skip-legacy", action="store_true", help="don't run the previous implementation")
+    args = parser.parse_args()
+
+    text = load_corpus(Path(args.input), args.size_mb)
+    print(f"\n📊 Chunking {len(text) / 1e6:.1f} MB (max {args.max_chunk_size} chars, overlap {args.overlap})")
+
+    chunker = SentenceChunker(max_chunk_size=args.max_chunk_size, chunk_overlap=args.overlap)
+    current = timed("current", lambda: chunker.chunk(text=text), len(text))
+    pooled = timed(
+        f"current, pool of {args.processes}",
+        lambda: chunker.chunk_many([text], processes=args.processes),
+        len(text),
+    )
+    assert pooled == current, "process pool output differs from serial output"
+
+    if not args.skip_legacy:
+        legacy_chunker = LegacySentenceChunker(max_chunk_size=args.max_chunk_size, chunk_overlap=args.overlap)
+        legacy = timed("previous", lambda: legacy_chunker.chunk(text=text), len(text))
+        report_differences(legacy, current, args.max_chunk_size)
+
+
+def report_differences(legacy: list[str], current: list[str], max_chunk_size: int) -> None:
+    # The previous implementation prepended the overlap on top of up to max_chunk_size of new
+    # words, and emitted an empty chunk for a paragraph opening with an oversized word, so the
+    # chunks are expected to differ; what's checked is that the current ones respect the limit
+    def oversized(chunks: list[str]) -> int:
+        # A single word longer than the limit is a chunk of its own in both implementations
+        return sum(1 for chunk in chunks if len(chunk) > max_chunk_size and " " in chunk)
+
+    empty = sum(1 for chunk in legacy if not chunk)
+    print(f"   previous: {len(legacy)} chunks, {oversized(legacy)} over {max_chunk_size} chars, {empty} empty")
+    print(f"   current:  {len(current)} chunks, {oversized(current)} over {max_chunk_size} chars")
+    if oversized(current) or not all(current):
+        print("   ✗ the current implementation produced chunks over the limit or empty chunks")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Recall benchmark for RAG retrieval over a fixed question set.
+
+For every question in eval_questions.json, checks whether any of the top-k
+retrieved paragraphs contains one of the expected strings (case-insensitive),
+for vector-only, BM25-only and hybrid (reciprocal-rank fusion) retrieval.
+
+Question embeddings go through the same embedding cache as build_rag_data.py,
+so only the first run calls the embeddings API.
+
+Usage:
+    python benchmark_retrieval.py [--questions eval_questions.json] [-k 1 2 3 5] [--max-distance 1.1]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import pickle
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from embedding_cache import EmbeddingCache, content_hash
+from embeddings_client import EmbeddingsClient
+from hybrid_retriever import HybridRetriever
+from lexical_index import BM25Index
+from vector_store import load_index
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("benchmark-retrieval")
+
+load_dotenv()
+
+DATA_DIR = Path(__file__).parent / "data"
+EMBEDDINGS_MODEL = "text-embedding-3-small"
+EMBEDDINGS_DIMENSION = 1536
+
+
+async def embed_questions(questions: list[str], cache_path: Path) -> list[list[float]]:
+    cache = EmbeddingCache(cache_path)
+    try:
+        hashes = [content_hash(q) for q in questions]
+        cached = cache.get_many(EMBEDDINGS_MODEL, EMBEDDINGS_DIMENSION, hashes)
+        missing = [q for q, h in zip(questions, hashes) if h not in cached]
+        if missing:
+            async with aiohttp.ClientSession() as http_session:
+                client = EmbeddingsClient(http_session, model=EMBEDDINGS_MODEL, dimensions=EMBEDDINGS_DIMENSION)
+                vectors = await client.embed(missing)
+            new = {content_hash(q): v for q, v in zip(missing, vectors)}
+            cache.put_many(EMBEDDINGS_MODEL, EMBEDDINGS_DIMENSION, new)
+            cached.update(new)
+        logger.info(f"Embedded {len(missing)} questions ({len(questions) - len(missing)} cached)")
+        return [cached[h] for h in hashes]
+    finally:
+        cache.close()
+
+
+def is_hit(paragraph_ids: list[str], paragraphs: dict[str, str], expect: list[str]) -> bool:
+    expected = [e.lower() for e in expect]
+    return any(
+        any(e in paragraphs.get(p_id, "").lower() for e in expected) for p_id in paragraph_ids
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=str(Path(__file__).parent / "eval_questions.json"))
+    parser.add_argument("--index", default=str(DATA_DIR))
+    parser.add_argument("--paragraphs", default=str(DATA_DIR / "paragraphs.pkl"))
+    parser.add_argument("--cache", default=str(DATA_DIR / "embeddings_cache.sqlite"))
+    parser.add_argument("-k", type=int, nargs="+", default=[1, 2, 3, 5])
+    parser.add_argument("--max-distance", type=float, default=None)
+    parser.add_argument("--verbose", action="store_true", help="list the questions each method misses")
+    args = parser.parse_args()
+
+    if not BM25Index.exists(args.index):
+        logger.error(f"No BM25 index in {args.index}; rebuild with build_rag_data.py")
+        return
+
+    with open(args.questions) as f:
+        questions = json.load(f)
+    with open(args.paragraphs, "rb") as f:
+        paragraphs: dict[str, str] = pickle.load(f)
+
+    vector_index = load_index(args.index)
+    lexical_index = BM25Index.load(args.index)
+    vectors = await embed_questions([q["question"] for q in questions], Path(args.cache))
+
+    max_k = max(args.k)
+    methods = {
+        "vector": HybridRetriever(vector_index, None),
+        "bm25": None,
+        "hybrid": HybridRetriever(vector_index, lexical_index),
+    }
+
+    def retrieve(method: str, question: str, vector: list[float], k: int, max_distance: Optional[float]) -> list[str]:
+        if method == "bm25":
+            return [p_id for p_id, _ in lexical_index.query(question, k)]
+        return [r.id for r in methods[method].search(question, vector, top_k=k, max_distance=max_distance)]
+
+    print(f"\n📊 Recall over {len(questions)} questions ({len(paragraphs)} paragraphs)")
+    print("   " + "method".ljust(8) + "".join(f"hit@{k}".rjust(9) for k in args.k))
+    for method in methods:
+        hits = {k: 0 for k in args.k}
+        missed = []
+        for q, vector in zip(questions, vectors):
+            retrieved = retrieve(method, q["question"], vector, max_k, args.max_distance)
+            for k in args.k:
+                hits[k] += is_hit(retrieved[:k], paragraphs, q["expect"])
+            if not is_hit(retrieved[:max_k], paragraphs, q["expect"]):
+                missed.append(q["question"])
+        print("   " + method.ljust(8) + "".join(f"{hits[k] / len(questions):9.2f}" for k in args.k))
+        if args.verbose:
+            for question in missed:
+                print(f"      miss: {question}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vector store backends on a built RAG index.
+
+Rebuilds every backend from the vectors in the index directory (no embedding
+calls), then runs the same queries against each and reports recall@k against
+the exact backend plus p50/p99 query latency.
+
+Queries are stored docs vectors with a little Gaussian noise added, so they
+look like real questions landing near (but not exactly on) a paragraph.
+
+Usage:
+    python benchmark_vector_store.py [--index data] [--queries 200] [-k 5] [--noise 0.02]
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from vector_store import BACKENDS, IndexBuilder, load_index
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("benchmark-vector-store")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=str(Path(__file__).parent / "data"), help="index directory to read vectors from")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5, help="neighbours per query (recall@k)")
+    parser.add_argument("--noise", type=float, default=0.02, help="std-dev of noise added to query vectors")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    source = load_index(args.index)
+    items = list(source.items())
+    if not items:
+        logger.error(f"No items in {args.index}; run build_rag_data.py first")
+        return
+    vectors = np.asarray([item.vector for item in items], dtype=np.float32)
+    logger.info(f"Loaded {len(items)} vectors ({vectors.shape[1]} dimensions, {source.metric}) from {args.index}")
+
+    rng = np.random.default_rng(42)
+    picks = rng.choice(len(items), size=min(args.queries, len(items)), replace=False)
+    scale = args.noise * float(np.linalg.norm(vectors, axis=1).mean()) / np.sqrt(vectors.shape[1])
+    queries = vectors[picks] + rng.normal(scale=scale, size=(len(picks), vectors.shape[1])).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        builder = IndexBuilder(f=vectors.shape[1], metric=source.metric, backends=tuple(args.backends))
+        for item in items:
+            builder.add_item(item.vector, item.userdata)
+        start = time.perf_counter()
+        builder.build(scratch)
+        logger.info(f"Built {', '.join(args.backends)} in {time.perf_counter() - start:.1f}s")
+
+        exact = load_index(scratch, "exact")
+        truth = [set(exact.query_ids(q.tolist(), args.k)[0]) for q in queries]
+
+        print(f"\n📊 {len(queries)} queries, k={args.k}, {len(items)} items")
+        for backend in args.backends:
+            index = load_index(scratch, backend)
+            # Warm up page cache and lazy structures
+            for q in queries[:5]:
+                index.query_ids(q.tolist(), args.k)
+
+            latencies = []
+            hits = 0
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                ids, _ = index.query_ids(q.tolist(), args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(expected.intersection(ids))
+
+            recall = hits / max(sum(len(t) for t in truth), 1)
+            print(
+                f"   {backend:<6} recall@{args.k}={recall:.3f}  "
+                f"p50={statistics.median(latencies):6.2f} ms  p99={percentile(latencies, 0.99):6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
 import logging
 from pathlib import Path
@@ -23,10 +24,20 @@ async def main() -> None:
         1. Run scrape_docs.py to scrape the docs content
         2. Run this script to build the RAG database
         3. The database will be created in the 'data' directory
+
+    Embeddings are cached in data/embeddings_cache.sqlite, so rebuilding after a
+    re-scrape only embeds paragraphs that changed; after each build the cache keeps
+    only the current paragraphs. Pass --full to re-embed everything.
     """
-    # Check if raw_data.txt exists
+    parser = argparse.ArgumentParser(description="Build the RAG database from data/pages/ or data/raw_data.txt")
+    parser.add_argument("--full", action="store_true", help="ignore cached embeddings and re-embed every paragraph")
+    args = parser.parse_args()
+
+    # Prefer the per-page files written by scrape_docs.py, fall back to raw_data.txt
+    pages_dir = Path(__file__).parent / "data/pages"
     raw_data_path = Path(__file__).parent / "data/raw_data.txt"
-    if not raw_data_path.exists():
+    use_pages = pages_dir.exists() and any(pages_dir.glob("*.txt"))
+    if not use_pages and not raw_data_path.exists():
         logger.error(
             "raw_data.txt not found. Please run scrape_docs.py first:\n"
             "$ python scrape_docs.py"
@@ -38,13 +49,21 @@ async def main() -> None:
     output_dir.mkdir(exist_ok=True)
 
     logger.info("Building RAG database...")
-    await RAGBuilder.create_from_file(
-        file_path=raw_data_path,
+    builder = RAGBuilder(
         index_path=output_dir,
         data_path=output_dir / "paragraphs.pkl",
         embeddings_dimension=1536,
+        embeddings_cache_path=output_dir / "embeddings_cache.sqlite",
     )
+    if use_pages:
+        stats = await builder.build_from_directory(pages_dir, incremental=not args.full)
+    else:
+        stats = await builder.build_from_file(raw_data_path, incremental=not args.full)
     logger.info("RAG database successfully built!")
+    logger.info(
+        f"Paragraphs: {stats.chunks} ({stats.reused} reused from cache, {stats.embedded} newly embedded, "
+        f"{stats.pruned} stale embeddings pruned)"
+    )
     logger.info(f"Index saved to: {output_dir}")
     logger.info(f"Data saved to: {output_dir / 'paragraphs.pkl'}")
 
@@ -0,0 +1,90 @@
+"""
+Persistent embedding cache for RAG rebuilds.
+
+Embeddings are stored in a SQLite file keyed by (model, dimensions, sha256 of
+the cleaned chunk text), so rebuilding after a re-scrape only embeds chunks
+whose text actually changed.
+"""
+
+import hashlib
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Iterable, Union
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_LOOKUP_CHUNK = 500
+
+
+def content_hash(text: str) -> str:
+    """sha256 hex digest of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(text: str) -> str:
+    """Stable chunk ID derived from its content (identical chunks share an ID)"""
+    return content_hash(text)[:32]
+
+
+class EmbeddingCache:
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self._path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (model, dimensions, content_hash)
+            )
+            """
+        )
+
+    def get_many(self, model: str, dimensions: int, hashes: Iterable[str]) -> dict[str, list[float]]:
+        """Cached embeddings for whichever of the hashes are present"""
+        hashes = list(hashes)
+        found = {}
+        for i in range(0, len(hashes), _LOOKUP_CHUNK):
+            chunk = hashes[i:i + _LOOKUP_CHUNK]
+            rows = self._conn.execute(
+                f"""
+                SELECT content_hash, embedding FROM embeddings
+                WHERE model = ? AND dimensions = ? AND content_hash IN ({",".join("?" * len(chunk))})
+                """,
+                [model, dimensions, *chunk],
+            )
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, dimensions: int, embeddings: dict[str, list[float]]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimensions, content_hash, embedding) VALUES (?, ?, ?, ?)",
+                [(model, dimensions, key, array("f", vector).tobytes()) for key, vector in embeddings.items()],
+            )
+
+    def prune(self, model: str, dimensions: int, keep: Iterable[str]) -> int:
+        """Delete this model's cached embeddings whose hash is not in keep; returns rows deleted"""
+        with self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_hashes (content_hash TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM keep_hashes")
+            self._conn.executemany("INSERT OR IGNORE INTO keep_hashes VALUES (?)", [(key,) for key in keep])
+            deleted = self._conn.execute(
+                """
+                DELETE FROM embeddings
+                WHERE model = ? AND dimensions = ?
+                  AND content_hash NOT IN (SELECT content_hash FROM keep_hashes)
+                """,
+                (model, dimensions),
+            ).rowcount
+        return deleted
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,191 @@
+"""
+Batched embeddings client used by RAGBuilder.
+
+Packs texts into requests bounded by an input count and an estimated token
+budget, sends several requests at once (bounded by a semaphore), retries rate
+limits and server errors with exponential backoff, and returns the embeddings
+in input order.
+
+Talks to any OpenAI-compatible /embeddings endpoint: set OPENAI_BASE_URL (or
+pass base_url) to point it at a proxy or a local stub server.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import random
+import struct
+from collections.abc import Callable
+from typing import Optional
+
+import aiohttp
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger("rag-embeddings")
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_TOKENS = 100_000
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingsError(Exception):
+    """The embeddings endpoint rejected a request, or kept failing after all retries"""
+
+
+def token_counter() -> Callable[[str], int]:
+    """Exact counts with tiktoken when installed, otherwise ~4 characters per token"""
+    if tiktoken is not None:
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    return lambda text: len(text) // 4 + 1
+
+
+def make_batches(
+    texts: list[str], batch_size: int, max_batch_tokens: int, count_tokens: Callable[[str], int]
+) -> list[tuple[int, int]]:
+    """
+    Split texts into consecutive (start, end) slices of at most batch_size texts
+    and max_batch_tokens estimated tokens. A single text over the budget gets a
+    batch of its own.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = count_tokens(text)
+        if i > start and (i - start >= batch_size or tokens + text_tokens > max_batch_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def _decode(embedding) -> list[float]:
+    if isinstance(embedding, str):
+        raw = base64.b64decode(embedding)
+        return list(struct.unpack(f"{len(raw) // 4}f", raw))
+    return embedding
+
+
+class EmbeddingsClient:
+    def __init__(
+        self,
+        http_session: aiohttp.ClientSession,
+        model: str = "text-embedding-3-small",
+        dimensions: Optional[int] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        concurrency: int = 4,
+        max_retries: int = 6,
+        retry_delay: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            http_session: Session used for all requests
+            model: Embeddings model
+            dimensions: Output dimensions (for models that support shortening)
+            api_key: Defaults to OPENAI_API_KEY
+            base_url: Defaults to OPENAI_BASE_URL, then the OpenAI API
+            batch_size: Maximum texts per request
+            max_batch_tokens: Maximum estimated tokens per request
+            concurrency: Maximum requests in flight
+            max_retries: Retries per request on rate limits, server errors and connection errors
+            retry_delay: Initial backoff in seconds, doubled on every retry
+        """
+        self._http_session = http_session
+        self._model = model
+        self._dimensions = dimensions
+        self._api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
+        self._url = (base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/") + "/embeddings"
+        self._batch_size = batch_size
+        self._max_batch_tokens = max_batch_tokens
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._count_tokens = token_counter()
+
+        self.requests = 0
+        self.retries = 0
+
+    async def embed(
+        self, texts: list[str], on_batch_done: Optional[Callable[[int], None]] = None
+    ) -> list[list[float]]:
+        """
+        Embed texts and return their vectors in the same order.
+
+        Args:
+            texts: Texts to embed
+            on_batch_done: Called with the number of texts after each request completes
+        """
+        results: list[Optional[list[float]]] = [None] * len(texts)
+
+        async def run(start: int, end: int) -> None:
+            async with self._semaphore:
+                vectors = await self._request(texts[start:end])
+            results[start:end] = vectors
+            if on_batch_done:
+                on_batch_done(end - start)
+
+        batches = make_batches(texts, self._batch_size, self._max_batch_tokens, self._count_tokens)
+        tasks = [asyncio.create_task(run(start, end)) for start, end in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return results
+
+    async def _request(self, batch: list[str]) -> list[list[float]]:
+        payload = {"model": self._model, "input": batch, "encoding_format": "base64"}
+        if self._dimensions:
+            payload["dimensions"] = self._dimensions
+        headers = {"Authorization": f"Bearer {self._api_key}"}
+
+        for attempt in range(self._max_retries + 1):
+            retry_after = None
+            try:
+                self.requests += 1
+                async with self._http_session.post(self._url, headers=headers, json=payload) as resp:
+                    if resp.status == 200:
+                        data = (await resp.json())["data"]
+                        # The API returns inputs by index, not necessarily in order
+                        data.sort(key=lambda d: d["index"])
+                        if len(data) != len(batch):
+                            raise EmbeddingsError(f"Expected {len(batch)} embeddings, got {len(data)}")
+                        return [_decode(d["embedding"]) for d in data]
+                    body = await resp.text()
+                    if resp.status not in RETRY_STATUSES:
+                        raise EmbeddingsError(f"Embeddings request failed ({resp.status}): {body[:500]}")
+                    error = f"HTTP {resp.status}"
+                    retry_after = resp.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+            if attempt == self._max_retries:
+                raise EmbeddingsError(f"Embeddings request failed after {attempt + 1} attempts: {error}")
+            delay = self._retry_delay * (2 ** attempt)
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            # Jitter so concurrent requests don't retry in lockstep
+            delay *= random.uniform(0.8, 1.2)
+            self.retries += 1
+            logger.warning(f"Embeddings request failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return []
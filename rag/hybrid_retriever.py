@@ -0,0 +1,105 @@
+"""
+Hybrid lexical + vector retrieval for the RAG agents.
+
+Runs the query embedding against the vector index and the query text against
+the BM25 index, then merges both rankings with reciprocal-rank fusion (RRF).
+RRF only looks at ranks, so the two incomparable scores never need tuning
+against each other, and the lexical side costs no extra embedding call.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from lexical_index import BM25Index
+from vector_store import VectorIndex
+
+# Standard RRF constant: damps the weight of the very top ranks
+RRF_K = 60
+
+
+@dataclass
+class RetrievedParagraph:
+    id: str
+    score: float
+    distance: Optional[float] = None  # vector distance, when the vector search found it
+    lexical_rank: Optional[int] = None
+    vector_rank: Optional[int] = None
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Merge ranked id lists: score(id) = sum over lists of 1 / (k + rank), rank from 1"""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        vector_index: VectorIndex,
+        lexical_index: Optional[BM25Index] = None,
+        candidates: int = 20,
+        rrf_k: int = RRF_K,
+    ) -> None:
+        """
+        Args:
+            vector_index: Index whose userdata are paragraph ids
+            lexical_index: BM25 index over the same paragraphs; None for vector-only search
+            candidates: How many results to take from each index before fusing
+            rrf_k: Reciprocal-rank fusion constant
+        """
+        self._vector_index = vector_index
+        self._lexical_index = lexical_index
+        self._candidates = candidates
+        self._rrf_k = rrf_k
+
+    def search(
+        self,
+        query: str,
+        query_vector: list[float],
+        top_k: int = 3,
+        max_distance: Optional[float] = None,
+        exclude: Optional[set[str]] = None,
+    ) -> list[RetrievedParagraph]:
+        """
+        Args:
+            query: Query text, for the lexical index
+            query_vector: Query embedding, for the vector index
+            top_k: Maximum paragraphs to return
+            max_distance: Drop vector hits further than this (in the index's distance
+                metric); lexical hits are kept regardless
+            exclude: Paragraph ids to leave out (e.g. already shown to the user)
+        """
+        exclude = exclude or set()
+        candidates = self._candidates + len(exclude)
+
+        distances = {}
+        vector_ranking = []
+        for result in self._vector_index.query(query_vector, candidates):
+            if max_distance is not None and result.distance > max_distance:
+                continue
+            if result.userdata not in exclude:
+                vector_ranking.append(result.userdata)
+                distances[result.userdata] = result.distance
+
+        lexical_ranking = []
+        if self._lexical_index is not None:
+            lexical_ranking = [
+                doc_id for doc_id, _ in self._lexical_index.query(query, candidates) if doc_id not in exclude
+            ]
+
+        vector_ranks = {doc_id: rank for rank, doc_id in enumerate(vector_ranking, start=1)}
+        lexical_ranks = {doc_id: rank for rank, doc_id in enumerate(lexical_ranking, start=1)}
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], self._rrf_k)
+        return [
+            RetrievedParagraph(
+                id=doc_id,
+                score=score,
+                distance=distances.get(doc_id),
+                lexical_rank=lexical_ranks.get(doc_id),
+                vector_rank=vector_ranks.get(doc_id),
+            )
+            for doc_id, score in fused[:top_k]
+        ]
@@ -0,0 +1,160 @@
+"""
+BM25 inverted index over the RAG paragraphs.
+
+Catches exact API names (perform_rpc, BackgroundAudioPlayer) that embeddings
+blur together. Built by RAGBuilder next to the vector index and stored the same
+way: a JSON header plus .npy arrays memory-mapped on load.
+
+    bm25.json               k1, b, average paragraph length, vocabulary, paragraph ids
+    bm25_offsets.npy        int64 (terms + 1,) start of every term's postings
+    bm25_postings.npy       int32 paragraph index of every posting, grouped by term
+    bm25_tfs.npy            float32 term frequency of every posting
+    bm25_lengths.npy        float32 (paragraphs,) token count of every paragraph
+"""
+
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+HEADER_FILE = "bm25.json"
+OFFSETS_FILE = "bm25_offsets.npy"
+POSTINGS_FILE = "bm25_postings.npy"
+TFS_FILE = "bm25_tfs.npy"
+LENGTHS_FILE = "bm25_lengths.npy"
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its of on or "
+    "that the this to use using what when where which with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased word tokens. Identifiers are indexed whole and by their parts, so
+    "perform_rpc" matches "perform_rpc" and "perform rpc", and
+    "BackgroundAudioPlayer" matches "background audio player".
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in STOPWORDS:
+            tokens.append(lower)
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    def __init__(
+        self,
+        ids: list[str],
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self._ids = ids
+        self._vocabulary = vocabulary
+        self._offsets = offsets
+        self._postings = postings
+        self._tfs = tfs
+        self._lengths = lengths
+        self._k1 = k1
+        self._b = b
+        self._avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, paragraphs: dict[str, str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Index paragraphs (id -> text)"""
+        ids = list(paragraphs)
+        term_postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = np.zeros(len(ids), dtype=np.float32)
+        for doc, text in enumerate(paragraphs.values()):
+            counts = Counter(tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_postings.setdefault(term, []).append((doc, tf))
+
+        vocabulary = {term: i for i, term in enumerate(sorted(term_postings))}
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for term, i in vocabulary.items():
+            offsets[i + 1] = len(term_postings[term])
+        offsets = np.cumsum(offsets)
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.float32)
+        for term, i in vocabulary.items():
+            entries = term_postings[term]
+            postings[offsets[i]:offsets[i + 1]] = [doc for doc, _ in entries]
+            tfs[offsets[i]:offsets[i + 1]] = [tf for _, tf in entries]
+        return cls(ids, vocabulary, offsets, postings, tfs, lengths, k1, b)
+
+    def save(self, path: Union[str, Path]) -> None:
+        p = Path(path)
+        p.mkdir(parents=True, exist_ok=True)
+        np.save(p / OFFSETS_FILE, self._offsets)
+        np.save(p / POSTINGS_FILE, self._postings)
+        np.save(p / TFS_FILE, self._tfs)
+        np.save(p / LENGTHS_FILE, self._lengths)
+        # Written last, so an index with a header is always complete
+        with open(p / HEADER_FILE, "w") as f:
+            json.dump({"k1": self._k1, "b": self._b, "vocabulary": self._vocabulary, "ids": self._ids}, f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "BM25Index":
+        p = Path(path)
+        with open(p / HEADER_FILE) as f:
+            header = json.load(f)
+        return cls(
+            header["ids"],
+            header["vocabulary"],
+            np.load(p / OFFSETS_FILE, mmap_mode="r"),
+            np.load(p / POSTINGS_FILE, mmap_mode="r"),
+            np.load(p / TFS_FILE, mmap_mode="r"),
+            np.load(p / LENGTHS_FILE, mmap_mode="r"),
+            header["k1"],
+            header["b"],
+        )
+
+    @staticmethod
+    def exists(path: Union[str, Path]) -> bool:
+        return (Path(path) / HEADER_FILE).exists()
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    def query(self, text: str, n: int) -> list[tuple[str, float]]:
+        """The n best-scoring paragraph ids with their BM25 scores, best first"""
+        if not self._ids or n <= 0:
+            return []
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        norm = self._k1 * (1.0 - self._b + self._b * np.asarray(self._lengths) / max(self._avg_length, 1e-9))
+        for term, query_tf in Counter(tokenize(text)).items():
+            i = self._vocabulary.get(term)
+            if i is None:
+                continue
+            start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+            docs = np.asarray(self._postings[start:end])
+            tf = np.asarray(self._tfs[start:end])
+            df = end - start
+            idf = np.log(1.0 + (len(self._ids) - df + 0.5) / (df + 0.5))
+            scores[docs] += query_tf * idf * tf * (self._k1 + 1.0) / (tf + norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        n = min(n, len(matched))
+        top = matched[np.argpartition(-scores[matched], n - 1)[:n]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in top]
@@ -7,8 +7,10 @@ tags: [annoy_index, vector_search, embeddings, livekit_docs, deduplication]
 difficulty: advanced
 description: RAG-enabled agent with vector search for LiveKit documentation
 demonstrates:
-  - Annoy vector index loading and querying
+  - Memory-mapped vector index loading and querying
   - OpenAI embeddings for semantic search
+  - Worker-wide query embedding cache with speculative embedding of the user transcript
+  - Hybrid BM25 + vector retrieval with reciprocal-rank fusion
   - Result deduplication with seen tracking
   - Function tool for document search
   - Paragraph-based context retrieval
@@ -30,13 +32,11 @@ Before running this agent:
 import logging
 import pickle
 from pathlib import Path
-from typing import Literal, Any
-from collections.abc import Iterable
-from dataclasses import dataclass
 from dotenv import load_dotenv
-import annoy
 
 from livekit.agents import (
+    ChatContext,
+    ChatMessage,
     JobContext,
     WorkerOptions,
     cli,
@@ -49,6 +49,11 @@ from livekit.agents import (
 from livekit.plugins import openai, silero, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.english import EnglishModel
 
+from hybrid_retriever import HybridRetriever
+from lexical_index import BM25Index
+from query_embeddings import SpeculativeEmbedder, shared_query_cache
+from vector_store import load_index
+
 # Load environment variables
 load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
 
@@ -58,73 +63,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("rag-agent")
 
-# RAG Index Types and Classes
-Metric = Literal["angular", "euclidean", "manhattan", "hamming", "dot"]
-ANNOY_FILE = "index.annoy"
-METADATA_FILE = "metadata.pkl"
-
-
-@dataclass
-class _FileData:
-    f: int
-    metric: Metric
-    userdata: dict[int, Any]
-
-
-@dataclass
-class Item:
-    i: int
-    userdata: Any
-    vector: list[float]
-
-
-@dataclass
-class QueryResult:
-    userdata: Any
-    distance: float
-
-
-class AnnoyIndex:
-    def __init__(self, index: annoy.AnnoyIndex, filedata: _FileData) -> None:
-        self._index = index
-        self._filedata = filedata
-
-    @classmethod
-    def load(cls, path: str) -> "AnnoyIndex":
-        p = Path(path)
-        index_path = p / ANNOY_FILE
-        metadata_path = p / METADATA_FILE
-
-        with open(metadata_path, "rb") as f:
-            metadata: _FileData = pickle.load(f)
-
-        index = annoy.AnnoyIndex(metadata.f, metadata.metric)
-        index.load(str(index_path))
-        return cls(index, metadata)
-
-    @property
-    def size(self) -> int:
-        return self._index.get_n_items()
-
-    def items(self) -> Iterable[Item]:
-        for i in range(self._index.get_n_items()):
-            item = Item(
-                i=i,
-                userdata=self._filedata.userdata[i],
-                vector=self._index.get_item_vector(i),
-            )
-            yield item
-
-    def query(
-        self, vector: list[float], n: int, search_k: int = -1
-    ) -> list[QueryResult]:
-        ids = self._index.get_nns_by_vector(
-            vector, n, search_k=search_k, include_distances=True
-        )
-        return [
-            QueryResult(userdata=self._filedata.userdata[i], distance=distance)
-            for i, distance in zip(*ids)
-        ]
+# Paragraphs returned per docs lookup, and the vector distance beyond which hits are ignored
+RAG_TOP_K = 2
+RAG_MAX_DISTANCE = None
 
 
 class RAGEnrichedAgent(Agent):
@@ -159,9 +100,15 @@ class RAGEnrichedAgent(Agent):
         self._embeddings_dimension = 1536
         self._embeddings_model = "text-embedding-3-small"
         self._seen_results = set()  # Track previously seen results
+        # Query embeddings are cached for the whole worker; the transcript is embedded speculatively
+        self._embedder = SpeculativeEmbedder(
+            shared_query_cache(self._embeddings_model, self._embeddings_dimension)
+        )
 
         try:
-            self._annoy_index = AnnoyIndex.load(str(self._index_path))
+            self._vector_index = load_index(self._index_path)
+            lexical_index = BM25Index.load(self._index_path) if BM25Index.exists(self._index_path) else None
+            self._retriever = HybridRetriever(self._vector_index, lexical_index)
             with open(self._data_path, "rb") as f:
                 self._paragraphs_by_uuid = pickle.load(f)
             logger.info("RAG database loaded successfully.")
@@ -172,36 +119,28 @@ class RAGEnrichedAgent(Agent):
     async def livekit_docs_search(self, context: RunContext, query: str):
         """Lookup information in the LiveKit docs database. Will not return results already returned in previous lookups."""
         try:
-            # Generate embeddings for the query
-            query_embedding = await openai.create_embeddings(
-                input=[query],
-                model=self._embeddings_model,
-                dimensions=self._embeddings_dimension,
+            # Cached per worker, or already in flight when the query is the user's own words
+            query_embedding = await self._embedder.embed(query)
+
+            # Fuse lexical and vector hits, skipping results already returned
+            new_results = self._retriever.search(
+                query,
+                query_embedding,
+                top_k=RAG_TOP_K,
+                max_distance=RAG_MAX_DISTANCE,
+                exclude=self._seen_results,
             )
 
-            # Query the index for more results than we need to ensure we have enough new content
-            all_results = self._annoy_index.query(
-                query_embedding[0].embedding, n=5
-            )  # Get more results initially
-
-            # Filter out previously seen results
-            new_results = [
-                r for r in all_results if r.userdata not in self._seen_results
-            ]
-
-            # If we don't have enough new results, clear the seen results and start fresh
             if len(new_results) == 0:
                 return "No new results found."
-            else:
-                new_results = new_results[:2]  # Take top 2 new results
 
             # Build context from multiple relevant paragraphs
             context_parts = []
             for result in new_results:
                 # Add result to seen set
-                self._seen_results.add(result.userdata)
+                self._seen_results.add(result.id)
 
-                paragraph = self._paragraphs_by_uuid.get(result.userdata, "")
+                paragraph = self._paragraphs_by_uuid.get(result.id, "")
                 if paragraph:
                     # Extract source URL if available in the paragraph
                     source = "Unknown source"
@@ -224,6 +163,11 @@ class RAGEnrichedAgent(Agent):
         except Exception as e:
             return "Could not find any relevant information for that query."
 
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage) -> None:
+        """Embed the finished user turn while the LLM decides whether to search the docs."""
+        if new_message.text_content:
+            self._embedder.on_turn_completed(new_message.text_content)
+
     async def on_enter(self):
         """Called when the agent enters the session."""
         self.session.generate_reply(
@@ -0,0 +1,162 @@
+"""
+Query embedding cache and speculative embedding for the RAG agents.
+
+QueryEmbeddingCache is an LRU of query embeddings keyed by the normalized query
+text (the text embedded is the first caller's, as it was given) and shared by every session in the worker process (see shared_query_cache;
+with the default process-per-job executor that is one session, with
+job_executor_type=THREAD it is all of them). Concurrent requests for the same
+query share one embeddings call.
+
+SpeculativeEmbedder is per session: once the user's turn is complete it starts
+embedding the transcript while the LLM is still deciding what to do. When the
+LLM then calls the docs tool with the transcript itself as the query (same
+normalized text), the tool joins that request, which is usually done by then,
+instead of making another round trip. Any other query is embedded as it is, so
+speculation never changes what is retrieved.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from livekit.plugins import openai
+
+logger = logging.getLogger("rag-query-embeddings")
+
+DEFAULT_MAX_ENTRIES = 1024
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.,;:!?\"'"
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case, surrounding punctuation and spacing don't change the embedding much"""
+    return _WHITESPACE_RE.sub(" ", text.strip(_EDGE_PUNCTUATION).lower())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, model: str, dimensions: int, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._model = model
+        self._dimensions = dimensions
+        self._max_entries = max_entries
+        # Finished embeddings are plain lists, safe to share between job threads
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # In-flight requests belong to the event loop that started them
+        self._inflight: dict[tuple[int, str], asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    def get(self, text: str) -> Optional[list[float]]:
+        """The cached embedding, without waiting or calling the API"""
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def prefetch(self, text: str) -> None:
+        """Start embedding text in the background if it isn't cached or in flight"""
+        key = normalize_query(text)
+        if key:
+            # Nobody awaits a prefetch: read its outcome so a failure is logged, not left unretrieved
+            self._task(key, text).add_done_callback(self._log_prefetch_failure)
+
+    @staticmethod
+    def _log_prefetch_failure(future: "asyncio.Future[list[float]]") -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Speculative query embedding failed: {future.exception()}")
+
+    async def embed(self, text: str) -> list[float]:
+        key = normalize_query(text)
+        vector = self.get(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+        return await self._task(key, text, count=True)
+
+    def _task(self, key: str, text: str, count: bool = False) -> "asyncio.Future[list[float]]":
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        task = self._inflight.get(inflight_key)
+        if task is not None:
+            if count:
+                self.joined += 1
+            # shield: a cancelled tool call must not cancel a request others are waiting on
+            return asyncio.shield(task)
+        if count:
+            self.misses += 1
+        task = loop.create_task(self._fetch(key, text))
+        self._inflight[inflight_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        return asyncio.shield(task)
+
+    async def _fetch(self, key: str, text: str) -> list[float]:
+        # The normalized key only decides what is shared; the API gets the text as it was asked
+        results = await openai.create_embeddings(
+            input=[text], model=self._model, dimensions=self._dimensions
+        )
+        vector = results[0].embedding
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses + self.joined
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "joined_in_flight": self.joined,
+            "hit_rate": (self.hits + self.joined) / lookups if lookups else 0.0,
+        }
+
+
+_shared_caches: dict[tuple[str, int], QueryEmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_query_cache(model: str, dimensions: int, max_entries: int = DEFAULT_MAX_ENTRIES) -> QueryEmbeddingCache:
+    """The worker-wide cache for this embeddings model"""
+    with _shared_lock:
+        cache = _shared_caches.get((model, dimensions))
+        if cache is None:
+            cache = _shared_caches[(model, dimensions)] = QueryEmbeddingCache(model, dimensions, max_entries)
+        return cache
+
+
+class SpeculativeEmbedder:
+    def __init__(self, cache: QueryEmbeddingCache) -> None:
+        """
+        Args:
+            cache: Shared query cache the speculative embeddings go into
+        """
+        self._cache = cache
+        self._transcript = ""
+
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+
+    def on_turn_completed(self, text: str) -> None:
+        """The user's turn is over; text is the full transcript the LLM will answer"""
+        self._transcript = normalize_query(text)
+        if self._transcript:
+            self._cache.prefetch(text)
+
+    async def embed(self, query: str) -> list[float]:
+        """Embedding for a tool query; joins the speculative request when the query is the transcript"""
+        if self._transcript:
+            if normalize_query(query) == self._transcript:
+                self.speculative_hits += 1
+            else:
+                self.speculative_misses += 1
+        return await self._cache.embed(query)
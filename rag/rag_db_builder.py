@@ -6,125 +6,41 @@ tags: [annoy_index, sentence_chunking, embeddings_generation, vector_database]
 difficulty: advanced
 description: Builds vector databases for RAG from text documents
 demonstrates:
-  - Annoy index construction and saving
-  - Text chunking with SentenceChunker
-  - OpenAI embeddings generation
+  - Vector index construction with pluggable backends
+  - Linear-time text chunking with SentenceChunker, by characters or tokens, in a process pool
+  - Batched, concurrent OpenAI embeddings generation
   - Progress tracking with tqdm
   - Content cleaning and filtering
-  - UUID-based paragraph storage
+  - BM25 lexical index built alongside the vector index
+  - Content-addressed paragraph storage with an embedding cache
   - Factory pattern for builder creation
 ---
 """
 
+import asyncio
+import functools
 import pickle
-import uuid
 import logging
-from pathlib import Path
-from typing import List, Optional, Union, Literal, Callable, Any
-from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union, Callable
 import aiohttp
 from tqdm import tqdm
-import annoy
 
 from livekit.agents import tokenize
-from livekit.plugins import openai
-
-logger = logging.getLogger("rag-builder")
-
-# RAG Index Types and Classes
-Metric = Literal["angular", "euclidean", "manhattan", "hamming", "dot"]
-ANNOY_FILE = "index.annoy"
-METADATA_FILE = "metadata.pkl"
 
+from embedding_cache import EmbeddingCache, chunk_id, content_hash
+from embeddings_client import DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_TOKENS, EmbeddingsClient, token_counter
+from lexical_index import BM25Index
+from vector_store import DEFAULT_BACKEND, IndexBuilder
 
-@dataclass
-class _FileData:
-    f: int
-    metric: Metric
-    userdata: dict[int, Any]
-
-
-@dataclass
-class Item:
-    i: int
-    userdata: Any
-    vector: list[float]
-
-
-@dataclass
-class QueryResult:
-    userdata: Any
-    distance: float
-
-
-class AnnoyIndex:
-    def __init__(self, index: annoy.AnnoyIndex, filedata: _FileData) -> None:
-        self._index = index
-        self._filedata = filedata
-
-    @classmethod
-    def load(cls, path: str) -> "AnnoyIndex":
-        p = Path(path)
-        index_path = p / ANNOY_FILE
-        metadata_path = p / METADATA_FILE
-
-        with open(metadata_path, "rb") as f:
-            metadata: _FileData = pickle.load(f)
-
-        index = annoy.AnnoyIndex(metadata.f, metadata.metric)
-        index.load(str(index_path))
-        return cls(index, metadata)
-
-    @property
-    def size(self) -> int:
-        return self._index.get_n_items()
-
-    def items(self) -> Iterable[Item]:
-        for i in range(self._index.get_n_items()):
-            item = Item(
-                i=i,
-                userdata=self._filedata.userdata[i],
-                vector=self._index.get_item_vector(i),
-            )
-            yield item
-
-    def query(
-        self, vector: list[float], n: int, search_k: int = -1
-    ) -> list[QueryResult]:
-        ids = self._index.get_nns_by_vector(
-            vector, n, search_k=search_k, include_distances=True
-        )
-        return [
-            QueryResult(userdata=self._filedata.userdata[i], distance=distance)
-            for i, distance in zip(*ids)
-        ]
-
-
-class IndexBuilder:
-    def __init__(self, f: int, metric: Metric) -> None:
-        self._index = annoy.AnnoyIndex(f, metric)
-        self._filedata = _FileData(f=f, metric=metric, userdata={})
-        self._i = 0
-
-    def save(self, path: str) -> None:
-        p = Path(path)
-        p.mkdir(parents=True, exist_ok=True)
-        index_path = p / ANNOY_FILE
-        metadata_path = p / METADATA_FILE
-        self._index.save(str(index_path))
-        with open(metadata_path, "wb") as f:
-            pickle.dump(self._filedata, f)
-
-    def build(self, trees: int = 50, jobs: int = -1) -> AnnoyIndex:
-        # n_jobs=-1 means use all available cores
-        self._index.build(n_trees=trees, n_jobs=jobs)
-        return AnnoyIndex(self._index, self._filedata)
+logger = logging.getLogger("rag-builder")
 
-    def add_item(self, vector: list[float], userdata: Any) -> None:
-        self._index.add_item(self._i, vector)
-        self._filedata.userdata[self._i] = userdata
-        self._i += 1
+# Separator cost between words when counting tokens: BPE merges the space into the next word
+TOKEN_SEPARATOR_LENGTH = 0
+# Paragraph text per process-pool task when chunking in parallel
+CHUNK_TASK_CHARS = 1_000_000
 
 
 class SentenceChunker:
@@ -133,63 +49,138 @@ class SentenceChunker:
         *,
         max_chunk_size: int = 120,
         chunk_overlap: int = 30,
+        length_unit: str = "chars",
         paragraph_tokenizer: Callable[
             [str], list[str]
         ] = tokenize.basic.tokenize_paragraphs,
         sentence_tokenizer: tokenize.SentenceTokenizer = tokenize.basic.SentenceTokenizer(),  # noqa: B008
-        word_tokenizer: tokenize.WordTokenizer = tokenize.basic.WordTokenizer(  # noqa: B008
-            ignore_punctuation=False
-        ),
+        word_tokenizer: Optional[tokenize.WordTokenizer] = None,
     ) -> None:
+        """
+        Splits text into chunks of at most max_chunk_size, each starting with up to
+        chunk_overlap of the previous chunk; the overlap counts toward max_chunk_size.
+        Chunks never span paragraphs, and only a single word longer than
+        max_chunk_size makes a longer chunk.
+
+        Args:
+            max_chunk_size: Chunk size limit, in length_unit
+            chunk_overlap: Overlap limit, in length_unit
+            length_unit: "chars", or "tokens" to size chunks against the embedding
+                model's input limit (counted with tiktoken when installed, else estimated)
+            paragraph_tokenizer: Splits text into paragraphs
+            sentence_tokenizer: Splits paragraphs into sentences
+            word_tokenizer: Splits sentences into words; None splits on whitespace,
+                like tokenize.basic.WordTokenizer(ignore_punctuation=False) but faster.
+                Its format_words must join words with a fixed separator.
+        """
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown length unit {length_unit!r}, expected 'chars' or 'tokens'")
         self._max_chunk_size = max_chunk_size
         self._chunk_overlap = chunk_overlap
+        self._length_unit = length_unit
         self._paragraph_tokenizer = paragraph_tokenizer
         self._sentence_tokenizer = sentence_tokenizer
         self._word_tokenizer = word_tokenizer
+        self._count_tokens: Optional[Callable[[str], int]] = None
+
+    def __getstate__(self) -> dict:
+        # The token counter is rebuilt in each worker process rather than pickled
+        state = self.__dict__.copy()
+        state["_count_tokens"] = None
+        return state
+
+    def _words(self, paragraph: str) -> list[str]:
+        words = []
+        for sentence in self._sentence_tokenizer.tokenize(text=paragraph):
+            if self._word_tokenizer is None:
+                words.extend(sentence.split())
+            else:
+                words.extend(self._word_tokenizer.tokenize(text=sentence))
+        return words
+
+    def _format(self, words: list[str]) -> str:
+        if self._word_tokenizer is None:
+            return " ".join(words)
+        return self._word_tokenizer.format_words(words)
+
+    def _sizes(self, words: list[str]) -> tuple[list[int], int]:
+        """Size of every word in length_unit, and the size of the separator between two words"""
+        if self._length_unit == "tokens":
+            if self._count_tokens is None:
+                self._count_tokens = functools.lru_cache(maxsize=1 << 16)(token_counter())
+            return [self._count_tokens(word) for word in words], TOKEN_SEPARATOR_LENGTH
+        return [len(word) for word in words], len(self._format(["", ""]))
+
+    def _overlap(self, sizes: list[int], sep: int, start: int, end: int, limit: int) -> tuple[int, int]:
+        """Start and formatted size of the longest suffix of words[start:end] that fits in limit"""
+        length = 0
+        while end > start:
+            extended = length + sizes[end - 1] + (sep if length else 0)
+            if extended > limit:
+                break
+            length, end = extended, end - 1
+        return end, length
+
+    def _chunk_paragraphs(self, paragraphs: list[str]) -> list[str]:
+        chunks = []
+        for paragraph in paragraphs:
+            words = self._words(paragraph)
+            sizes, sep = self._sizes(words)
+
+            # The current chunk is words[chunk_start:i] with formatted size chunk_len: the
+            # overlap, words[chunk_start:buf_start], then its own words from buf_start on
+            chunk_start = buf_start = 0
+            chunk_len = 0
+
+            for i, size in enumerate(sizes):
+                if buf_start < i and chunk_len + sep + size > self._max_chunk_size:
+                    chunks.append(self._format(words[chunk_start:i]))
+                    # The overlap counts toward the next chunk's size, which has room for at least word i
+                    limit = min(self._chunk_overlap, self._max_chunk_size - sep - size)
+                    chunk_start, chunk_len = self._overlap(sizes, sep, buf_start, i, limit)
+                    buf_start = i
+                chunk_len = chunk_len + sep + size if chunk_start < i else size
+
+            if buf_start < len(words):
+                chunks.append(self._format(words[chunk_start:]))
+
+        return chunks
 
     def chunk(self, *, text: str) -> list[str]:
-        chunks = []
+        return self._chunk_paragraphs(self._paragraph_tokenizer(text))
 
-        buf_words: list[str] = []
-        for paragraph in self._paragraph_tokenizer(text):
-            last_buf_words: list[str] = []
+    def chunk_many(self, texts: list[str], processes: Optional[int] = None) -> list[str]:
+        """
+        Chunk several texts, in order, in a pool of processes. Work is split at
+        paragraph boundaries, so even one large text is spread over the pool and
+        the result is the same as chunking serially.
 
-            for sentence in self._sentence_tokenizer.tokenize(text=paragraph):
-                for word in self._word_tokenizer.tokenize(text=sentence):
-                    reconstructed = self._word_tokenizer.format_words(
-                        buf_words + [word]
-                    )
+        Args:
+            texts: Texts to chunk
+            processes: Worker processes; None uses every CPU, 1 chunks in this process
+        """
+        paragraphs = [p for text in texts for p in self._paragraph_tokenizer(text)]
+        tasks: list[list[str]] = [[]]
+        task_chars = 0
+        for paragraph in paragraphs:
+            if task_chars >= CHUNK_TASK_CHARS:
+                tasks.append([])
+                task_chars = 0
+            tasks[-1].append(paragraph)
+            task_chars += len(paragraph)
+
+        if processes == 1 or len(tasks) == 1:
+            return self._chunk_paragraphs(paragraphs)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return [chunk for chunks in pool.map(self._chunk_paragraphs, tasks) for chunk in chunks]
 
-                    if len(reconstructed) > self._max_chunk_size:
-                        while (
-                            len(self._word_tokenizer.format_words(last_buf_words))
-                            > self._chunk_overlap
-                        ):
-                            last_buf_words = last_buf_words[1:]
-
-                        new_chunk = self._word_tokenizer.format_words(
-                            last_buf_words + buf_words
-                        )
-                        chunks.append(new_chunk)
-                        last_buf_words = buf_words
-                        buf_words = []
-
-                    buf_words.append(word)
-
-            if buf_words:
-                while (
-                    len(self._word_tokenizer.format_words(last_buf_words))
-                    > self._chunk_overlap
-                ):
-                    last_buf_words = last_buf_words[1:]
-
-                new_chunk = self._word_tokenizer.format_words(
-                    last_buf_words + buf_words
-                )
-                chunks.append(new_chunk)
-                buf_words = []
 
-        return chunks
+@dataclass
+class BuildStats:
+    chunks: int
+    reused: int
+    embedded: int
+    pruned: int = 0
 
 
 class RAGBuilder:
@@ -222,22 +213,55 @@ class RAGBuilder:
         embeddings_dimension: int = 1536,
         embeddings_model: str = "text-embedding-3-small",
         metric: str = "angular",
+        backends: tuple[str, ...] = (DEFAULT_BACKEND,),
+        embeddings_batch_size: int = DEFAULT_BATCH_SIZE,
+        embeddings_max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        embeddings_concurrency: int = 4,
+        embeddings_base_url: Optional[str] = None,
+        embeddings_cache_path: Optional[Union[str, Path]] = None,
+        lexical_index: bool = True,
+        chunker: Optional[SentenceChunker] = None,
+        chunk_processes: Optional[int] = None,
     ):
         """
         Initialize the RAG builder.
 
         Args:
-            index_path: Path where the Annoy index will be saved
+            index_path: Directory where the vector store will be saved
             data_path: Path where the paragraph data will be saved
             embeddings_dimension: Dimension of embeddings to use
             embeddings_model: OpenAI model to use for embeddings
-            metric: Distance metric for Annoy index ("angular", "euclidean", or "manhattan")
+            metric: Distance metric for the index ("angular", "euclidean", "manhattan" or "dot")
+            backends: Vector store backends to build ("annoy", "exact", "hnsw");
+                the first one is what RAGHandler loads by default
+            embeddings_batch_size: Maximum paragraphs per embeddings request
+            embeddings_max_batch_tokens: Maximum estimated tokens per embeddings request
+            embeddings_concurrency: Maximum embeddings requests in flight
+            embeddings_base_url: OpenAI-compatible API base URL (defaults to OPENAI_BASE_URL,
+                then the OpenAI API)
+            embeddings_cache_path: SQLite file caching embeddings by content hash across
+                builds, pruned to the chunks of the last successful build; None disables
+                the cache
+            lexical_index: Also build a BM25 index (in index_path) for hybrid retrieval
+            chunker: Split paragraphs into bounded chunks before embedding (e.g.
+                SentenceChunker(length_unit="tokens", max_chunk_size=512)); None keeps
+                paragraphs whole
+            chunk_processes: Processes for chunking; None uses every CPU
         """
         self._index_path = Path(index_path)
         self._data_path = Path(data_path)
         self._embeddings_dimension = embeddings_dimension
         self._embeddings_model = embeddings_model
         self._metric = metric
+        self._backends = backends
+        self._embeddings_batch_size = embeddings_batch_size
+        self._embeddings_max_batch_tokens = embeddings_max_batch_tokens
+        self._embeddings_concurrency = embeddings_concurrency
+        self._embeddings_base_url = embeddings_base_url
+        self._embeddings_cache_path = Path(embeddings_cache_path) if embeddings_cache_path else None
+        self._lexical_index = lexical_index
+        self._chunker = chunker
+        self._chunk_processes = chunk_processes
 
     def _clean_content(self, text: str) -> str:
         """
@@ -272,21 +296,9 @@ class RAGBuilder:
             
         return '\n'.join(cleaned_lines)
 
-    async def _create_embeddings(
-        self, text: str, http_session: Optional[aiohttp.ClientSession] = None
-    ) -> openai.EmbeddingData:
-        """Create embeddings for a single text."""
-        results = await openai.create_embeddings(
-            input=[text],
-            model=self._embeddings_model,
-            dimensions=self._embeddings_dimension,
-            http_session=http_session,
-        )
-        return results[0]
-
     async def build_from_texts(
-        self, texts: List[str], show_progress: bool = True
-    ) -> None:
+        self, texts: List[str], show_progress: bool = True, incremental: bool = True
+    ) -> BuildStats:
         """
         Build the RAG database from a list of texts.
         Each text will be treated as a separate paragraph/document.
@@ -294,6 +306,11 @@ class RAGBuilder:
         Args:
             texts: List of text strings to process
             show_progress: Whether to show a progress bar
+            incremental: Reuse cached embeddings for unchanged paragraphs (needs
+                embeddings_cache_path); with False every paragraph is re-embedded
+
+        Returns:
+            How many paragraphs were indexed, reused from the cache and newly embedded
         """
         # Create parent directories if they don't exist
         self._index_path.parent.mkdir(parents=True, exist_ok=True)
@@ -301,7 +318,7 @@ class RAGBuilder:
 
         async with aiohttp.ClientSession() as http_session:
             idx_builder = IndexBuilder(
-                f=self._embeddings_dimension, metric=self._metric
+                f=self._embeddings_dimension, metric=self._metric, backends=self._backends
             )
 
             # Clean and filter texts
@@ -311,32 +328,95 @@ class RAGBuilder:
                 if cleaned:  # Only include non-empty cleaned texts
                     cleaned_texts.append(cleaned)
 
-            # Generate UUIDs for each paragraph
-            paragraphs_by_uuid = {str(uuid.uuid4()): text for text in cleaned_texts}
-
-            # Create iterator with optional progress bar
-            items = paragraphs_by_uuid.items()
-            if show_progress:
-                items = tqdm(items, desc="Creating embeddings")
+            # Chunk after cleaning: the cleaner works line by line, chunks are joined on spaces
+            if self._chunker is not None:
+                cleaned_texts = await asyncio.to_thread(
+                    self._chunker.chunk_many, cleaned_texts, self._chunk_processes
+                )
+                logger.info(f"Chunked into {len(cleaned_texts)} chunks")
+
+            # Content-derived IDs stay stable across rebuilds (and collapse duplicate paragraphs)
+            paragraphs_by_uuid = {chunk_id(text): text for text in cleaned_texts}
+            hashes = {p_id: content_hash(text) for p_id, text in paragraphs_by_uuid.items()}
+
+            cache = EmbeddingCache(self._embeddings_cache_path) if self._embeddings_cache_path else None
+            try:
+                cached = {}
+                if cache is not None and incremental:
+                    cached = cache.get_many(
+                        self._embeddings_model, self._embeddings_dimension, hashes.values()
+                    )
+                missing_ids = [p_id for p_id, digest in hashes.items() if digest not in cached]
+                logger.info(
+                    f"{len(paragraphs_by_uuid)} paragraphs: reusing {len(paragraphs_by_uuid) - len(missing_ids)} "
+                    f"cached embeddings, embedding {len(missing_ids)}"
+                )
 
-            # Generate embeddings and add to index
-            for p_uuid, paragraph in items:
-                resp = await self._create_embeddings(paragraph, http_session)
-                idx_builder.add_item(resp.embedding, p_uuid)
+                # Generate embeddings in batches, several requests at a time
+                client = EmbeddingsClient(
+                    http_session,
+                    model=self._embeddings_model,
+                    dimensions=self._embeddings_dimension,
+                    base_url=self._embeddings_base_url,
+                    batch_size=self._embeddings_batch_size,
+                    max_batch_tokens=self._embeddings_max_batch_tokens,
+                    concurrency=self._embeddings_concurrency,
+                )
+                progress = tqdm(total=len(missing_ids), desc="Creating embeddings") if show_progress else None
+                try:
+                    embeddings = await client.embed(
+                        [paragraphs_by_uuid[p_id] for p_id in missing_ids],
+                        on_batch_done=progress.update if progress else None,
+                    )
+                finally:
+                    if progress:
+                        progress.close()
+                logger.info(f"Created {len(embeddings)} embeddings in {client.requests} requests ({client.retries} retries)")
+
+                new_embeddings = {hashes[p_id]: embedding for p_id, embedding in zip(missing_ids, embeddings)}
+                if cache is not None:
+                    cache.put_many(self._embeddings_model, self._embeddings_dimension, new_embeddings)
+            finally:
+                if cache is not None:
+                    cache.close()
+
+            # Add to the index in paragraph order
+            for p_id, digest in hashes.items():
+                idx_builder.add_item(cached[digest] if digest in cached else new_embeddings[digest], p_id)
 
             # Build and save the index
             logger.info(f"Building index at {self._index_path}")
-            idx_builder.build()
-            idx_builder.save(str(self._index_path))
+            idx_builder.build(self._index_path)
+            if self._lexical_index:
+                logger.info(f"Building BM25 index at {self._index_path}")
+                BM25Index.build(paragraphs_by_uuid).save(self._index_path)
 
             # Save paragraph data
             logger.info(f"Saving paragraph data to {self._data_path}")
             with open(self._data_path, "wb") as f:
                 pickle.dump(paragraphs_by_uuid, f)
 
+        # Only once the build is saved: drop the embeddings of chunks that are gone, so the
+        # cache tracks the corpus instead of growing with every re-scrape
+        pruned = 0
+        if self._embeddings_cache_path:
+            cache = EmbeddingCache(self._embeddings_cache_path)
+            try:
+                pruned = cache.prune(self._embeddings_model, self._embeddings_dimension, hashes.values())
+            finally:
+                cache.close()
+            logger.info(f"Pruned {pruned} cached embeddings of chunks no longer in the corpus")
+
+        return BuildStats(
+            chunks=len(paragraphs_by_uuid),
+            reused=len(paragraphs_by_uuid) - len(missing_ids),
+            embedded=len(missing_ids),
+            pruned=pruned,
+        )
+
     async def build_from_file(
-        self, file_path: Union[str, Path], show_progress: bool = True
-    ) -> None:
+        self, file_path: Union[str, Path], show_progress: bool = True, incremental: bool = True
+    ) -> BuildStats:
         """
         Build the RAG database from a text file.
         The file will be split into paragraphs using basic tokenization.
@@ -344,6 +424,10 @@ class RAGBuilder:
         Args:
             file_path: Path to the text file to process
             show_progress: Whether to show a progress bar
+            incremental: Reuse cached embeddings for unchanged paragraphs
+
+        Returns:
+            How many paragraphs were indexed, reused from the cache and newly embedded
         """
         file_path = Path(file_path)
         if not file_path.exists():
@@ -354,7 +438,39 @@ class RAGBuilder:
             raw_data = f.read()
 
         paragraphs = tokenize.basic.tokenize_paragraphs(raw_data)
-        await self.build_from_texts(paragraphs, show_progress)
+        return await self.build_from_texts(paragraphs, show_progress, incremental)
+
+    async def build_from_directory(
+        self,
+        pages_dir: Union[str, Path],
+        pattern: str = "*.txt",
+        show_progress: bool = True,
+        incremental: bool = True,
+    ) -> BuildStats:
+        """
+        Build the RAG database from a directory of per-page text files, as written
+        by scrape_docs.py. Paragraphs of pages that didn't change since the last
+        build hit the embedding cache, so only changed pages are re-embedded.
+
+        Args:
+            pages_dir: Directory containing the page files
+            pattern: Glob for the page files
+            show_progress: Whether to show a progress bar
+            incremental: Reuse cached embeddings for unchanged paragraphs
+
+        Returns:
+            How many paragraphs were indexed, reused from the cache and newly embedded
+        """
+        pages_dir = Path(pages_dir)
+        files = sorted(pages_dir.glob(pattern))
+        if not files:
+            raise FileNotFoundError(f"No {pattern} files in {pages_dir}")
+
+        paragraphs = []
+        for page_file in files:
+            paragraphs.extend(tokenize.basic.tokenize_paragraphs(page_file.read_text()))
+        logger.info(f"Read {len(paragraphs)} paragraphs from {len(files)} pages in {pages_dir}")
+        return await self.build_from_texts(paragraphs, show_progress, incremental)
 
     @classmethod
     async def create_from_file(
@@ -369,7 +485,7 @@ class RAGBuilder:
 
         Args:
             file_path: Path to the input text file
-            index_path: Path where the Annoy index will be saved
+            index_path: Directory where the vector store will be saved
             data_path: Path where the paragraph data will be saved
             **kwargs: Additional arguments to pass to RAGBuilder constructor
 
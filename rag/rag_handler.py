@@ -7,7 +7,8 @@ difficulty: advanced
 description: Reusable RAG handler with thinking styles and agent integration
 demonstrates:
   - Three thinking styles (none, message, llm)
-  - RAG context retrieval and enrichment
+  - Hybrid BM25 + vector context retrieval and enrichment
+  - Cached and speculative query embeddings
   - Agent method injection pattern
   - Function tool registration
   - Flexible thinking phase handling
@@ -20,77 +21,17 @@ import pickle
 import random
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Union, Any, Literal
-from collections.abc import Iterable
-from dataclasses import dataclass
-
-import annoy
+from typing import List, Optional, Union
 
 from livekit.agents.voice import Agent, RunContext
 from livekit.agents.llm import function_tool
-from livekit.plugins import openai
-
-logger = logging.getLogger("rag-handler")
-
-# RAG Index Types and Classes
-Metric = Literal["angular", "euclidean", "manhattan", "hamming", "dot"]
-ANNOY_FILE = "index.annoy"
-METADATA_FILE = "metadata.pkl"
-
-@dataclass
-class Item:
-    i: int
-    userdata: Any
-    vector: list[float]
-
-@dataclass
-class _FileData:
-    f: int
-    metric: Metric
-    userdata: dict[int, Any]
-
-@dataclass
-class QueryResult:
-    userdata: Any
-    distance: float
-
-class AnnoyIndex:
-    def __init__(self, index: annoy.AnnoyIndex, filedata: _FileData) -> None:
-        self._index = index
-        self._filedata = filedata
-
-    @classmethod
-    def load(cls, path: str) -> "AnnoyIndex":
-        p = Path(path)
-        index_path = p / ANNOY_FILE
-        metadata_path = p / METADATA_FILE
-
-        with open(metadata_path, "rb") as f:
-            metadata: _FileData = pickle.load(f)
-
-        index = annoy.AnnoyIndex(metadata.f, metadata.metric)
-        index.load(str(index_path))
-        return cls(index, metadata)
 
-    @property
-    def size(self) -> int:
-        return self._index.get_n_items()
+from hybrid_retriever import HybridRetriever
+from lexical_index import BM25Index
+from query_embeddings import SpeculativeEmbedder, shared_query_cache
+from vector_store import load_index
 
-    def items(self) -> Iterable[Item]:
-        for i in range(self._index.get_n_items()):
-            item = Item(
-                i=i,
-                userdata=self._filedata.userdata[i],
-                vector=self._index.get_item_vector(i),
-            )
-            yield item
-
-    def query(self, vector: list[float], n: int, search_k: int = -1) -> list[QueryResult]:
-        ids = self._index.get_nns_by_vector(vector, n, search_k=search_k, include_distances=True)
-        return [
-            QueryResult(userdata=self._filedata.userdata[i], distance=distance)
-            for i, distance in zip(*ids)
-        ]
+logger = logging.getLogger("rag-handler")
 
 class ThinkingStyle(Enum):
     NONE = "none"
@@ -123,6 +64,10 @@ class RAGHandler:
                 data_path="my_data.pkl",
                 thinking_style="message"
             )
+
+        # Optionally, start embedding the user's question before the tool is called
+        async def on_user_turn_completed(self, turn_ctx, new_message):
+            self.rag_handler.speculate(new_message.text_content)
     """
     
     def __init__(
@@ -133,19 +78,25 @@ class RAGHandler:
         thinking_messages: Optional[List[str]] = None,
         thinking_prompt: Optional[str] = None,
         embeddings_dimension: int = 1536,
-        embeddings_model: str = "text-embedding-3-small"
+        embeddings_model: str = "text-embedding-3-small",
+        backend: Optional[str] = None,
+        top_k: int = 3,
+        max_distance: Optional[float] = None
     ):
         """
         Initialize the RAG handler.
         
         Args:
-            index_path: Path to the Annoy index file
+            index_path: Path to the vector store directory
             data_path: Path to the pickled data file containing paragraphs
             thinking_style: How to handle delays during RAG lookups
             thinking_messages: Custom messages to use with MESSAGE style
             thinking_prompt: Custom prompt to use with LLM style
             embeddings_dimension: Dimension of embeddings to use
             embeddings_model: OpenAI model to use for embeddings
+            backend: Vector store backend ("annoy", "exact" or "hnsw"), defaults to the first one built
+            top_k: Paragraphs to retrieve per lookup
+            max_distance: Ignore vector hits further than this (None keeps all)
         """
         self._index_path = Path(index_path)
         self._data_path = Path(data_path)
@@ -154,16 +105,30 @@ class RAGHandler:
         self._thinking_prompt = thinking_prompt or DEFAULT_THINKING_PROMPT
         self._embeddings_dimension = embeddings_dimension
         self._embeddings_model = embeddings_model
+        self._top_k = top_k
+        self._max_distance = max_distance
         
         # Load index and data
         if not self._index_path.exists():
-            raise FileNotFoundError(f"Annoy index not found at {self._index_path}")
+            raise FileNotFoundError(f"Vector index not found at {self._index_path}")
         if not self._data_path.exists():
             raise FileNotFoundError(f"Data file not found at {self._data_path}")
             
-        self._annoy_index = AnnoyIndex.load(str(self._index_path))
+        self._vector_index = load_index(self._index_path, backend)
+        # Indexes built before the lexical index existed fall back to vector-only search
+        lexical_index = BM25Index.load(self._index_path) if BM25Index.exists(self._index_path) else None
+        self._retriever = HybridRetriever(self._vector_index, lexical_index)
         with open(self._data_path, "rb") as f:
             self._paragraphs_by_uuid = pickle.load(f)
+        self._embedder = SpeculativeEmbedder(shared_query_cache(embeddings_model, embeddings_dimension))
+    
+    def speculate(self, transcript: str) -> None:
+        """
+        Start embedding the user's finished turn in the background, so a lookup
+        whose query is the transcript itself doesn't wait for the embeddings API.
+        """
+        if transcript:
+            self._embedder.on_turn_completed(transcript)
     
     async def _handle_thinking(self, agent: Agent) -> None:
         """Handle the thinking phase based on the configured style."""
@@ -178,32 +143,34 @@ class RAGHandler:
             response = await agent._llm.complete(self._thinking_prompt)
             await agent.session.say(response.text)
     
-    async def retrieve_context(self, query: str) -> str:
+    async def retrieve_context(
+        self, query: str, top_k: Optional[int] = None, max_distance: Optional[float] = None
+    ) -> str:
         """
         Retrieve relevant context from the RAG database
         
         Args:
             query: The query to search for relevant context
+            top_k: Paragraphs to retrieve (defaults to the handler's top_k)
+            max_distance: Vector distance cutoff (defaults to the handler's max_distance)
             
         Returns:
-            The retrieved context, or an empty string if no relevant context was found
+            The retrieved paragraphs, most relevant first, or an empty string if no
+            relevant context was found
         """
-        # Generate embeddings for the query
-        query_embedding = await openai.create_embeddings(
-            input=[query],
-            model=self._embeddings_model,
-            dimensions=self._embeddings_dimension
-        )
+        # Cached per worker, or already in flight from speculate()
+        query_embedding = await self._embedder.embed(query)
         
-        # Query the index
-        results = self._annoy_index.query(query_embedding[0].embedding, n=1)
+        # Fuse lexical and vector hits
+        results = self._retriever.search(
+            query,
+            query_embedding,
+            top_k=top_k or self._top_k,
+            max_distance=self._max_distance if max_distance is None else max_distance,
+        )
         
-        if not results:
-            return ""
-            
-        # Get the most relevant paragraph
-        paragraph = self._paragraphs_by_uuid.get(results[0].userdata, "")
-        return paragraph
+        paragraphs = [self._paragraphs_by_uuid.get(result.id, "") for result in results]
+        return "\n\n".join(p for p in paragraphs if p)
     
     async def enrich_with_rag(self, agent: Agent, context: RunContext, query: str) -> None:
         """
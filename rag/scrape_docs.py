@@ -1,10 +1,31 @@
 #!/usr/bin/env python3
+"""
+Scraper for the LiveKit docs site.
+
+Pages from the sitemap are fetched a few at a time (bounded by a semaphore and
+a per-host request rate) and each one is written to its own file in
+data/pages/. A manifest next to them records every page's ETag, Last-Modified
+and content hash, so later runs send conditional GETs and only rewrite pages
+whose text changed. The manifest is saved as pages complete; an interrupted
+run picks up where it stopped. raw_data.txt is still assembled from the page
+files for build_rag_data.py.
+
+Usage:
+    python scrape_docs.py [--base-url https://docs.livekit.io] [--concurrency 8] [--rate 10] [--full]
+"""
+
+import argparse
 import asyncio
+import hashlib
+import json
 import logging
+import os
 import re
+import time
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import List, Set
-from urllib.parse import urljoin, urlparse
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
 
 import aiohttp
 from bs4 import BeautifulSoup
@@ -20,16 +41,152 @@ logger = logging.getLogger("docs-scraper")
 load_dotenv()
 
 BASE_URL = "https://docs.livekit.io"
-SITEMAP_URL = f"{BASE_URL}/sitemap.xml"
-OUTPUT_FILE = Path(__file__).parent / "data/raw_data.txt"
+DATA_DIR = Path(__file__).parent / "data"
+OUTPUT_FILE = DATA_DIR / "raw_data.txt"
+PAGES_DIR = DATA_DIR / "pages"
+MANIFEST_FILE = "manifest.json"
 EXCLUDED_PATHS = ["/reference"]  # Paths to exclude from scraping
 
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Save the manifest after this many pages, so an interruption loses little work
+MANIFEST_SAVE_EVERY = 20
+
+
+def page_filename(url: str) -> str:
+    """Stable, filesystem-safe file name for a page URL"""
+    path = urlparse(url).path.strip("/") or "index"
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", path)[:80]
+    return f"{slug}-{hashlib.sha256(url.encode()).hexdigest()[:8]}.txt"
+
+
+def extract_text(html: str) -> str:
+    """The readable text of a docs page's <main> element"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Extract the main content
+    main_content = soup.find("main")
+    if not main_content:
+        return ""
+
+    # Remove unwanted elements
+    for element in main_content.find_all(["nav", "footer", "header", "script", "style"]):
+        element.decompose()
+
+    # Clean up the text
+    text = main_content.get_text(separator="\n", strip=True)
+    text = re.sub(r"\n\s*\n", "\n\n", text)  # Remove excessive newlines
+    return text.strip()
+
+
+@dataclass
+class PageRecord:
+    url: str
+    file: str
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    checked_at: float = 0.0
+
+
+@dataclass
+class ScrapeStats:
+    changed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    resumed: int = 0
+    failed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+class ScrapeManifest:
+    """Per-page validators and hashes, plus the state of the last run"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.pages: Dict[str, PageRecord] = {}
+        self.run_started_at = 0.0
+        self.run_complete = True
+
+    @classmethod
+    def load(cls, path: Path) -> "ScrapeManifest":
+        manifest = cls(path)
+        if path.exists():
+            with open(path) as f:
+                data = json.load(f)
+            manifest.pages = {url: PageRecord(**record) for url, record in data["pages"].items()}
+            manifest.run_started_at = data["run"]["started_at"]
+            manifest.run_complete = data["run"]["complete"]
+        return manifest
+
+    def save(self) -> None:
+        # Write and rename, so an interruption never leaves a truncated manifest
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "run": {"started_at": self.run_started_at, "complete": self.run_complete},
+                    "pages": {url: asdict(record) for url, record in self.pages.items()},
+                },
+                f,
+                indent=1,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class HostRateLimiter:
+    """Spaces out request starts to at most requests_per_second per host"""
+
+    def __init__(self, requests_per_second: float) -> None:
+        self._interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        if not self._interval:
+            return
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
 class DocsScraper:
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        pages_dir: Path = PAGES_DIR,
+        output_file: Path = OUTPUT_FILE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        excluded_paths: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            base_url: Site to scrape; its /sitemap.xml lists the pages
+            pages_dir: Directory for the per-page text files and the manifest
+            output_file: Combined text of all pages, for build_rag_data.py
+            concurrency: Maximum page requests in flight
+            requests_per_second: Maximum request rate per host
+            excluded_paths: URL path prefixes to skip
+        """
+        self.base_url = base_url.rstrip("/")
+        self.sitemap_url = f"{self.base_url}/sitemap.xml"
+        self.pages_dir = Path(pages_dir)
+        self.output_file = Path(output_file)
+        self.excluded_paths = EXCLUDED_PATHS if excluded_paths is None else excluded_paths
         self.visited_urls: Set[str] = set()
-        self.content: List[str] = []
+        self.urls: List[str] = []
         self.session = None
 
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = HostRateLimiter(requests_per_second)
+        self._manifest: Optional[ScrapeManifest] = None
+        self._pending_saves = 0
+        self._full = False
+
     async def init_session(self):
         """Initialize the aiohttp session."""
         self.session = aiohttp.ClientSession()
@@ -42,87 +199,182 @@ class DocsScraper:
     def should_exclude_url(self, url: str) -> bool:
         """Check if a URL should be excluded from scraping."""
         parsed = urlparse(url)
-        return any(parsed.path.startswith(path) for path in EXCLUDED_PATHS)
+        return any(parsed.path.startswith(path) for path in self.excluded_paths)
 
     async def fetch_sitemap(self) -> List[str]:
         """Fetch and parse the sitemap to get all URLs."""
-        async with self.session.get(SITEMAP_URL) as response:
+        async with self.session.get(self.sitemap_url) as response:
             if response.status != 200:
                 raise Exception(f"Failed to fetch sitemap: {response.status}")
-            
+
             content = await response.text()
             soup = BeautifulSoup(content, "xml")
-            urls = [loc.text for loc in soup.find_all("loc")]
-            
-            # Filter out excluded URLs and ensure they're from docs.livekit.io
+            urls = [loc.text.strip() for loc in soup.find_all("loc")]
+
+            # Filter out excluded URLs and ensure they're from the docs site
             return [
-                url for url in urls 
-                if url.startswith(BASE_URL) and not self.should_exclude_url(url)
+                url for url in dict.fromkeys(urls)
+                if url.startswith(self.base_url) and not self.should_exclude_url(url)
             ]
 
-    async def fetch_page(self, url: str) -> str:
-        """Fetch a single page and extract its content."""
-        try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    logger.warning(f"Failed to fetch {url}: {response.status}")
-                    return ""
-                
-                content = await response.text()
-                soup = BeautifulSoup(content, "html.parser")
-                
-                # Extract the main content
-                main_content = soup.find("main")
-                if not main_content:
-                    return ""
-                
-                # Remove unwanted elements
-                for element in main_content.find_all(["nav", "footer", "header", "script", "style"]):
-                    element.decompose()
-                
-                # Clean up the text
-                text = main_content.get_text(separator="\n", strip=True)
-                text = re.sub(r"\n\s*\n", "\n\n", text)  # Remove excessive newlines
-                return text.strip()
-                
-        except Exception as e:
-            logger.error(f"Error fetching {url}: {e}")
-            return ""
-
-    async def scrape(self):
-        """Main scraping function."""
+    async def _get(self, url: str, headers: Dict[str, str]) -> Optional[aiohttp.ClientResponse]:
+        """GET with rate limiting and retries; returns the response with its body read, or None"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self._rate_limiter.wait(url)
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                        retry_after = response.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                        logger.warning(f"{url}: {response.status}, retrying in {delay:.0f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    await response.read()
+                    return response
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    logger.error(f"Error fetching {url}: {e}")
+                    return None
+                await asyncio.sleep(2 ** attempt)
+        return None
+
+    async def fetch_page(self, url: str, stats: ScrapeStats) -> None:
+        """Fetch a page (conditionally, if it was seen before) and update its file and manifest entry."""
+        record = self._manifest.pages.get(url)
+        headers = {}
+        if record and not self._full and (self.pages_dir / record.file).exists():
+            if record.etag:
+                headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                headers["If-Modified-Since"] = record.last_modified
+
+        async with self._semaphore:
+            response = await self._get(url, headers)
+        if response is None or response.status not in (200, 304) or (response.status == 304 and record is None):
+            logger.warning(f"Failed to fetch {url}: {response.status if response else 'no response'}")
+            stats.failed.append(url)
+            return
+
+        if response.status == 304:
+            record.checked_at = time.time()
+            stats.unchanged += 1
+        else:
+            content = extract_text(await response.text())
+            if not content:
+                stats.failed.append(url)
+                return
+            digest = hashlib.sha256(content.encode()).hexdigest()
+            if record is None or record.content_hash != digest or not (self.pages_dir / record.file).exists():
+                file = page_filename(url)
+                with open(self.pages_dir / file, "w") as f:
+                    f.write(f"Content from {url}:\n\n{content}\n\n")
+                stats.changed.append(url)
+            else:
+                file = record.file
+                stats.unchanged += 1
+            self._manifest.pages[url] = PageRecord(
+                url=url,
+                file=file,
+                content_hash=digest,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                checked_at=time.time(),
+            )
+
+        self._pending_saves += 1
+        if self._pending_saves >= MANIFEST_SAVE_EVERY:
+            self._manifest.save()
+            self._pending_saves = 0
+
+    async def scrape(self, full: bool = False) -> ScrapeStats:
+        """
+        Main scraping function.
+
+        Args:
+            full: Fetch every page unconditionally instead of resuming or sending
+                conditional requests; pages whose text is unchanged are still left alone
+        """
+        self.pages_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest = ScrapeManifest.load(self.pages_dir / MANIFEST_FILE)
+        self._full = full
+        stats = ScrapeStats()
+
+        # Resume an interrupted run: pages it already checked are skipped
+        if self._manifest.run_complete or full:
+            self._manifest.run_started_at = time.time()
+            self._manifest.run_complete = False
+        else:
+            logger.info("Resuming interrupted scrape")
+        run_started_at = self._manifest.run_started_at
+
         await self.init_session()
         try:
             # Get all URLs from sitemap
-            urls = await self.fetch_sitemap()
-            logger.info(f"Found {len(urls)} URLs to scrape")
-            
-            # Process each URL
-            for url in urls:
+            self.urls = await self.fetch_sitemap()
+            logger.info(f"Found {len(self.urls)} URLs to scrape")
+
+            to_fetch = []
+            for url in self.urls:
                 if url in self.visited_urls:
                     continue
-                    
                 self.visited_urls.add(url)
-                logger.info(f"Scraping {url}")
-                
-                content = await self.fetch_page(url)
-                if content:
-                    self.content.append(f"Content from {url}:\n\n{content}\n\n")
-                    
+                record = self._manifest.pages.get(url)
+                if record and record.checked_at >= run_started_at and (self.pages_dir / record.file).exists():
+                    stats.resumed += 1
+                    continue
+                to_fetch.append(url)
+
+            await asyncio.gather(*(self.fetch_page(url, stats) for url in to_fetch))
+
+            # Pages that left the sitemap
+            current = set(self.urls)
+            for url in [url for url in self._manifest.pages if url not in current]:
+                record = self._manifest.pages.pop(url)
+                (self.pages_dir / record.file).unlink(missing_ok=True)
+                stats.removed.append(url)
+
+            self._manifest.run_complete = True
         finally:
+            self._manifest.save()
             await self.close_session()
 
+        logger.info(
+            f"{len(stats.changed)} pages changed, {stats.unchanged} unchanged, {stats.resumed} done in the "
+            f"interrupted run, {len(stats.removed)} removed, {len(stats.failed)} failed"
+        )
+        return stats
+
     def save_content(self):
-        """Save the scraped content to a file."""
-        with open(OUTPUT_FILE, "w") as f:
-            f.write("\n".join(self.content))
-        logger.info(f"Saved content to {OUTPUT_FILE}")
+        """Save the scraped content, in sitemap order, to a single file."""
+        with open(self.output_file, "w") as f:
+            for url in self.urls:
+                record = self._manifest.pages.get(url)
+                if record:
+                    f.write((self.pages_dir / record.file).read_text())
+                    f.write("\n")
+        logger.info(f"Saved content to {self.output_file}")
+
 
 async def main():
     """Main function to run the scraper."""
-    scraper = DocsScraper()
-    await scraper.scrape()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--pages-dir", default=str(PAGES_DIR))
+    parser.add_argument("--output", default=str(OUTPUT_FILE))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="requests per second per host")
+    parser.add_argument("--full", action="store_true", help="refetch every page without conditional requests")
+    args = parser.parse_args()
+
+    scraper = DocsScraper(
+        base_url=args.base_url,
+        pages_dir=Path(args.pages_dir),
+        output_file=Path(args.output),
+        concurrency=args.concurrency,
+        requests_per_second=args.rate,
+    )
+    await scraper.scrape(full=args.full)
     scraper.save_content()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""
+Vector store for the RAG examples.
+
+One query API, `index.query(vector, n)`, over interchangeable backends:
+
+- annoy: Annoy random-projection forest (the original index format)
+- exact: NumPy brute force, exact results; best for small corpora
+- hnsw: NumPy layered proximity graph
+
+Index and metadata are memory-mapped on load. See benchmark_vector_store.py to
+compare recall and latency of the backends on a built index.
+"""
+
+from .annoy_backend import AnnoyIndex
+from .base import Item, Metric, QueryResult, VectorIndex
+from .builder import BACKENDS, DEFAULT_BACKEND, IndexBuilder, load_index
+from .exact import ExactIndex
+from .hnsw import HNSWIndex
+
+__all__ = [
+    "AnnoyIndex",
+    "BACKENDS",
+    "DEFAULT_BACKEND",
+    "ExactIndex",
+    "HNSWIndex",
+    "IndexBuilder",
+    "Item",
+    "Metric",
+    "QueryResult",
+    "VectorIndex",
+    "load_index",
+]
@@ -0,0 +1,87 @@
+"""
+Annoy backend: random-projection forest, memory-mapped by annoy itself.
+Supports every metric Annoy does, including hamming.
+"""
+
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import annoy
+import numpy as np
+
+from .base import IndexHeader, Metric, UserdataTable, VectorIndex
+
+ANNOY_FILE = "index.annoy"
+
+# Pre-vector_store index directories: index.annoy plus a pickled _FileData
+LEGACY_METADATA_FILE = "metadata.pkl"
+
+
+@dataclass
+class _FileData:
+    f: int
+    metric: Metric
+    userdata: dict[int, Any]
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """metadata.pkl was pickled from whichever script defined its own _FileData copy"""
+
+    def find_class(self, module: str, name: str) -> Any:
+        if name == "_FileData":
+            return _FileData
+        return super().find_class(module, name)
+
+
+class AnnoyIndex(VectorIndex):
+    backend = "annoy"
+
+    def __init__(
+        self, header: IndexHeader, userdata: UserdataTable, index: annoy.AnnoyIndex, search_k: int = -1
+    ) -> None:
+        super().__init__(header, userdata)
+        self._index = index
+        self._search_k = search_k
+
+    @classmethod
+    def load(cls, path: Path, header: IndexHeader, userdata: UserdataTable) -> "AnnoyIndex":
+        index = annoy.AnnoyIndex(header.f, header.metric)
+        index.load(str(path / ANNOY_FILE))
+        params = header.backends.get(cls.backend, {})
+        return cls(header, userdata, index, search_k=params.get("search_k", -1))
+
+    @classmethod
+    def load_legacy(cls, path: Path) -> "AnnoyIndex":
+        """Load an index written by the old per-script IndexBuilder"""
+        with open(path / LEGACY_METADATA_FILE, "rb") as f:
+            filedata: _FileData = _LegacyUnpickler(f).load()
+        index = annoy.AnnoyIndex(filedata.f, filedata.metric)
+        index.load(str(path / ANNOY_FILE))
+        count = index.get_n_items()
+        header = IndexHeader(f=filedata.f, metric=filedata.metric, count=count)
+        userdata = [filedata.userdata[i] for i in range(count)]
+        return cls(header, userdata, index)
+
+    @staticmethod
+    def build(
+        path: Path, header: IndexHeader, vectors: np.ndarray, trees: int = 50, jobs: int = -1
+    ) -> dict[str, Any]:
+        """Build and save the Annoy forest; returns the parameters for the header"""
+        index = annoy.AnnoyIndex(header.f, header.metric)
+        for i, vector in enumerate(vectors):
+            index.add_item(i, vector.tolist())
+        # n_jobs=-1 means use all available cores
+        index.build(n_trees=trees, n_jobs=jobs)
+        index.save(str(path / ANNOY_FILE))
+        return {"trees": trees, "search_k": -1}
+
+    def vector(self, i: int) -> list[float]:
+        return self._index.get_item_vector(i)
+
+    def query_ids(self, vector: list[float], n: int, search_k: Optional[int] = None) -> tuple[list[int], list[float]]:
+        ids, distances = self._index.get_nns_by_vector(
+            vector, n, search_k=self._search_k if search_k is None else search_k, include_distances=True
+        )
+        return ids, distances
@@ -0,0 +1,184 @@
+"""
+Shared types and on-disk layout for the vector store backends.
+
+An index directory holds a small JSON header plus memory-mapped arrays, so
+loading an index costs a few page faults instead of unpickling every vector:
+
+    vector_store.json       dimensions, metric, item count, per-backend parameters
+    vectors.npy             float32 (count, f) item vectors
+    norms.npy               float32 (count,) vector norms (angular metric)
+    userdata.bin            JSON-encoded userdata, concatenated
+    userdata_offsets.npy    int64 (count + 1,) byte offsets into userdata.bin
+    index.annoy             Annoy forest (annoy backend)
+    hnsw_graph.npy          int32 (levels, count, 2 * m) neighbour lists (hnsw backend)
+"""
+
+import json
+import mmap
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Optional, Union
+
+import numpy as np
+
+Metric = Literal["angular", "euclidean", "manhattan", "hamming", "dot"]
+
+HEADER_FILE = "vector_store.json"
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+USERDATA_FILE = "userdata.bin"
+USERDATA_OFFSETS_FILE = "userdata_offsets.npy"
+
+FORMAT_VERSION = 1
+
+# Metrics the NumPy backends (exact, hnsw) implement; annoy also has hamming
+NUMPY_METRICS = ("angular", "euclidean", "manhattan", "dot")
+
+
+@dataclass
+class Item:
+    i: int
+    userdata: Any
+    vector: list[float]
+
+
+@dataclass
+class QueryResult:
+    userdata: Any
+    distance: float
+
+
+@dataclass
+class IndexHeader:
+    f: int
+    metric: Metric
+    count: int
+    backends: dict[str, dict[str, Any]] = field(default_factory=dict)
+    version: int = FORMAT_VERSION
+
+    @classmethod
+    def load(cls, path: Path) -> "IndexHeader":
+        with open(path / HEADER_FILE) as f:
+            return cls(**json.load(f))
+
+    def save(self, path: Path) -> None:
+        with open(path / HEADER_FILE, "w") as f:
+            json.dump(self.__dict__, f, indent=2)
+
+
+class UserdataTable:
+    """Read-only, memory-mapped list of JSON-encoded userdata values"""
+
+    def __init__(self, blob: Union[bytes, mmap.mmap], offsets: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    @classmethod
+    def load(cls, path: Path) -> "UserdataTable":
+        offsets = np.load(path / USERDATA_OFFSETS_FILE, mmap_mode="r")
+        with open(path / USERDATA_FILE, "rb") as f:
+            # mmap() rejects empty files
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        return cls(blob, offsets)
+
+    @staticmethod
+    def save(path: Path, userdata: list[Any]) -> None:
+        offsets = np.zeros(len(userdata) + 1, dtype=np.int64)
+        with open(path / USERDATA_FILE, "wb") as f:
+            for i, value in enumerate(userdata):
+                encoded = json.dumps(value).encode()
+                f.write(encoded)
+                offsets[i + 1] = offsets[i] + len(encoded)
+        np.save(path / USERDATA_OFFSETS_FILE, offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> Any:
+        return json.loads(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+
+class VectorIndex:
+    """
+    Common query API implemented by every backend.
+
+    `distance` in results follows Annoy's conventions for the metric (angular is
+    the chord distance sqrt(2 - 2 cos), dot is the dot product itself), so
+    thresholds tuned against one backend carry over to the others.
+    """
+
+    backend = ""
+
+    def __init__(self, header: IndexHeader, userdata: UserdataTable) -> None:
+        self._header = header
+        self._userdata = userdata
+
+    @property
+    def size(self) -> int:
+        return self._header.count
+
+    @property
+    def metric(self) -> Metric:
+        return self._header.metric
+
+    def userdata(self, i: int) -> Any:
+        return self._userdata[i]
+
+    def vector(self, i: int) -> list[float]:
+        raise NotImplementedError
+
+    def items(self) -> Iterable[Item]:
+        for i in range(self.size):
+            yield Item(i=i, userdata=self._userdata[i], vector=self.vector(i))
+
+    def query_ids(self, vector: list[float], n: int) -> tuple[list[int], list[float]]:
+        """Ids and distances of the n nearest items, nearest first"""
+        raise NotImplementedError
+
+    def query(self, vector: list[float], n: int) -> list[QueryResult]:
+        ids, distances = self.query_ids(vector, n)
+        return [
+            QueryResult(userdata=self._userdata[i], distance=distance)
+            for i, distance in zip(ids, distances)
+        ]
+
+
+def load_vectors(path: Path) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Memory-map the stored vectors (and norms, if present)"""
+    vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+    norms_path = path / NORMS_FILE
+    norms = np.load(norms_path, mmap_mode="r") if norms_path.exists() else None
+    return vectors, norms
+
+
+def rank_keys(
+    metric: Metric, vectors: np.ndarray, norms: Optional[np.ndarray], query: np.ndarray
+) -> np.ndarray:
+    """
+    Sort keys (lower is nearer) of query against every row of vectors.
+
+    Angular compares cosines and dot compares raw products, both negated; use
+    `to_distance` to turn keys back into Annoy-style distances.
+    """
+    if metric == "angular":
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        return -(vectors @ query) / (np.maximum(norms, 1e-12) * query_norm)
+    if metric == "dot":
+        return -(vectors @ query)
+    if metric == "euclidean":
+        diff = vectors - query
+        return np.einsum("ij,ij->i", diff, diff)
+    if metric == "manhattan":
+        return np.abs(vectors - query).sum(axis=1)
+    raise ValueError(f"Metric {metric!r} is not supported by the NumPy backends {NUMPY_METRICS}")
+
+
+def to_distance(metric: Metric, keys: np.ndarray) -> np.ndarray:
+    if metric == "angular":
+        return np.sqrt(np.maximum(2.0 + 2.0 * keys, 0.0))
+    if metric == "dot":
+        return -keys
+    if metric == "euclidean":
+        return np.sqrt(np.maximum(keys, 0.0))
+    return keys
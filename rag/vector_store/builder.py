@@ -0,0 +1,133 @@
+"""
+Building and loading vector store directories.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from .annoy_backend import ANNOY_FILE, LEGACY_METADATA_FILE, AnnoyIndex
+from .base import (
+    HEADER_FILE,
+    NORMS_FILE,
+    NUMPY_METRICS,
+    VECTORS_FILE,
+    IndexHeader,
+    Metric,
+    UserdataTable,
+    VectorIndex,
+)
+from .exact import ExactIndex
+from .hnsw import HNSWIndex
+
+logger = logging.getLogger("vector-store")
+
+BACKENDS: dict[str, type[VectorIndex]] = {
+    AnnoyIndex.backend: AnnoyIndex,
+    ExactIndex.backend: ExactIndex,
+    HNSWIndex.backend: HNSWIndex,
+}
+
+DEFAULT_BACKEND = AnnoyIndex.backend
+
+
+class IndexBuilder:
+    """
+    Collects vectors and userdata, then writes an index directory.
+
+    The vectors and userdata are always saved, so the exact backend can load any
+    directory; `backends` lists the approximate structures to build on top.
+
+    Example usage:
+        builder = IndexBuilder(f=1536, metric="angular", backends=("annoy", "hnsw"))
+        builder.add_item(vector, "paragraph-id")
+        index = builder.build("data")
+    """
+
+    def __init__(
+        self,
+        f: int,
+        metric: Metric,
+        backends: tuple[str, ...] = (DEFAULT_BACKEND,),
+        **backend_params: dict[str, Any],
+    ) -> None:
+        for backend in backends:
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown vector store backend {backend!r}, expected one of {list(BACKENDS)}")
+            if backend != AnnoyIndex.backend and metric not in NUMPY_METRICS:
+                raise ValueError(f"The {backend} backend does not support the {metric!r} metric")
+        self._f = f
+        self._metric = metric
+        self._backends = backends
+        self._backend_params = backend_params
+        self._vectors: list[list[float]] = []
+        self._userdata: list[Any] = []
+
+    def add_item(self, vector: list[float], userdata: Any) -> None:
+        if len(vector) != self._f:
+            raise ValueError(f"Expected a vector of {self._f} dimensions, got {len(vector)}")
+        self._vectors.append(vector)
+        self._userdata.append(userdata)
+
+    def build(self, path: Union[str, Path], backend: Optional[str] = None) -> VectorIndex:
+        """
+        Save the index directory and load it back.
+
+        Args:
+            path: Directory to write (created if missing)
+            backend: Backend to load afterwards, defaults to the first one built
+        """
+        p = Path(path)
+        p.mkdir(parents=True, exist_ok=True)
+
+        vectors = np.asarray(self._vectors, dtype=np.float32).reshape(len(self._vectors), self._f)
+        np.save(p / VECTORS_FILE, vectors)
+        norms = None
+        if self._metric == "angular":
+            norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+            np.save(p / NORMS_FILE, norms)
+        UserdataTable.save(p, self._userdata)
+
+        header = IndexHeader(f=self._f, metric=self._metric, count=len(self._vectors))
+        for name in self._backends:
+            logger.info(f"Building {name} index over {header.count} items")
+            params = self._backend_params.get(name, {})
+            if name == AnnoyIndex.backend:
+                header.backends[name] = AnnoyIndex.build(p, header, vectors, **params)
+            elif name == HNSWIndex.backend:
+                header.backends[name] = HNSWIndex.build(p, header, vectors, norms, **params)
+            else:
+                header.backends[name] = {}
+        # Written last, so a directory with a header is always complete
+        header.save(p)
+
+        return load_index(p, backend or (self._backends[0] if self._backends else ExactIndex.backend))
+
+
+def load_index(path: Union[str, Path], backend: Optional[str] = None) -> VectorIndex:
+    """
+    Memory-map an index directory.
+
+    Args:
+        path: Directory written by IndexBuilder (or by the old per-script builder,
+            which only the annoy backend can read)
+        backend: "annoy", "exact" or "hnsw"; defaults to the first one built
+    """
+    p = Path(path)
+    if not (p / HEADER_FILE).exists():
+        if (p / LEGACY_METADATA_FILE).exists() and (p / ANNOY_FILE).exists():
+            if backend not in (None, AnnoyIndex.backend):
+                raise ValueError(f"{p} is in the legacy format, rebuild it to use the {backend} backend")
+            logger.warning(f"Loading legacy Annoy index from {p}; rebuild it to memory-map the metadata")
+            return AnnoyIndex.load_legacy(p)
+        raise FileNotFoundError(f"No vector store found at {p}")
+
+    header = IndexHeader.load(p)
+    backend = backend or next(iter(header.backends), ExactIndex.backend)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend {backend!r}, expected one of {list(BACKENDS)}")
+    if backend != ExactIndex.backend and backend not in header.backends:
+        raise ValueError(f"{p} has no {backend} index, built: {list(header.backends)}")
+    return BACKENDS[backend].load(p, header, UserdataTable.load(p))
@@ -0,0 +1,46 @@
+"""
+Exact brute-force backend: one matrix-vector product over the memory-mapped
+vectors per query. No build step, perfect recall; the right choice for small
+corpora and the ground truth for benchmarking the approximate backends.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .base import IndexHeader, UserdataTable, VectorIndex, load_vectors, rank_keys, to_distance
+
+
+class ExactIndex(VectorIndex):
+    backend = "exact"
+
+    def __init__(
+        self,
+        header: IndexHeader,
+        userdata: UserdataTable,
+        vectors: np.ndarray,
+        norms: Optional[np.ndarray],
+    ) -> None:
+        super().__init__(header, userdata)
+        self._vectors = vectors
+        self._norms = norms
+
+    @classmethod
+    def load(cls, path: Path, header: IndexHeader, userdata: UserdataTable) -> "ExactIndex":
+        vectors, norms = load_vectors(path)
+        return cls(header, userdata, vectors, norms)
+
+    def vector(self, i: int) -> list[float]:
+        return self._vectors[i].tolist()
+
+    def query_ids(self, vector: list[float], n: int) -> tuple[list[int], list[float]]:
+        n = min(n, self.size)
+        if n <= 0:
+            return [], []
+        query = np.asarray(vector, dtype=np.float32)
+        keys = rank_keys(self.metric, self._vectors, self._norms, query)
+        # Partial sort: only the n best need ordering
+        top = np.argpartition(keys, n - 1)[:n] if n < len(keys) else np.arange(len(keys))
+        top = top[np.argsort(keys[top], kind="stable")]
+        return top.tolist(), to_distance(self.metric, keys[top]).tolist()
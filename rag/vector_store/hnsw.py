@@ -0,0 +1,265 @@
+"""
+HNSW-style backend: a layered proximity graph searched greedily from the top
+layer down (Malkov & Yashunin). Implemented on NumPy so it needs no native
+extension; the graph is stored as one int32 array and memory-mapped on load
+like the vectors, so only the pages a query walks through are read.
+"""
+
+import heapq
+import math
+import random
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from .base import IndexHeader, Metric, UserdataTable, VectorIndex, load_vectors, rank_keys, to_distance
+
+GRAPH_FILE = "hnsw_graph.npy"
+
+# Nodes above this level are vanishingly rare with m >= 4; the cap keeps levels in int8
+MAX_LEVEL = 16
+
+
+class _Graph:
+    """Layered adjacency lists over vectors, shared by the builder and the index"""
+
+    def __init__(
+        self,
+        metric: Metric,
+        vectors: np.ndarray,
+        norms: Optional[np.ndarray],
+        graph: np.ndarray,
+        entry_point: int,
+    ) -> None:
+        self.metric = metric
+        self.vectors = vectors
+        self.norms = norms
+        self.graph = graph
+        self.entry_point = entry_point
+
+    def keys(self, ids: np.ndarray, query: np.ndarray) -> np.ndarray:
+        norms = self.norms[ids] if self.norms is not None else None
+        return rank_keys(self.metric, self.vectors[ids], norms, query)
+
+    def neighbours(self, level: int, node: int) -> np.ndarray:
+        row = self.graph[level, node]
+        return row[row >= 0]
+
+    def greedy(self, query: np.ndarray, node: int, key: float, level: int) -> tuple[int, float]:
+        """Walk to the nearest node on one layer (search with ef=1)"""
+        while True:
+            candidates = self.neighbours(level, node)
+            if not len(candidates):
+                return node, key
+            keys = self.keys(candidates, query)
+            best = int(np.argmin(keys))
+            if keys[best] >= key:
+                return node, key
+            node, key = int(candidates[best]), float(keys[best])
+
+    def search_layer(
+        self, query: np.ndarray, entry: list[tuple[float, int]], ef: int, level: int
+    ) -> list[tuple[float, int]]:
+        """Best-first search keeping the ef nearest nodes; returns (key, id) sorted nearest first"""
+        visited = {node for _, node in entry}
+        candidates = list(entry)
+        heapq.heapify(candidates)
+        # Max-heap (negated keys) of the current ef best
+        nearest = [(-key, node) for key, node in entry]
+        heapq.heapify(nearest)
+        while len(nearest) > ef:
+            heapq.heappop(nearest)
+
+        while candidates:
+            key, node = heapq.heappop(candidates)
+            if key > -nearest[0][0] and len(nearest) >= ef:
+                break
+            unvisited = [n for n in self.neighbours(level, node).tolist() if n not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+            keys = self.keys(np.asarray(unvisited), query)
+            for neighbour_key, neighbour in zip(keys.tolist(), unvisited):
+                if len(nearest) < ef or neighbour_key < -nearest[0][0]:
+                    heapq.heappush(candidates, (neighbour_key, neighbour))
+                    heapq.heappush(nearest, (-neighbour_key, neighbour))
+                    if len(nearest) > ef:
+                        heapq.heappop(nearest)
+
+        return sorted((-key, node) for key, node in nearest)
+
+    def search(self, query: np.ndarray, top_level: int, ef: int) -> list[tuple[float, int]]:
+        node = self.entry_point
+        key = float(self.keys(np.asarray([node]), query)[0])
+        for level in range(top_level, 0, -1):
+            node, key = self.greedy(query, node, key, level)
+        return self.search_layer(query, [(key, node)], ef, 0)
+
+
+class _GraphBuilder(_Graph):
+    def __init__(
+        self,
+        metric: Metric,
+        vectors: np.ndarray,
+        norms: Optional[np.ndarray],
+        m: int,
+        ef_construction: int,
+        seed: int,
+    ) -> None:
+        rng = random.Random(seed)
+        level_mult = 1.0 / math.log(m)
+        self.levels = np.array(
+            [min(int(-math.log(1.0 - rng.random()) * level_mult), MAX_LEVEL) for _ in range(len(vectors))],
+            dtype=np.int8,
+        )
+        top = int(self.levels.max()) if len(vectors) else 0
+        # Layer 0 keeps 2m neighbours, upper layers m
+        graph = np.full((top + 1, len(vectors), 2 * m), -1, dtype=np.int32)
+        super().__init__(metric, vectors, norms, graph, entry_point=0)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.top_level = -1
+
+    def _pairwise_keys(self, ids: list[int]) -> np.ndarray:
+        """Keys between every pair of ids (same ordering as rank_keys)"""
+        vectors = self.vectors[ids]
+        if self.metric == "angular":
+            vectors = vectors / np.maximum(self.norms[ids], 1e-12)[:, None]
+            return -(vectors @ vectors.T)
+        if self.metric == "dot":
+            return -(vectors @ vectors.T)
+        if self.metric == "euclidean":
+            squared = np.einsum("ij,ij->i", vectors, vectors)
+            return squared[:, None] + squared[None, :] - 2.0 * (vectors @ vectors.T)
+        return np.abs(vectors[:, None, :] - vectors[None, :, :]).sum(axis=2)
+
+    def _select(self, candidates: list[tuple[float, int]], limit: int) -> list[int]:
+        """
+        Neighbour selection heuristic: keep a candidate only if it is nearer to the
+        query than to every neighbour already kept, which spreads links across
+        clusters instead of spending them all on one.
+        """
+        if len(candidates) <= limit:
+            return [node for _, node in candidates]
+        ids = [node for _, node in candidates]
+        keys = np.asarray([key for key, _ in candidates])
+        pairwise = self._pairwise_keys(ids)
+        # dominated[j]: candidate j is nearer to an already selected neighbour than to the query
+        dominated = np.zeros(len(ids), dtype=bool)
+        selected: list[int] = []
+        for j in range(len(ids)):
+            if dominated[j]:
+                continue
+            selected.append(j)
+            if len(selected) >= limit:
+                break
+            dominated |= pairwise[:, j] < keys
+        # Top up with the nearest discarded ones so sparse regions stay connected
+        kept = set(selected)
+        discarded = [j for j in range(len(ids)) if j not in kept][:limit - len(selected)]
+        return [ids[j] for j in selected + discarded]
+
+    def _link(self, level: int, node: int, neighbour: int) -> None:
+        limit = 2 * self.m if level == 0 else self.m
+        row = self.graph[level, neighbour]
+        free = np.flatnonzero(row < 0)
+        if len(free) and free[0] < limit:
+            row[free[0]] = node
+            return
+        # Full: keep the nearest `limit` of the old neighbours plus the new one
+        ids = np.append(row[:limit], node)
+        keys = self.keys(ids, self.vectors[neighbour])
+        kept = self._select(sorted(zip(keys.tolist(), ids.tolist())), limit)
+        row[:] = -1
+        row[:len(kept)] = kept
+
+    def insert(self, node: int) -> None:
+        level = int(self.levels[node])
+        if self.top_level < 0:
+            self.entry_point, self.top_level = node, level
+            return
+
+        query = self.vectors[node]
+        ep = self.entry_point
+        key = float(self.keys(np.asarray([ep]), query)[0])
+        for layer in range(self.top_level, level, -1):
+            ep, key = self.greedy(query, ep, key, layer)
+
+        entry = [(key, ep)]
+        for layer in range(min(level, self.top_level), -1, -1):
+            found = self.search_layer(query, entry, self.ef_construction, layer)
+            limit = 2 * self.m if layer == 0 else self.m
+            neighbours = self._select(found, limit)
+            self.graph[layer, node, :len(neighbours)] = neighbours
+            for neighbour in neighbours:
+                self._link(layer, node, neighbour)
+            entry = found
+
+        if level > self.top_level:
+            self.entry_point, self.top_level = node, level
+
+
+class HNSWIndex(VectorIndex):
+    backend = "hnsw"
+
+    def __init__(
+        self,
+        header: IndexHeader,
+        userdata: UserdataTable,
+        graph: _Graph,
+        top_level: int,
+        ef_search: int,
+    ) -> None:
+        super().__init__(header, userdata)
+        self._graph = graph
+        self._top_level = top_level
+        self.ef_search = ef_search
+
+    @classmethod
+    def load(cls, path: Path, header: IndexHeader, userdata: UserdataTable) -> "HNSWIndex":
+        params = header.backends[cls.backend]
+        vectors, norms = load_vectors(path)
+        graph = np.load(path / GRAPH_FILE, mmap_mode="r")
+        return cls(
+            header,
+            userdata,
+            _Graph(header.metric, vectors, norms, graph, params["entry_point"]),
+            top_level=params["top_level"],
+            ef_search=params["ef_search"],
+        )
+
+    @staticmethod
+    def build(
+        path: Path,
+        header: IndexHeader,
+        vectors: np.ndarray,
+        norms: Optional[np.ndarray] = None,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int = 42,
+    ) -> dict[str, Any]:
+        """Build and save the graph; returns the parameters for the header"""
+        builder = _GraphBuilder(header.metric, vectors, norms, m, ef_construction, seed)
+        for node in range(len(vectors)):
+            builder.insert(node)
+        np.save(path / GRAPH_FILE, builder.graph)
+        return {
+            "m": m,
+            "ef_construction": ef_construction,
+            "ef_search": ef_search,
+            "entry_point": builder.entry_point,
+            "top_level": builder.top_level,
+        }
+
+    def vector(self, i: int) -> list[float]:
+        return self._graph.vectors[i].tolist()
+
+    def query_ids(self, vector: list[float], n: int, ef: Optional[int] = None) -> tuple[list[int], list[float]]:
+        if self.size == 0 or n <= 0:
+            return [], []
+        query = np.asarray(vector, dtype=np.float32)
+        found = self._graph.search(query, self._top_level, max(ef or self.ef_search, n))[:n]
+        keys = np.asarray([key for key, _ in found])
+        return [node for _, node in found], to_distance(self.metric, keys).tolist()